@@ -1,6 +1,7 @@
 // SPDX-License-Identifier: MIT
 
 pragma solidity ^0.6.12;
+pragma experimental ABIEncoderV2;
 
 import "@openzeppelin/contracts/math/SafeMath.sol";
 import "@openzeppelin/contracts/token/ERC20/IERC20.sol";
@@ -10,6 +11,7 @@ import "@openzeppelin/contracts/utils/ReentrancyGuard.sol";
 
 import "./libraries/openzeppelin/ERC20UpgradeSafe.sol";
 import "./libraries/CloneFactory.sol";
+import "./libraries/CloneWithData.sol";
 import "./libraries/UniERC20.sol";
 import "./OptionMarket.sol";
 import "./OptionSymbol.sol";
@@ -20,6 +22,28 @@ contract OptionFactory is CloneFactory, OptionSymbol, ReentrancyGuard {
     using UniERC20 for IERC20;
     using SafeMath for uint256;
 
+    event MarketCreated(
+        address indexed market,
+        address indexed creator,
+        address baseToken,
+        address[] longTokens,
+        address[] shortTokens
+    );
+
+    struct MarketConfig {
+        address baseAsset;
+        address quoteAsset;
+        address oracle;
+        uint256[] strikePrices;
+        uint256 expiryTime;
+        bool isPut;
+        uint256 tradingFee;
+        uint256 balanceCap;
+        uint256 totalSupplyCap;
+        uint256 disputePeriod;
+        bool isPaused;
+    }
+
     address public optionMarketLibrary;
     address public optionTokenLibrary;
     address[] public markets;
@@ -40,29 +64,80 @@ contract OptionFactory is CloneFactory, OptionSymbol, ReentrancyGuard {
         bool isPut,
         uint256 tradingFee
     ) external nonReentrant returns (address marketAddress) {
-        marketAddress = createClone(optionMarketLibrary);
+        marketAddress = _createMarket(baseAsset, quoteAsset, oracle, strikePrices, expiryTime, isPut, tradingFee);
+
+        // transfer ownership to sender
+        OptionMarket(marketAddress).transferOwnership(msg.sender);
+    }
+
+    /**
+     * Same as `createMarket` but also sets caps, dispute period and pause
+     * state before transferring ownership, so the market is never live
+     * without them and no further transactions are needed
+     */
+    function createMarketWithConfig(MarketConfig memory config)
+        external
+        nonReentrant
+        returns (address marketAddress)
+    {
+        marketAddress = _createMarket(
+            config.baseAsset,
+            config.quoteAsset,
+            config.oracle,
+            config.strikePrices,
+            config.expiryTime,
+            config.isPut,
+            config.tradingFee
+        );
+
+        OptionMarket market = OptionMarket(marketAddress);
+        market.setBalanceCap(config.balanceCap);
+        market.setTotalSupplyCap(config.totalSupplyCap);
+        market.setDisputePeriod(config.disputePeriod);
+        if (config.isPaused) {
+            market.pause();
+        }
+
+        // transfer ownership to sender
+        market.transferOwnership(msg.sender);
+    }
+
+    function _createMarket(
+        address baseAsset,
+        address quoteAsset,
+        address oracle,
+        uint256[] memory strikePrices,
+        uint256 expiryTime,
+        bool isPut,
+        uint256 tradingFee
+    ) internal returns (address marketAddress) {
+        address[] memory longTokens = _createClones(optionTokenLibrary, strikePrices.length);
+        address[] memory shortTokens = _createClones(optionTokenLibrary, strikePrices.length);
+
+        // append number of strikes, strike prices and option tokens to the
+        // market's code so they don't need to be loaded from storage when
+        // calculating cost
+        marketAddress = CloneWithData.createClone(
+            optionMarketLibrary,
+            abi.encodePacked(strikePrices.length, strikePrices, longTokens, shortTokens)
+        );
         markets.push(marketAddress);
 
         string memory underlyingSymbol = IERC20(baseAsset).uniSymbol();
         string memory lpSymbol = getMarketSymbol(underlyingSymbol, expiryTime, isPut);
         address baseToken = isPut ? quoteAsset : baseAsset;
 
-        address[] memory longTokens = new address[](strikePrices.length);
-        address[] memory shortTokens = new address[](strikePrices.length);
-
         // use scoping to avoid stack too deep error
         {
             uint8 decimals = IERC20(baseToken).isETH() ? 18 : ERC20UpgradeSafe(baseToken).decimals();
 
             for (uint256 i = 0; i < strikePrices.length; i++) {
-                longTokens[i] = createClone(optionTokenLibrary);
                 string memory optionSymbol =
                     getOptionSymbol(underlyingSymbol, strikePrices[i], expiryTime, isPut, true);
                 OptionToken(longTokens[i]).initialize(marketAddress, optionSymbol, optionSymbol, decimals);
             }
 
             for (uint256 i = 0; i < strikePrices.length; i++) {
-                shortTokens[i] = createClone(optionTokenLibrary);
                 string memory optionSymbol =
                     getOptionSymbol(underlyingSymbol, strikePrices[i], expiryTime, isPut, false);
                 OptionToken(shortTokens[i]).initialize(marketAddress, optionSymbol, optionSymbol, decimals);
@@ -81,8 +156,14 @@ contract OptionFactory is CloneFactory, OptionSymbol, ReentrancyGuard {
             lpSymbol
         );
 
-        // transfer ownership to sender
-        OptionMarket(marketAddress).transferOwnership(msg.sender);
+        emit MarketCreated(marketAddress, msg.sender, baseToken, longTokens, shortTokens);
+    }
+
+    function _createClones(address target, uint256 count) internal returns (address[] memory clones) {
+        clones = new address[](count);
+        for (uint256 i = 0; i < count; i++) {
+            clones[i] = createClone(target);
+        }
     }
 
     function numMarkets() external view returns (uint256) {
@@ -10,6 +10,7 @@ import "@openzeppelin/contracts/utils/Address.sol";
 import "./libraries/openzeppelin/ERC20UpgradeSafe.sol";
 import "./libraries/openzeppelin/OwnableUpgradeSafe.sol";
 import "./libraries/openzeppelin/ReentrancyGuardUpgradeSafe.sol";
+import "./libraries/CloneWithData.sol";
 import "./libraries/UniERC20.sol";
 import "./OptionMath.sol";
 import "./OptionToken.sol";
@@ -85,6 +86,23 @@ contract OptionMarket is ERC20UpgradeSafe, ReentrancyGuardUpgradeSafe, OwnableUp
     event Withdraw(address indexed account, uint256 sharesIn, uint256 amountOut, uint256 newSupply, bool isSettled);
     event Settle(uint256 expiryPrice);
 
+    event BuyMany(
+        address indexed account,
+        uint256[] longOptionsOut,
+        uint256[] shortOptionsOut,
+        uint256 sharesOut,
+        uint256 amountIn
+    );
+
+    event SellMany(
+        address indexed account,
+        uint256[] longOptionsIn,
+        uint256[] shortOptionsIn,
+        uint256 sharesIn,
+        uint256 amountOut,
+        bool isSettled
+    );
+
     uint256 public constant SCALE = 1e18;
     uint256 public constant SCALE_SCALE = 1e36;
 
@@ -111,6 +129,23 @@ contract OptionMarket is ERC20UpgradeSafe, ReentrancyGuardUpgradeSafe, OwnableUp
     // total value of fees owed to LPs
     uint256 public poolValue;
 
+    // total supplies of long and short tokens, tracked here so calculating
+    // the cost doesn't need an external call to each token
+    uint256[] public longSupplies;
+    uint256[] public shortSupplies;
+
+    // whether the number of strikes, strike prices, long tokens and short
+    // tokens are also appended to this clone's code, which is cheaper to read
+    // than storage
+    bool public hasImmutableConfig;
+
+    // where strike prices and option tokens are read from. loaded once per
+    // call so loops over strikes don't read `hasImmutableConfig` each time
+    struct Config {
+        bool isImmutable;
+        uint256 numStrikes;
+    }
+
     /**
      * @param _baseToken        Underlying asset if call. Strike currency if put
      *                          Represents ETH if equal to 0x0
@@ -168,8 +203,13 @@ contract OptionMarket is ERC20UpgradeSafe, ReentrancyGuardUpgradeSafe, OwnableUp
         for (uint256 i = 0; i < _strikePrices.length; i++) {
             longTokens.push(OptionToken(_longTokens[i]));
             shortTokens.push(OptionToken(_shortTokens[i]));
+            longSupplies.push();
+            shortSupplies.push();
         }
 
+        // clones created by `OptionFactory` have the configuration appended
+        hasImmutableConfig = _isImmutableConfig(_strikePrices, _longTokens, _shortTokens);
+
         require(!isExpired(), "Already expired");
     }
 
@@ -190,22 +230,20 @@ contract OptionMarket is ERC20UpgradeSafe, ReentrancyGuardUpgradeSafe, OwnableUp
         require(totalSupply() > 0, "No liquidity");
         require(!isExpired(), "Already expired");
         require(msg.sender == owner() || !isPaused, "Paused");
-        require(strikeIndex < strikePrices.length, "Index too large");
+        Config memory config = _loadConfig();
+        require(strikeIndex < config.numStrikes, "Index too large");
         require(optionsOut > 0, "Options out must be > 0");
 
         // mint options to user
-        OptionToken option = isLongToken ? longTokens[strikeIndex] : shortTokens[strikeIndex];
-        option.mint(msg.sender, optionsOut);
+        uint256 newSupply = _mintOptions(config, isLongToken, strikeIndex, optionsOut);
 
         // calculate trading fee and allocate it to the LP pool
-        // like LMSR cost, fees have to be multiplied by strike price
-        uint256 fee = optionsOut.mul(tradingFee);
-        fee = isPut ? fee.mul(strikePrices[strikeIndex]).div(SCALE_SCALE) : fee.div(SCALE);
+        uint256 fee = _calcFee(config, strikeIndex, optionsOut);
         poolValue = poolValue.add(fee);
 
         // calculate amount that needs to be paid by user to buy these options
         // it's equal to the increase in LMSR cost after minting the options
-        uint256 costAfter = getCurrentCost();
+        uint256 costAfter = _getCurrentCost(config);
         amountIn = costAfter.sub(lastCost).add(fee); // do sub first as a check since should not fail
         lastCost = costAfter;
         require(amountIn > 0, "Amount in must be > 0");
@@ -213,7 +251,7 @@ contract OptionMarket is ERC20UpgradeSafe, ReentrancyGuardUpgradeSafe, OwnableUp
 
         // transfer in amount from user
         _transferIn(amountIn);
-        emit Buy(msg.sender, isLongToken, strikeIndex, optionsOut, amountIn, option.totalSupply());
+        emit Buy(msg.sender, isLongToken, strikeIndex, optionsOut, amountIn, newSupply);
     }
 
     /**
@@ -233,22 +271,22 @@ contract OptionMarket is ERC20UpgradeSafe, ReentrancyGuardUpgradeSafe, OwnableUp
         require(!isExpired() || isSettled, "Must be called before expiry or after settlement");
         require(!isDisputePeriod(), "Dispute period");
         require(msg.sender == owner() || !isPaused, "Paused");
-        require(strikeIndex < strikePrices.length, "Index too large");
+        Config memory config = _loadConfig();
+        require(strikeIndex < config.numStrikes, "Index too large");
         require(optionsIn > 0, "Options in must be > 0");
 
         // burn user's options
-        OptionToken option = isLongToken ? longTokens[strikeIndex] : shortTokens[strikeIndex];
-        option.burn(msg.sender, optionsIn);
+        uint256 newSupply = _burnOptions(config, isLongToken, strikeIndex, optionsIn);
 
         // calculate amount that needs to be returned to user
         if (isSettled) {
             // if after settlement, amount is the option payoff
-            uint256 payoffAfter = getCurrentPayoff();
+            uint256 payoffAfter = _getCurrentPayoff(config);
             amountOut = lastPayoff.sub(payoffAfter);
             lastPayoff = payoffAfter;
         } else {
             // if before expiry, amount is the decrease in LMSR cost after burning the options
-            uint256 costAfter = getCurrentCost();
+            uint256 costAfter = _getCurrentCost(config);
             amountOut = lastCost.sub(costAfter);
             lastCost = costAfter;
         }
@@ -257,7 +295,7 @@ contract OptionMarket is ERC20UpgradeSafe, ReentrancyGuardUpgradeSafe, OwnableUp
 
         // transfer amount to user
         baseToken.uniTransfer(msg.sender, amountOut);
-        emit Sell(msg.sender, isLongToken, strikeIndex, optionsIn, amountOut, option.totalSupply(), isSettled);
+        emit Sell(msg.sender, isLongToken, strikeIndex, optionsIn, amountOut, newSupply, isSettled);
     }
 
     /**
@@ -272,15 +310,7 @@ contract OptionMarket is ERC20UpgradeSafe, ReentrancyGuardUpgradeSafe, OwnableUp
         require(msg.sender == owner() || !isPaused, "Paused");
         require(sharesOut > 0, "Shares out must be > 0");
 
-        // user needs to contribute proportional amount of fees to pool, which
-        // ensures they are only earning fees generated after they have deposited
-        if (totalSupply() > 0) {
-            // add 1 to round up
-            amountIn = poolValue.mul(sharesOut).div(totalSupply()).add(1);
-            poolValue = poolValue.add(amountIn);
-        }
-        _mint(msg.sender, sharesOut);
-        require(totalSupplyCap == 0 || totalSupply() <= totalSupplyCap, "Total supply cap exceeded");
+        amountIn = _mintShares(sharesOut);
 
         // need to add increase in LMSR cost after increasing b
         uint256 costAfter = getCurrentCost();
@@ -307,10 +337,7 @@ contract OptionMarket is ERC20UpgradeSafe, ReentrancyGuardUpgradeSafe, OwnableUp
         require(msg.sender == owner() || !isPaused, "Paused");
         require(sharesIn > 0, "Shares in must be > 0");
 
-        // calculate cut of fees earned by user
-        amountOut = poolValue.mul(sharesIn).div(totalSupply());
-        poolValue = poolValue.sub(amountOut);
-        _burn(msg.sender, sharesIn);
+        amountOut = _burnShares(sharesIn);
 
         // if before expiry, add decrease in LMSR cost after decreasing b
         if (!isSettled) {
@@ -326,6 +353,116 @@ contract OptionMarket is ERC20UpgradeSafe, ReentrancyGuardUpgradeSafe, OwnableUp
         emit Withdraw(msg.sender, sharesIn, amountOut, totalSupply(), isSettled);
     }
 
+    /**
+     * Buy options at several strikes and deposit liquidity in one transaction
+     *
+     * Same as calling `deposit` followed by `buy` for each nonzero amount, but
+     * the LMSR cost is only evaluated once and the total is transferred in
+     * once. `longOptionsOut` and `shortOptionsOut` are indexed by strike
+     *
+     * This method reverts if the resulting cost is greater than `maxAmountIn`
+     */
+    function buyMany(
+        uint256[] memory longOptionsOut,
+        uint256[] memory shortOptionsOut,
+        uint256 sharesOut,
+        uint256 maxAmountIn
+    ) external payable nonReentrant returns (uint256 amountIn) {
+        require(!isExpired(), "Already expired");
+        require(msg.sender == owner() || !isPaused, "Paused");
+        Config memory config = _loadConfig();
+        uint256 n = config.numStrikes;
+        require(longOptionsOut.length == n, "Lengths do not match");
+        require(shortOptionsOut.length == n, "Lengths do not match");
+
+        if (sharesOut > 0) {
+            amountIn = _mintShares(sharesOut);
+        }
+        require(totalSupply() > 0, "No liquidity");
+
+        // mint options to user and add up trading fees
+        uint256 fee;
+        for (uint256 i = 0; i < n; i++) {
+            if (longOptionsOut[i] > 0) {
+                _mintOptions(config, true, i, longOptionsOut[i]);
+                fee = fee.add(_calcFee(config, i, longOptionsOut[i]));
+            }
+            if (shortOptionsOut[i] > 0) {
+                _mintOptions(config, false, i, shortOptionsOut[i]);
+                fee = fee.add(_calcFee(config, i, shortOptionsOut[i]));
+            }
+        }
+        poolValue = poolValue.add(fee);
+
+        // increase in LMSR cost after minting options and increasing b
+        uint256 costAfter = _getCurrentCost(config);
+        amountIn = costAfter.sub(lastCost).add(fee).add(amountIn); // do sub first as a check since should not fail
+        lastCost = costAfter;
+        require(amountIn > 0, "Amount in must be > 0");
+        require(amountIn <= maxAmountIn, "Max slippage exceeded");
+
+        // transfer in amount from user
+        _transferIn(amountIn);
+        emit BuyMany(msg.sender, longOptionsOut, shortOptionsOut, sharesOut, amountIn);
+    }
+
+    /**
+     * Sell options at several strikes and withdraw liquidity in one transaction
+     *
+     * Same as calling `sell` for each nonzero amount followed by `withdraw`,
+     * but the LMSR cost or payoff is only evaluated once and the total is
+     * transferred out once. `longOptionsIn` and `shortOptionsIn` are indexed
+     * by strike
+     *
+     * This method reverts if the resulting amount returned is less than `minAmountOut`
+     */
+    function sellMany(
+        uint256[] memory longOptionsIn,
+        uint256[] memory shortOptionsIn,
+        uint256 sharesIn,
+        uint256 minAmountOut
+    ) external nonReentrant returns (uint256 amountOut) {
+        require(!isExpired() || isSettled, "Must be called before expiry or after settlement");
+        require(!isDisputePeriod(), "Dispute period");
+        require(msg.sender == owner() || !isPaused, "Paused");
+        Config memory config = _loadConfig();
+        uint256 n = config.numStrikes;
+        require(longOptionsIn.length == n, "Lengths do not match");
+        require(shortOptionsIn.length == n, "Lengths do not match");
+
+        // burn user's options
+        for (uint256 i = 0; i < n; i++) {
+            if (longOptionsIn[i] > 0) {
+                _burnOptions(config, true, i, longOptionsIn[i]);
+            }
+            if (shortOptionsIn[i] > 0) {
+                _burnOptions(config, false, i, shortOptionsIn[i]);
+            }
+        }
+
+        if (sharesIn > 0) {
+            amountOut = _burnShares(sharesIn);
+        }
+
+        if (isSettled) {
+            // if after settlement, add decrease in option payoff
+            uint256 payoffAfter = _getCurrentPayoff(config);
+            amountOut = lastPayoff.sub(payoffAfter).add(amountOut);
+            lastPayoff = payoffAfter;
+        } else {
+            // if before expiry, add decrease in LMSR cost after burning options and decreasing b
+            uint256 costAfter = _getCurrentCost(config);
+            amountOut = lastCost.sub(costAfter).add(amountOut);
+            lastCost = costAfter;
+        }
+        require(amountOut > 0, "Amount out must be > 0");
+        require(amountOut >= minAmountOut, "Max slippage exceeded");
+
+        // transfer amount to user
+        baseToken.uniTransfer(msg.sender, amountOut);
+        emit SellMany(msg.sender, longOptionsIn, shortOptionsIn, sharesIn, amountOut, isSettled);
+    }
+
     /**
      * Retrieve and store the underlying price from the oracle
      *
@@ -363,10 +500,7 @@ contract OptionMarket is ERC20UpgradeSafe, ReentrancyGuardUpgradeSafe, OwnableUp
      * option holders. Pool value is the fees earned by LPs.
      */
     function getCurrentCost() public view returns (uint256) {
-        uint256[] memory longSupplies = getTotalSupplies(longTokens);
-        uint256[] memory shortSupplies = getTotalSupplies(shortTokens);
-        uint256[] memory quantities = OptionMath.calcQuantities(strikePrices, isPut, longSupplies, shortSupplies);
-        return OptionMath.calcLmsrCost(quantities, totalSupply());
+        return _getCurrentCost(_loadConfig());
     }
 
     /**
@@ -383,9 +517,7 @@ contract OptionMarket is ERC20UpgradeSafe, ReentrancyGuardUpgradeSafe, OwnableUp
      * owed to LPs.
      */
     function getCurrentPayoff() public view returns (uint256) {
-        uint256[] memory longSupplies = getTotalSupplies(longTokens);
-        uint256[] memory shortSupplies = getTotalSupplies(shortTokens);
-        return OptionMath.calcPayoff(strikePrices, expiryPrice, isPut, longSupplies, shortSupplies);
+        return _getCurrentPayoff(_loadConfig());
     }
 
     function getTotalSupplies(OptionToken[] memory optionTokens) public view returns (uint256[] memory totalSupplies) {
@@ -404,7 +536,147 @@ contract OptionMarket is ERC20UpgradeSafe, ReentrancyGuardUpgradeSafe, OwnableUp
     }
 
     function numStrikes() external view returns (uint256) {
-        return strikePrices.length;
+        return _loadConfig().numStrikes;
+    }
+
+    /**
+     * Whether this market has `buyMany` and `sellMany`. Markets deployed
+     * before they were added don't have this method either, so callers
+     * should treat a failed call as false
+     */
+    function supportsBatchTrades() external pure virtual returns (bool) {
+        return true;
+    }
+
+    /**
+     * Mint options to sender and update stored total supply
+     */
+    function _mintOptions(
+        Config memory config,
+        bool isLongToken,
+        uint256 strikeIndex,
+        uint256 optionsOut
+    ) private returns (uint256 newSupply) {
+        OptionToken option = _getOptionToken(config, isLongToken, strikeIndex);
+        option.mint(msg.sender, optionsOut);
+        uint256[] storage supplies = isLongToken ? longSupplies : shortSupplies;
+        newSupply = supplies[strikeIndex].add(optionsOut);
+        supplies[strikeIndex] = newSupply;
+    }
+
+    /**
+     * Burn sender's options and update stored total supply
+     */
+    function _burnOptions(
+        Config memory config,
+        bool isLongToken,
+        uint256 strikeIndex,
+        uint256 optionsIn
+    ) private returns (uint256 newSupply) {
+        OptionToken option = _getOptionToken(config, isLongToken, strikeIndex);
+        option.burn(msg.sender, optionsIn);
+        uint256[] storage supplies = isLongToken ? longSupplies : shortSupplies;
+        newSupply = supplies[strikeIndex].sub(optionsIn);
+        supplies[strikeIndex] = newSupply;
+    }
+
+    /**
+     * Trading fee for buying options. Like LMSR cost, fees have to be
+     * multiplied by strike price for puts
+     */
+    function _calcFee(
+        Config memory config,
+        uint256 strikeIndex,
+        uint256 optionsOut
+    ) private view returns (uint256 fee) {
+        fee = optionsOut.mul(tradingFee);
+        fee = isPut ? fee.mul(_getStrikePrice(config, strikeIndex)).div(SCALE_SCALE) : fee.div(SCALE);
+    }
+
+    function _getCurrentCost(Config memory config) private view returns (uint256) {
+        // storage arrays are copied to memory since calcQuantities mutates them
+        uint256[] memory quantities =
+            OptionMath.calcQuantities(_getStrikePrices(config), isPut, longSupplies, shortSupplies);
+        return OptionMath.calcLmsrCost(quantities, totalSupply());
+    }
+
+    function _getCurrentPayoff(Config memory config) private view returns (uint256) {
+        return OptionMath.calcPayoff(_getStrikePrices(config), expiryPrice, isPut, longSupplies, shortSupplies);
+    }
+
+    /**
+     * Whether this contract is a clone with the number of strikes, strike
+     * prices, long tokens and short tokens appended to its code in that order
+     */
+    function _isImmutableConfig(
+        uint256[] memory _strikePrices,
+        address[] memory _longTokens,
+        address[] memory _shortTokens
+    ) private view returns (bool) {
+        return CloneWithData.hasData(abi.encodePacked(_strikePrices.length, _strikePrices, _longTokens, _shortTokens));
+    }
+
+    /**
+     * Number of strikes and strike prices and option tokens are read from the
+     * clone's code if appended, otherwise from storage
+     */
+    function _loadConfig() private view returns (Config memory config) {
+        config.isImmutable = hasImmutableConfig;
+        config.numStrikes = config.isImmutable ? CloneWithData.readUint256(0) : strikePrices.length;
+    }
+
+    function _getStrikePrices(Config memory config) private view returns (uint256[] memory) {
+        if (config.isImmutable) {
+            return CloneWithData.readUint256Array(32, config.numStrikes);
+        }
+        return strikePrices;
+    }
+
+    function _getStrikePrice(Config memory config, uint256 strikeIndex) private view returns (uint256) {
+        if (config.isImmutable) {
+            return CloneWithData.readUint256(strikeIndex.add(1).mul(32));
+        }
+        return strikePrices[strikeIndex];
+    }
+
+    function _getOptionToken(
+        Config memory config,
+        bool isLongToken,
+        uint256 strikeIndex
+    ) private view returns (OptionToken) {
+        if (config.isImmutable) {
+            uint256 n = config.numStrikes;
+            uint256 offset = isLongToken ? n.add(1).add(strikeIndex) : n.mul(2).add(1).add(strikeIndex);
+            return OptionToken(address(uint160(CloneWithData.readUint256(offset.mul(32)))));
+        }
+        return isLongToken ? longTokens[strikeIndex] : shortTokens[strikeIndex];
+    }
+
+    /**
+     * Mint LP shares to sender and add their contribution to the pool value
+     *
+     * User needs to contribute proportional amount of fees to pool, which
+     * ensures they are only earning fees generated after they have deposited.
+     * Returns this contribution, which excludes the increase in LMSR cost
+     */
+    function _mintShares(uint256 sharesOut) private returns (uint256 amountIn) {
+        if (totalSupply() > 0) {
+            // add 1 to round up
+            amountIn = poolValue.mul(sharesOut).div(totalSupply()).add(1);
+            poolValue = poolValue.add(amountIn);
+        }
+        _mint(msg.sender, sharesOut);
+        require(totalSupplyCap == 0 || totalSupply() <= totalSupplyCap, "Total supply cap exceeded");
+    }
+
+    /**
+     * Burn sender's LP shares and return their cut of fees earned, which
+     * excludes the decrease in LMSR cost
+     */
+    function _burnShares(uint256 sharesIn) private returns (uint256 amountOut) {
+        amountOut = poolValue.mul(sharesIn).div(totalSupply());
+        poolValue = poolValue.sub(amountOut);
+        _burn(msg.sender, sharesIn);
     }
 
     /**
@@ -12,6 +12,12 @@ library OptionMath {
 
     uint256 public constant SCALE = 1e18;
 
+    // 45 * log2(e) > 64
+    uint256 private constant EXP_UNDERFLOW = 45;
+
+    // divu reverts when the result doesn't fit in a signed 64.64 number
+    uint256 private constant DIVU_OVERFLOW = 1 << 63;
+
     /**
      * Converts total supplies of options into the tokenized payoff quantities used
      * by the LMSR
@@ -85,15 +91,33 @@ library OptionMath {
         }
 
         int128 sumExp;
+        int128 exp;
         for (uint256 i = 0; i < quantities.length; i++) {
+            // strikes without any options leave adjacent quantities equal, so
+            // the previous term can be reused. in markets with many strikes
+            // this skips most of the exp evaluations
+            if (i > 0 && quantities[i] == quantities[i - 1]) {
+                sumExp = ABDKMath64x64.add(sumExp, exp);
+                continue;
+            }
+
             // max(q) - q_i
             uint256 diff = maxQuantity.sub(quantities[i]);
 
+            // exp underflows to exactly 0 when (max(q) - q_i) / b >= 45, since
+            // exp(-x) = exp_2(-x * log2(e)) and exp_2 returns 0 below -64, so
+            // skip the term. it's still checked that divu would not revert
+            if (diff / b >= EXP_UNDERFLOW) {
+                require(diff / b < DIVU_OVERFLOW);
+                exp = 0;
+                continue;
+            }
+
             // (max(q) - q_i) / b
             int128 div = ABDKMath64x64.divu(diff, b);
 
             // exp((q_i - max(q)) / b)
-            int128 exp = ABDKMath64x64.exp(ABDKMath64x64.neg(div));
+            exp = ABDKMath64x64.exp(ABDKMath64x64.neg(div));
             sumExp = ABDKMath64x64.add(sumExp, exp);
         }
 
@@ -0,0 +1,77 @@
+// SPDX-License-Identifier: MIT
+
+pragma solidity ^0.6.12;
+
+/**
+ * EIP-1167 minimal proxies with immutable data appended to their code
+ *
+ * The proxy returns or reverts before reaching the appended data, so it's
+ * never executed. Since the implementation runs via delegatecall, its own
+ * code is the implementation's and not the proxy's, so the data is read with
+ * `extcodecopy` on `address(this)` rather than `codecopy`
+ */
+library CloneWithData {
+    // size of the minimal proxy runtime code before the data
+    uint256 internal constant PROXY_SIZE = 0x2d;
+
+    function createClone(address target, bytes memory data) internal returns (address result) {
+        uint256 runtimeSize = PROXY_SIZE + data.length;
+        require(runtimeSize <= 0xffff, "Data too long");
+
+        // same as `CloneFactory.createClone` except the runtime size is a
+        // PUSH2 instead of PUSH1, which moves the runtime code to offset 0x0b
+        bytes memory code =
+            abi.encodePacked(
+                hex"3d61",
+                uint16(runtimeSize),
+                hex"80600b3d3981f3363d3d373d3d3d363d73",
+                target,
+                hex"5af43d82803e903d91602b57fd5bf3",
+                data
+            );
+        assembly {
+            result := create(0, add(code, 0x20), mload(code))
+        }
+        require(result != address(0), "Create failed");
+    }
+
+    /**
+     * Size of data appended to this contract's code. Only meaningful when
+     * called from an implementation behind a clone created above
+     */
+    function dataSize() internal view returns (uint256 size) {
+        assembly {
+            size := extcodesize(address())
+        }
+        size = size > PROXY_SIZE ? size - PROXY_SIZE : 0;
+    }
+
+    /**
+     * Whether this contract is a clone with exactly `data` appended
+     */
+    function hasData(bytes memory data) internal view returns (bool) {
+        if (dataSize() != data.length) {
+            return false;
+        }
+        bytes memory code = new bytes(data.length);
+        assembly {
+            extcodecopy(address(), add(code, 0x20), 0x2d, mload(data))
+        }
+        return keccak256(code) == keccak256(data);
+    }
+
+    function readUint256(uint256 offset) internal view returns (uint256 value) {
+        assembly {
+            let ptr := mload(0x40)
+            extcodecopy(address(), ptr, add(0x2d, offset), 0x20)
+            value := mload(ptr)
+        }
+    }
+
+    function readUint256Array(uint256 offset, uint256 length) internal view returns (uint256[] memory values) {
+        values = new uint256[](length);
+        assembly {
+            extcodecopy(address(), add(values, 0x20), add(0x2d, offset), mul(length, 0x20))
+        }
+    }
+}
@@ -0,0 +1,16 @@
+// SPDX-License-Identifier: MIT
+
+pragma solidity ^0.6.12;
+
+import "../OptionMarket.sol";
+
+/**
+ * `OptionMarket` that reports not having `buyMany` and `sellMany`, like
+ * markets deployed before they were added, for testing callers that fall
+ * back to trading each leg separately
+ */
+contract MockLegacyOptionMarket is OptionMarket {
+    function supportsBatchTrades() external pure override returns (bool) {
+        return false;
+    }
+}
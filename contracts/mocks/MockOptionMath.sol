@@ -0,0 +1,90 @@
+// SPDX-License-Identifier: MIT
+
+pragma solidity ^0.6.12;
+pragma experimental ABIEncoderV2;
+
+import "../OptionMath.sol";
+
+/**
+ * Exposes `OptionMath` for testing
+ *
+ * The batch methods evaluate many cases in one call. Each case is called
+ * through this contract so a revert only fails that case, which is returned
+ * as `success[i] = false`
+ */
+contract MockOptionMath {
+    function calcQuantities(
+        uint256[] memory strikePrices,
+        bool isPut,
+        uint256[] memory longSupplies,
+        uint256[] memory shortSupplies
+    ) public pure returns (uint256[] memory) {
+        return OptionMath.calcQuantities(strikePrices, isPut, longSupplies, shortSupplies);
+    }
+
+    function calcLmsrCost(uint256[] memory quantities, uint256 b) public pure returns (uint256) {
+        return OptionMath.calcLmsrCost(quantities, b);
+    }
+
+    function calcPayoff(
+        uint256[] memory strikePrices,
+        uint256 expiryPrice,
+        bool isPut,
+        uint256[] memory longSupplies,
+        uint256[] memory shortSupplies
+    ) public pure returns (uint256) {
+        return OptionMath.calcPayoff(strikePrices, expiryPrice, isPut, longSupplies, shortSupplies);
+    }
+
+    function calcQuantitiesBatch(
+        uint256[][] memory strikePrices,
+        bool[] memory isPut,
+        uint256[][] memory longSupplies,
+        uint256[][] memory shortSupplies
+    ) external view returns (bool[] memory success, uint256[][] memory quantities) {
+        success = new bool[](strikePrices.length);
+        quantities = new uint256[][](strikePrices.length);
+        for (uint256 i = 0; i < strikePrices.length; i++) {
+            try this.calcQuantities(strikePrices[i], isPut[i], longSupplies[i], shortSupplies[i]) returns (
+                uint256[] memory result
+            ) {
+                success[i] = true;
+                quantities[i] = result;
+            } catch {}
+        }
+    }
+
+    function calcLmsrCostBatch(uint256[][] memory quantities, uint256[] memory b)
+        external
+        view
+        returns (bool[] memory success, uint256[] memory costs)
+    {
+        success = new bool[](quantities.length);
+        costs = new uint256[](quantities.length);
+        for (uint256 i = 0; i < quantities.length; i++) {
+            try this.calcLmsrCost(quantities[i], b[i]) returns (uint256 result) {
+                success[i] = true;
+                costs[i] = result;
+            } catch {}
+        }
+    }
+
+    function calcPayoffBatch(
+        uint256[][] memory strikePrices,
+        uint256[] memory expiryPrices,
+        bool[] memory isPut,
+        uint256[][] memory longSupplies,
+        uint256[][] memory shortSupplies
+    ) external view returns (bool[] memory success, uint256[] memory payoffs) {
+        success = new bool[](strikePrices.length);
+        payoffs = new uint256[](strikePrices.length);
+        for (uint256 i = 0; i < strikePrices.length; i++) {
+            try this.calcPayoff(strikePrices[i], expiryPrices[i], isPut[i], longSupplies[i], shortSupplies[i]) returns (
+                uint256 result
+            ) {
+                success[i] = true;
+                payoffs[i] = result;
+            } catch {}
+        }
+    }
+}
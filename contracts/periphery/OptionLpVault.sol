@@ -127,23 +127,32 @@ contract OptionLpVault is Ownable, ReentrancyGuard, ERC20 {
         require(msg.sender == manager, "!manager");
         require(marketAdded[market], "Market not found");
 
-        uint256 balanceBefore = baseToken.uniBalanceOf(address(this));
-        if (lpSharesOut > 0) {
-            uint256 balance = baseToken.uniBalanceOf(address(this));
-            uint256 value = baseToken.isETH() ? balance : 0;
-            market.deposit{value: value}(lpSharesOut, balance);
+        if (_isEmpty(longOptionsOut, shortOptionsOut, lpSharesOut)) {
+            return 0;
         }
 
-        for (uint256 i = 0; i < market.numStrikes(); i = i.add(1)) {
-            if (longOptionsOut[i] > 0) {
+        uint256 balanceBefore = baseToken.uniBalanceOf(address(this));
+        if (_supportsMany(market)) {
+            uint256 value = baseToken.isETH() ? balanceBefore : 0;
+            market.buyMany{value: value}(longOptionsOut, shortOptionsOut, lpSharesOut, balanceBefore);
+        } else {
+            if (lpSharesOut > 0) {
                 uint256 balance = baseToken.uniBalanceOf(address(this));
                 uint256 value = baseToken.isETH() ? balance : 0;
-                market.buy{value: value}(true, i, longOptionsOut[i], balance);
+                market.deposit{value: value}(lpSharesOut, balance);
             }
-            if (shortOptionsOut[i] > 0) {
-                uint256 balance = baseToken.uniBalanceOf(address(this));
-                uint256 value = baseToken.isETH() ? balance : 0;
-                market.buy{value: value}(false, i, shortOptionsOut[i], balance);
+
+            for (uint256 i = 0; i < market.numStrikes(); i = i.add(1)) {
+                if (longOptionsOut[i] > 0) {
+                    uint256 balance = baseToken.uniBalanceOf(address(this));
+                    uint256 value = baseToken.isETH() ? balance : 0;
+                    market.buy{value: value}(true, i, longOptionsOut[i], balance);
+                }
+                if (shortOptionsOut[i] > 0) {
+                    uint256 balance = baseToken.uniBalanceOf(address(this));
+                    uint256 value = baseToken.isETH() ? balance : 0;
+                    market.buy{value: value}(false, i, shortOptionsOut[i], balance);
+                }
             }
         }
 
@@ -167,18 +176,26 @@ contract OptionLpVault is Ownable, ReentrancyGuard, ERC20 {
         require(msg.sender == manager, "!manager");
         require(marketAdded[market], "Market not found");
 
+        if (_isEmpty(longOptionsIn, shortOptionsIn, lpSharesIn)) {
+            return 0;
+        }
+
         uint256 balanceBefore = baseToken.uniBalanceOf(address(this));
-        for (uint256 i = 0; i < market.numStrikes(); i = i.add(1)) {
-            if (longOptionsIn[i] > 0) {
-                market.sell(true, i, longOptionsIn[i], 0);
-            }
-            if (shortOptionsIn[i] > 0) {
-                market.sell(false, i, shortOptionsIn[i], 0);
+        if (_supportsMany(market)) {
+            market.sellMany(longOptionsIn, shortOptionsIn, lpSharesIn, 0);
+        } else {
+            for (uint256 i = 0; i < market.numStrikes(); i = i.add(1)) {
+                if (longOptionsIn[i] > 0) {
+                    market.sell(true, i, longOptionsIn[i], 0);
+                }
+                if (shortOptionsIn[i] > 0) {
+                    market.sell(false, i, shortOptionsIn[i], 0);
+                }
             }
-        }
 
-        if (lpSharesIn > 0) {
-            market.withdraw(lpSharesIn, 0);
+            if (lpSharesIn > 0) {
+                market.withdraw(lpSharesIn, 0);
+            }
         }
 
         uint256 balanceAfter = baseToken.uniBalanceOf(address(this));
@@ -186,6 +203,37 @@ contract OptionLpVault is Ownable, ReentrancyGuard, ERC20 {
         require(amountOut >= minAmountOut, "Max slippage exceeded");
     }
 
+    /**
+     * Whether the market has `buyMany` and `sellMany`. Calling
+     * `supportsBatchTrades` fails for markets deployed before they were added
+     */
+    function _supportsMany(OptionMarket market) internal view returns (bool) {
+        (bool success, bytes memory data) =
+            address(market).staticcall(abi.encodeWithSignature("supportsBatchTrades()"));
+        return success && data.length == 32 && abi.decode(data, (bool));
+    }
+
+    function _isEmpty(
+        uint256[] memory longOptions,
+        uint256[] memory shortOptions,
+        uint256 lpShares
+    ) internal pure returns (bool) {
+        if (lpShares > 0) {
+            return false;
+        }
+        for (uint256 i = 0; i < longOptions.length; i = i.add(1)) {
+            if (longOptions[i] > 0) {
+                return false;
+            }
+        }
+        for (uint256 i = 0; i < shortOptions.length; i = i.add(1)) {
+            if (shortOptions[i] > 0) {
+                return false;
+            }
+        }
+        return true;
+    }
+
     /**
      * Get value of vault holdings if all options and lp tokens were sold back
      * into base tokens
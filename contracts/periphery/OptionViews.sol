@@ -14,6 +14,20 @@ contract OptionViews {
     using SafeERC20 for IERC20;
     using SafeMath for uint256;
 
+    uint256 public constant SCALE = 1e18;
+    uint256 public constant SCALE_SCALE = 1e36;
+
+    struct LadderState {
+        uint256[] strikePrices;
+        bool isPut;
+        uint256 tradingFee;
+        uint256 lpSupply;
+        uint256[] longSupplies;
+        uint256[] shortSupplies;
+        uint256[] quantities;
+        uint256 costBefore;
+    }
+
     function getBuyOptionCost(
         OptionMarket market,
         bool isLongToken,
@@ -54,6 +68,40 @@ contract OptionViews {
         return getSellCost(market, longOptionsIn, shortOptionsIn, lpSharesIn);
     }
 
+    /**
+     * Returns cost of buying and selling `amount` of every long and short
+     * token in the market. Sells of more than the total supply of a token are
+     * quoted as 0
+     *
+     * Market state is only read once and the LMSR cost before the trade is
+     * shared between all quotes
+     */
+    function getQuoteLadder(OptionMarket market, uint256 amount)
+        external
+        view
+        returns (
+            uint256[] memory longBuyCosts,
+            uint256[] memory shortBuyCosts,
+            uint256[] memory longSellCosts,
+            uint256[] memory shortSellCosts
+        )
+    {
+        require(!market.isExpired(), "Already expired");
+        LadderState memory state = _getLadderState(market);
+
+        uint256 n = state.strikePrices.length;
+        longBuyCosts = new uint256[](n);
+        shortBuyCosts = new uint256[](n);
+        longSellCosts = new uint256[](n);
+        shortSellCosts = new uint256[](n);
+        for (uint256 i = 0; i < n; i++) {
+            longBuyCosts[i] = _getLadderCost(state, true, i, amount, true);
+            shortBuyCosts[i] = _getLadderCost(state, false, i, amount, true);
+            longSellCosts[i] = _getLadderCost(state, true, i, amount, false);
+            shortSellCosts[i] = _getLadderCost(state, false, i, amount, false);
+        }
+    }
+
     function getBuyCost(
         OptionMarket market,
         uint256[] memory longOptionsOut,
@@ -146,6 +194,76 @@ contract OptionViews {
         }
     }
 
+    function _getLadderState(OptionMarket market) internal view returns (LadderState memory state) {
+        state.strikePrices = getStrikePrices(market);
+        state.isPut = market.isPut();
+        state.tradingFee = market.tradingFee();
+        state.lpSupply = market.totalSupply();
+        state.longSupplies = getLongSupplies(market);
+        state.shortSupplies = getShortSupplies(market);
+
+        // copy since calcQuantities mutates supplies for puts
+        uint256 n = state.strikePrices.length;
+        uint256[] memory longSupplies = new uint256[](n);
+        uint256[] memory shortSupplies = new uint256[](n);
+        for (uint256 i = 0; i < n; i++) {
+            longSupplies[i] = state.longSupplies[i];
+            shortSupplies[i] = state.shortSupplies[i];
+        }
+        state.quantities = OptionMath.calcQuantities(state.strikePrices, state.isPut, longSupplies, shortSupplies);
+        state.costBefore = OptionMath.calcLmsrCost(state.quantities, state.lpSupply);
+    }
+
+    /**
+     * Cost of buying or amount received from selling a single leg
+     *
+     * Instead of recalculating all quantities, only the ones that include
+     * the token's supply are shifted. For left tokens, i.e. calls for long
+     * and puts for short, these are quantities[i + 1:], otherwise they are
+     * quantities[:i + 1]
+     */
+    function _getLadderCost(
+        LadderState memory state,
+        bool isLongToken,
+        uint256 strikeIndex,
+        uint256 amount,
+        bool isBuy
+    ) internal pure returns (uint256) {
+        uint256 supply = (isLongToken ? state.longSupplies : state.shortSupplies)[strikeIndex];
+        if (!isBuy && supply < amount) {
+            return 0;
+        }
+        uint256 supplyAfter = isBuy ? supply.add(amount) : supply.sub(amount);
+
+        // scale the same way as calcQuantities so results match exactly
+        uint256 delta = amount;
+        uint256 strike = state.strikePrices[strikeIndex];
+        if (state.isPut) {
+            uint256 scaledBefore = supply.mul(strike).div(SCALE);
+            uint256 scaledAfter = supplyAfter.mul(strike).div(SCALE);
+            delta = isBuy ? scaledAfter.sub(scaledBefore) : scaledBefore.sub(scaledAfter);
+        }
+
+        uint256 n = state.quantities.length;
+        bool isLeft = isLongToken != state.isPut;
+        uint256[] memory quantities = new uint256[](n);
+        for (uint256 j = 0; j < n; j++) {
+            quantities[j] = state.quantities[j];
+            if (isLeft ? j > strikeIndex : j <= strikeIndex) {
+                quantities[j] = isBuy ? quantities[j].add(delta) : quantities[j].sub(delta);
+            }
+        }
+        uint256 costAfter = OptionMath.calcLmsrCost(quantities, state.lpSupply);
+        if (!isBuy) {
+            return state.costBefore.sub(costAfter);
+        }
+
+        // same as fee in OptionMarket.buy
+        uint256 fee = amount.mul(state.tradingFee);
+        fee = state.isPut ? fee.mul(strike).div(SCALE_SCALE) : fee.div(SCALE);
+        return costAfter.add(fee).sub(state.costBefore);
+    }
+
     function _getLmsrCost(
         OptionMarket market,
         uint256[] memory longSupplies,
@@ -0,0 +1,306 @@
+"""
+Implied distribution and greeks of `OptionMarket` states
+
+The LMSR prices of a market are the probabilities of the expiry price landing
+in each of the n + 1 buckets between strikes, in the same order as the
+quantities built by `OptionMath.calcQuantities`. From these, options are
+valued by placing each bucket's probability at a representative price: the
+geometric midpoint of its two strikes, or half a strike spacing beyond the
+outermost strikes for the tails.
+
+Implied volatilities are found by inverting Black-Scholes with zero interest
+rate, and delta and gamma are the Black-Scholes greeks at the implied
+volatility.
+
+All markets are padded to the same number of strikes and processed together,
+so there are no loops over strikes or markets apart from reading their state.
+Results are floats with NaN in padded entries.
+
+Usage:
+>> surface = analytics.surface(markets, spot_prices, chain.time())
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+from scripts import lmsr
+
+
+SCALE = 1e18
+SECONDS_PER_YEAR = 365 * 24 * 3600
+
+# ratio between the tail and outermost strike for markets with a single strike
+TAIL_RATIO = 1.25
+
+# search range and iterations for implied volatility bisection
+MIN_VOLATILITY = 1e-4
+MAX_VOLATILITY = 20.0
+VOLATILITY_ITERATIONS = 60
+
+
+MarketBatch = namedtuple(
+    "MarketBatch",
+    ["strikes", "quantities", "b", "is_put", "expiry_times", "num_strikes"],
+)
+
+Surface = namedtuple(
+    "Surface",
+    [
+        "probabilities",
+        "long_values",
+        "short_values",
+        "implied_vols",
+        "long_deltas",
+        "short_deltas",
+        "long_gammas",
+        "short_gammas",
+    ],
+)
+
+
+def load_markets(markets):
+    """
+    Pad state of `OptionMarketSim` instances into arrays of shape
+    (markets, strikes) and (markets, strikes + 1)
+
+    Quantities are calculated with prefix sums in the same way as
+    `OptionMath.calcQuantities` but in floating point
+    """
+    num_strikes = np.array([len(market.strike_prices) for market in markets])
+    shape = (len(markets), num_strikes.max())
+
+    strikes = np.full(shape, np.nan)
+    longs = np.zeros(shape)
+    shorts = np.zeros(shape)
+    for k, market in enumerate(markets):
+        n = num_strikes[k]
+        strikes[k, :n] = market.strike_prices
+        longs[k, :n] = market.long_supplies
+        shorts[k, :n] = market.short_supplies
+    strikes /= SCALE
+    is_put = np.array([market.is_put for market in markets])
+
+    # for puts, swap long and short and multiply by strike price
+    multiplier = np.where(is_put[:, None], np.nan_to_num(strikes), 1.0)
+    left = np.where(is_put[:, None], shorts, longs) * multiplier
+    right = np.where(is_put[:, None], longs, shorts) * multiplier
+
+    q0 = right.sum(axis=1, keepdims=True)
+    quantities = np.concatenate([q0, q0 + np.cumsum(left - right, axis=1)], axis=1)
+
+    # padded buckets have zero probability
+    is_padded = np.arange(shape[1] + 1) > num_strikes[:, None]
+    quantities[is_padded] = -np.inf
+
+    return MarketBatch(
+        strikes=strikes,
+        quantities=quantities,
+        b=np.array([float(market.total_supply) for market in markets]),
+        is_put=is_put,
+        expiry_times=np.array([market.expiry_time for market in markets]),
+        num_strikes=num_strikes,
+    )
+
+
+def bucket_probabilities(batch):
+    """
+    Probability of the expiry price being in each bucket. Shape is
+    (markets, strikes + 1)
+    """
+    probabilities, _ = lmsr.prices(batch.quantities, batch.b)
+    return probabilities
+
+
+def bucket_prices(batch):
+    """
+    Representative expiry price of each bucket. Padded buckets are 0 so they
+    don't contribute to expected values
+    """
+    strikes = batch.strikes
+    rows = np.arange(len(strikes))
+    last = batch.num_strikes - 1
+    first_strike = strikes[:, 0]
+    last_strike = strikes[rows, last]
+
+    # half a strike spacing in log space beyond the outermost strikes
+    has_spacing = batch.num_strikes > 1
+    with np.errstate(invalid="ignore"):
+        lower_ratio = np.where(
+            has_spacing,
+            np.sqrt(strikes[:, 1 % strikes.shape[1]] / first_strike),
+            TAIL_RATIO,
+        )
+        upper_ratio = np.where(
+            has_spacing,
+            np.sqrt(last_strike / strikes[rows, np.maximum(last - 1, 0)]),
+            TAIL_RATIO,
+        )
+
+    prices = np.zeros((len(strikes), strikes.shape[1] + 1))
+    prices[:, 0] = first_strike / lower_ratio
+    prices[:, 1:-1] = np.sqrt(strikes[:, :-1] * strikes[:, 1:])
+    prices[rows, last + 1] = last_strike * upper_ratio
+    return np.nan_to_num(prices)
+
+
+def fair_values(batch, probabilities=None):
+    """
+    Expected payoff of long and short options under the implied distribution
+
+    As in `OptionMath.calcPayoff`, calls are valued in terms of the underlying
+    and puts in terms of the quote token. Shape of each is (markets, strikes)
+    """
+    if probabilities is None:
+        probabilities = bucket_probabilities(batch)
+    prices = bucket_prices(batch)[:, None, :]
+    strikes = np.nan_to_num(batch.strikes)[:, :, None]
+    p = probabilities[:, None, :]
+
+    # calls pay (S - K) / S and covered calls pay min(S, K) / S
+    with np.errstate(divide="ignore", invalid="ignore"):
+        call = np.where(prices > 0, np.maximum(prices - strikes, 0.0) / prices, 0.0)
+    call = (p * call).sum(axis=2)
+
+    # puts pay K - S and cash-secured puts pay min(S, K)
+    put = (p * np.maximum(strikes - prices, 0.0)).sum(axis=2)
+
+    is_put = batch.is_put[:, None]
+    long_values = np.where(is_put, put, call)
+    short_values = np.where(is_put, batch.strikes - put, 1.0 - call)
+    return _mask(batch, long_values), _mask(batch, short_values)
+
+
+def surface(markets, spot_prices, timestamp):
+    """
+    Calculate probabilities, fair values, implied volatilities and greeks for
+    a list of `OptionMarketSim` instances
+
+    `spot_prices` are the current prices of each market's underlying and
+    `timestamp` is the current time. Deltas and gammas are with respect to the
+    spot price and in terms of the quote token
+    """
+    batch = load_markets(markets)
+    spot = np.asarray(spot_prices, dtype=float)[:, None]
+    tau = np.maximum(batch.expiry_times - timestamp, 0) / SECONDS_PER_YEAR
+    tau = tau[:, None]
+
+    probabilities = bucket_probabilities(batch)
+    long_values, short_values = fair_values(batch, probabilities)
+
+    # value of calls in terms of the quote token
+    premiums = np.where(batch.is_put[:, None], long_values, spot * long_values)
+    vols = implied_vols(premiums, spot, batch.strikes, tau, batch.is_put[:, None])
+    delta, gamma = black_scholes_greeks(spot, batch.strikes, vols, tau)
+
+    # puts have delta N(d1) - 1. short options are long S or K minus the long
+    # option, so have opposite gamma
+    long_deltas = np.where(batch.is_put[:, None], delta - 1.0, delta)
+    short_deltas = np.where(batch.is_put[:, None], -long_deltas, 1.0 - long_deltas)
+
+    return Surface(
+        probabilities=probabilities,
+        long_values=long_values,
+        short_values=short_values,
+        implied_vols=vols,
+        long_deltas=long_deltas,
+        short_deltas=short_deltas,
+        long_gammas=gamma,
+        short_gammas=-gamma,
+    )
+
+
+def black_scholes(spot, strikes, vols, tau, is_put):
+    """
+    Black-Scholes option prices with zero interest rate
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        d1, d2 = _d1_d2(spot, strikes, vols, tau)
+    call = spot * _norm_cdf(d1) - strikes * _norm_cdf(d2)
+    return np.where(is_put, call - spot + strikes, call)
+
+
+def black_scholes_greeks(spot, strikes, vols, tau):
+    """
+    Delta of calls and gamma of calls and puts
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        d1, _ = _d1_d2(spot, strikes, vols, tau)
+        gamma = np.exp(-0.5 * d1 * d1) / (
+            np.sqrt(2 * np.pi) * spot * vols * np.sqrt(tau)
+        )
+    return _norm_cdf(d1), gamma
+
+
+def implied_vols(premiums, spot, strikes, tau, is_put):
+    """
+    Invert Black-Scholes by bisection on all options at once. Returns NaN for
+    premiums outside the no-arbitrage bounds
+    """
+    shape = np.broadcast(premiums, spot, strikes, tau, is_put).shape
+    lo = np.full(shape, MIN_VOLATILITY)
+    hi = np.full(shape, MAX_VOLATILITY)
+
+    # premium is increasing in volatility
+    for _ in range(VOLATILITY_ITERATIONS):
+        mid = 0.5 * (lo + hi)
+        is_low = black_scholes(spot, strikes, mid, tau, is_put) < premiums
+        lo = np.where(is_low, mid, lo)
+        hi = np.where(is_low, hi, mid)
+    vols = 0.5 * (lo + hi)
+
+    lower = black_scholes(spot, strikes, MIN_VOLATILITY, tau, is_put)
+    upper = black_scholes(spot, strikes, MAX_VOLATILITY, tau, is_put)
+    is_valid = (premiums > lower) & (premiums < upper)
+    return np.where(is_valid, vols, np.nan)
+
+
+def _d1_d2(spot, strikes, vols, tau):
+    vol = vols * np.sqrt(tau)
+    d1 = (np.log(spot / strikes) + 0.5 * vol * vol) / vol
+    return d1, d1 - vol
+
+
+def _norm_cdf(x):
+    """
+    Standard normal CDF using the complementary error function approximation
+    from Numerical Recipes, which has relative error below 1.2e-7
+    """
+    z = np.abs(x) / np.sqrt(2.0)
+    t = 1.0 / (1.0 + 0.5 * z)
+    poly = (
+        -z * z
+        - 1.26551223
+        + t
+        * (
+            1.00002368
+            + t
+            * (
+                0.37409196
+                + t
+                * (
+                    0.09678418
+                    + t
+                    * (
+                        -0.18628806
+                        + t
+                        * (
+                            0.27886807
+                            + t
+                            * (
+                                -1.13520398
+                                + t * (1.48851587 + t * (-0.82215223 + t * 0.17087277))
+                            )
+                        )
+                    )
+                )
+            )
+        )
+    )
+    tail = 0.5 * t * np.exp(poly)
+    return np.where(x >= 0, 1.0 - tail, tail)
+
+
+def _mask(batch, values):
+    is_padded = np.arange(values.shape[1]) >= batch.num_strikes[:, None]
+    return np.where(is_padded, np.nan, values)
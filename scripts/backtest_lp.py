@@ -0,0 +1,333 @@
+"""
+Monte Carlo backtest of LP returns for a market with the strikes, fee and caps
+configured in `create_markets.py`
+
+Simulates the underlying price with either geometric brownian motion or by
+bootstrapping historical returns, runs synthetic order flow against an
+`OptionMarketSim` along each path and records the profit and loss of a single
+LP who deposits at the start and withdraws after settlement.
+
+Order flow consists of noise traders, who buy and sell random options, and
+informed traders, who buy the option that is cheapest relative to its fair
+value under a lognormal model when the edge is larger than the trading fee.
+Fair values use the same Black-Scholes pricing as `analytics.py`.
+
+The expiry date is passed as an argument and defaults to `EXPIRY_DAYS` after
+the start date.
+
+Paths are simulated in parallel across a process pool and results are
+written to `OUTPUT_PATH` as they arrive. A summary of the P&L distribution
+and the worst-case loss is printed at the end.
+
+Usage:
+>> brownie run backtest_lp
+>> brownie run backtest_lp main "25 Jun 2021"
+"""
+
+import csv
+from math import sqrt
+from multiprocessing import Pool
+
+import arrow
+import numpy as np
+
+from scripts import lmsr
+from scripts.analytics import black_scholes
+from scripts.create_markets import (
+    BASE_TOKEN,
+    DISPUTE_PERIOD,
+    EXPIRY_TIME,
+    LP_CAPS,
+    QUOTE_TOKEN,
+    SCALE,
+    STRIKE_PRICES,
+    TRADING_FEE,
+    TVL_CAPS,
+)
+from scripts.market_sim import OptionMarketSim
+from scripts.option_math import Revert, calc_quantities
+
+
+# simulation parameters
+IS_PUT = False
+NUM_PATHS = 10000
+PROCESSES = None  # defaults to number of cpus
+OUTPUT_PATH = "backtest_lp.csv"
+SEED = 0
+
+# date from which market is live. defaults to now
+START_DATE = None
+
+# days from start to expiry if no expiry date is given
+EXPIRY_DAYS = 28
+
+# "gbm" or "bootstrap"
+PRICE_MODEL = "gbm"
+SPOT_PRICE = 40000
+VOLATILITY = 0.9  # annualized
+
+# for bootstrap, file with one historical price per line, spaced STEP_HOURS apart
+PRICE_HISTORY_PATH = "prices.csv"
+
+STEP_HOURS = 4
+TRADES_PER_STEP = 2.0  # mean of poisson distribution
+TRADE_SIZE = 0.1  # mean size in terms of underlying
+INFORMED_FRACTION = 0.2
+
+# defaults to the total supply cap
+LP_SHARES = None
+
+
+DECIMALS = {
+    "ETH": 18,
+    "USDC": 6,
+    "WBTC": 8,
+}
+
+HOURS_PER_YEAR = 24 * 365
+
+
+def simulate_path(args):
+    """
+    Simulate one price path and return LP P&L and trade statistics
+
+    Amounts are in terms of the base token, which is the underlying for calls
+    and the quote token for puts
+    """
+    path_id, seed, config = args
+    rng = np.random.default_rng(seed)
+
+    scale = 10 ** config["decimals"]
+    strikes = config["strike_prices"]
+    market = OptionMarketSim(
+        [int(SCALE * k + 1e-9) for k in strikes],
+        config["expiry_time"],
+        config["is_put"],
+        int(SCALE * config["trading_fee"] + 1e-9),
+        balance_cap=config["balance_cap"],
+        total_supply_cap=config["total_supply_cap"],
+        dispute_period=config["dispute_period"],
+        timestamp=config["start_time"],
+        exact=False,
+    )
+
+    amount_in = market.deposit(config["lp_shares"])
+    prices = sample_prices(rng, config)
+    step_seconds = STEP_HOURS * 3600
+
+    num_trades = 0
+    reverts = {}
+    for step, spot in enumerate(prices[:-1]):
+        market.timestamp = config["start_time"] + step * step_seconds
+        hours_left = (config["expiry_time"] - market.timestamp) / 3600
+        for _ in range(rng.poisson(TRADES_PER_STEP)):
+            size = int(rng.exponential(TRADE_SIZE) * scale) + 1
+            try:
+                if rng.random() < INFORMED_FRACTION:
+                    is_long, index = informed_trade(market, spot, hours_left, config)
+                    if index is None:
+                        continue
+                    market.buy(is_long, index, size)
+                else:
+                    is_long = rng.random() < 0.5
+                    index = rng.integers(len(strikes))
+                    if rng.random() < 0.5:
+                        market.buy(is_long, index, size)
+                    else:
+                        supplies = (
+                            market.long_supplies if is_long else market.short_supplies
+                        )
+                        size = min(size, supplies[index])
+                        if size == 0:
+                            continue
+                        market.sell(is_long, index, size)
+                num_trades += 1
+            except Revert as e:
+                reverts[str(e)] = reverts.get(str(e), 0) + 1
+
+    # settle after dispute period and withdraw all lp shares
+    expiry_price = prices[-1]
+    market.timestamp = config["expiry_time"]
+    market.settle(int(SCALE * expiry_price))
+    market.timestamp += config["dispute_period"]
+    try:
+        amount_out = market.withdraw(market.total_supply)
+    except Revert:
+        # nothing left in pool
+        amount_out = 0
+
+    pnl = (amount_out - amount_in) / scale
+    return {
+        "path": path_id,
+        "expiry_price": expiry_price,
+        "amount_in": amount_in / scale,
+        "amount_out": amount_out / scale,
+        "pnl": pnl,
+        "return": pnl * scale / amount_in,
+        "num_trades": num_trades,
+        "num_reverts": sum(reverts.values()),
+        "cap_reverts": reverts.get("Balance cap exceeded", 0),
+    }
+
+
+def sample_prices(rng, config):
+    """
+    Sample prices at each step from now until expiry
+    """
+    num_steps = config["num_steps"]
+    if PRICE_MODEL == "gbm":
+        dt = STEP_HOURS / HOURS_PER_YEAR
+        sigma = config["volatility"]
+        returns = rng.normal(-0.5 * sigma * sigma * dt, sigma * sqrt(dt), num_steps)
+    elif PRICE_MODEL == "bootstrap":
+        returns = rng.choice(config["historical_returns"], num_steps)
+    else:
+        raise ValueError(f"Unknown price model: {PRICE_MODEL}")
+    return SPOT_PRICE * np.exp(np.concatenate([[0.0], np.cumsum(returns)]))
+
+
+def informed_trade(market, spot, hours_left, config):
+    """
+    Find option with the largest edge between its fair value and marginal
+    price. Returns (is_long, index), or (None, None) if no edge is larger
+    than the trading fee
+    """
+    quantities = calc_quantities(
+        market.strike_prices,
+        market.is_put,
+        market.long_supplies,
+        market.short_supplies,
+    )
+    p, _ = lmsr.prices([float(x) for x in quantities], float(market.total_supply))
+    below = np.cumsum(p)[:-1]  # probability expiry price is below each strike
+    above = 1.0 - below
+
+    strikes = np.array(config["strike_prices"])
+    tau = max(hours_left, 1e-9) / HOURS_PER_YEAR
+    long_value, short_value = fair_values(
+        spot, strikes, config["volatility"], tau, market.is_put
+    )
+
+    if market.is_put:
+        # put quantities are multiplied by strike price
+        long_price, short_price = strikes * below, strikes * above
+        fee = strikes * config["trading_fee"]
+    else:
+        long_price, short_price = above, below
+        fee = config["trading_fee"] * np.ones(len(strikes))
+
+    edges = np.concatenate(
+        [long_value - long_price - fee, short_value - short_price - fee]
+    )
+    best = int(np.argmax(edges))
+    if edges[best] <= 0:
+        return None, None
+    return best < len(strikes), best % len(strikes)
+
+
+def fair_values(spot, strikes, sigma, tau, is_put):
+    """
+    Value of long and short options under a lognormal distribution with zero
+    interest rate. Calls are valued in terms of the underlying and puts in
+    terms of the quote token
+    """
+    if is_put:
+        long_value = black_scholes(spot, strikes, sigma, tau, True)
+        return long_value, strikes - long_value
+
+    # calls pay out in the underlying, so value is E[(S - K)+ / S] = K E[(1/K - 1/S)+].
+    # 1/S is also lognormal with forward exp(sigma^2 tau) / S, so this is K
+    # times a put on 1/S with strike 1/K
+    forward = np.exp(sigma * sigma * tau) / spot
+    long_value = strikes * black_scholes(forward, 1.0 / strikes, sigma, tau, True)
+    return long_value, 1.0 - long_value
+
+
+def load_historical_returns():
+    with open(PRICE_HISTORY_PATH, "r") as f:
+        prices = [float(line) for line in f if line.strip()]
+    return np.diff(np.log(prices))
+
+
+def summarize(pnls, returns):
+    pnls = np.array(pnls)
+    returns = np.array(returns)
+    worst = int(np.argmin(pnls))
+    var_5 = np.percentile(pnls, 5)
+
+    print(f"Paths:              {len(pnls)}")
+    print(f"Mean P&L:           {pnls.mean():.6f} ({returns.mean():.2%})")
+    print(f"Std P&L:            {pnls.std():.6f}")
+    for q in [1, 5, 25, 50, 75, 95, 99]:
+        print(f"P&L {q:>2}th pct:       {np.percentile(pnls, q):.6f}")
+    print(f"5% VaR:             {-var_5:.6f}")
+    print(f"5% CVaR:            {-pnls[pnls <= var_5].mean():.6f}")
+    print(f"Worst-case loss:    {-pnls[worst]:.6f} ({returns[worst]:.2%})")
+    print(f"Probability of loss: {(pnls < 0).mean():.2%}")
+
+
+def main(expiry_date=None):
+    base_token = QUOTE_TOKEN if IS_PUT else BASE_TOKEN
+    decimals = DECIMALS[base_token]
+
+    start = arrow.get(START_DATE, "DD MMM YYYY") if START_DATE else arrow.utcnow()
+    if expiry_date is None:
+        expiry_date = start.shift(days=EXPIRY_DAYS).format("DD MMM YYYY")
+    expiry = arrow.get(expiry_date + " " + EXPIRY_TIME, "DD MMM YYYY HH:mm")
+    if expiry <= start:
+        raise ValueError("Already expired")
+    num_steps = int((expiry.timestamp - start.timestamp) / (STEP_HOURS * 3600))
+
+    historical_returns = None
+    volatility = VOLATILITY
+    if PRICE_MODEL == "bootstrap":
+        historical_returns = load_historical_returns()
+        volatility = historical_returns.std() * sqrt(HOURS_PER_YEAR / STEP_HOURS)
+
+    config = {
+        "strike_prices": STRIKE_PRICES,
+        "trading_fee": TRADING_FEE,
+        "is_put": IS_PUT,
+        "decimals": decimals,
+        "start_time": start.timestamp,
+        "expiry_time": expiry.timestamp,
+        "num_steps": num_steps,
+        "dispute_period": DISPUTE_PERIOD,
+        "balance_cap": TVL_CAPS[base_token],
+        "total_supply_cap": LP_CAPS[base_token],
+        "lp_shares": int(LP_SHARES * 10 ** decimals)
+        if LP_SHARES
+        else LP_CAPS[base_token],
+        "volatility": volatility,
+        "historical_returns": historical_returns,
+    }
+
+    print(
+        f"Market:  {BASE_TOKEN} {'put' if IS_PUT else 'call'} expiring {expiry.isoformat()}"
+    )
+    print(f"Model:   {PRICE_MODEL}, {num_steps} steps, volatility {volatility:.2%}")
+    print(f"Results: {OUTPUT_PATH}")
+
+    seeds = np.random.SeedSequence(SEED).spawn(NUM_PATHS)
+    tasks = ((i, seed, config) for i, seed in enumerate(seeds))
+
+    pnls = []
+    returns = []
+    with open(OUTPUT_PATH, "w", newline="") as f, Pool(PROCESSES) as pool:
+        writer = None
+        for i, res in enumerate(
+            pool.imap_unordered(simulate_path, tasks, chunksize=16)
+        ):
+            if writer is None:
+                writer = csv.DictWriter(f, fieldnames=list(res))
+                writer.writeheader()
+            writer.writerow(res)
+            pnls.append(res["pnl"])
+            returns.append(res["return"])
+            if (i + 1) % 1000 == 0:
+                f.flush()
+                print(f"Simulated {i + 1}/{NUM_PATHS} paths")
+
+    print()
+    print(f"P&L in terms of {base_token}")
+    summarize(pnls, returns)
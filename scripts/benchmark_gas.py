@@ -0,0 +1,318 @@
+"""
+Benchmark gas used by `OptionMarket` methods as the number of strikes grows
+
+For each strike count in `NUM_STRIKES`, creates call and put markets with both
+ETH and an ERC20 as base token through `OptionFactory`, like markets in
+production, and runs the full lifecycle: deposit, buy and sell longs and
+shorts, settle, sell after settlement and withdraw. Gas used by
+each transaction is written to a JSON report along with the per-strike slope
+from a linear fit, since most methods recalculate the LMSR cost over all
+strikes.
+
+Gas of `OptionMath.calcLmsrCost` is also measured for states where a fraction
+of the quantities are deep enough below the maximum that their terms are
+skipped, like deep out-of-the-money buckets in a busy market, and for sparse
+states where options are only held at `TRADED_STRIKES` strikes. Terms of
+equal adjacent quantities are reused, so with 64 strikes a sparse state has
+to cost at most `SPARSE_BOUND` times a state where every term is evaluated.
+
+Pass the path of a previous report to compare against it. Methods whose gas
+increased by more than `THRESHOLD` are flagged.
+
+Creating a market with 64 strikes uses more gas than a mainnet block allows,
+so the benchmark runs on its own local network with a higher gas limit. The
+development network used by tests keeps the default limit, so they still catch
+transactions that wouldn't fit in a block. Add the network once with:
+>> brownie networks add Development benchmark cmd=ganache-cli host=http://127.0.0.1 port=8546 gas_limit=100000000 accounts=10 mnemonic=brownie
+
+Usage:
+>> brownie run benchmark_gas --network benchmark
+>> brownie run benchmark_gas main gas-report-old.json --network benchmark
+"""
+
+import json
+import subprocess
+
+import arrow
+import numpy as np
+from brownie import (
+    accounts,
+    chain,
+    network,
+    MockOptionMath,
+    MockOracle,
+    MockToken,
+    OptionFactory,
+    OptionMarket,
+    OptionToken,
+    ZERO_ADDRESS,
+    web3,
+)
+
+
+# bumped whenever the format of the report or the benchmarked lifecycle
+# changes so reports aren't compared with incompatible ones
+REPORT_VERSION = 4
+REPORT_PATH = "gas-report.json"
+
+NUM_STRIKES = [1, 2, 4, 8, 16, 32, 64]
+
+# enough to create a market with the most strikes in one transaction
+BLOCK_GAS_LIMIT = 100_000_000
+
+SCALE = 10 ** 18
+TRADING_FEE = SCALE // 100
+LP_SHARES = 10 * SCALE
+# small enough that put costs, which scale with strike, stay under MAX_AMOUNT
+OPTIONS = SCALE // 1000
+MAX_AMOUNT = 50 * SCALE
+
+# flag increases larger than this fraction when comparing
+THRESHOLD = 0.01
+
+# fractions of LMSR terms that are skipped since exp underflows
+SKIPPED_FRACTIONS = [0.0, 0.5, 0.9]
+
+# strikes with options in sparse states and the bound on their gas with the
+# most strikes relative to evaluating every term
+TRADED_STRIKES = 8
+SPARSE_BOUND = 0.5
+
+METHODS = [
+    "createMarket",
+    "deposit",
+    "buyLong",
+    "buyShort",
+    "sellLong",
+    "sellShort",
+    "settle",
+    "sellLongSettled",
+    "sellShortSettled",
+    "withdraw",
+]
+
+
+def run_lifecycle(deployer, factory, num_strikes, is_put, is_eth):
+    """
+    Create a market and return gas used by each method in `METHODS`
+    """
+    strike_prices = [(i + 1) * 100 * SCALE for i in range(num_strikes)]
+    index = num_strikes // 2
+
+    # other token of the pair, which is only used for symbols
+    underlying = deployer.deploy(MockToken)
+    if is_eth:
+        base_token = ZERO_ADDRESS
+    else:
+        base_token = deployer.deploy(MockToken)
+        base_token.mint(deployer, MAX_AMOUNT * 10, {"from": deployer})
+
+    # settle where all longs and shorts have a nonzero payoff
+    oracle = deployer.deploy(MockOracle)
+    oracle.setPrice(
+        strike_prices[0] // 2 if is_put else strike_prices[-1] * 2, {"from": deployer}
+    )
+
+    sender = {"from": deployer}
+    value = {"from": deployer, "value": MAX_AMOUNT} if is_eth else sender
+    txs = {}
+    txs["createMarket"] = factory.createMarket(
+        underlying if is_put else base_token,
+        base_token if is_put else underlying,
+        oracle,
+        strike_prices,
+        chain.time() + 3600,
+        is_put,
+        TRADING_FEE,
+        sender,
+    )
+    market = OptionMarket.at(txs["createMarket"].return_value)
+    if not is_eth:
+        base_token.approve(market, MAX_AMOUNT * 10, {"from": deployer})
+
+    txs["deposit"] = market.deposit(LP_SHARES, MAX_AMOUNT, value)
+    txs["buyLong"] = market.buy(True, index, OPTIONS, MAX_AMOUNT, value)
+    txs["buyShort"] = market.buy(False, index, OPTIONS, MAX_AMOUNT, value)
+    txs["sellLong"] = market.sell(True, index, OPTIONS // 2, 0, sender)
+    txs["sellShort"] = market.sell(False, index, OPTIONS // 2, 0, sender)
+
+    # expire now instead of sleeping so chain time isn't moved for later runs
+    market.setExpiryTime(chain.time(), sender)
+    chain.mine()
+    txs["settle"] = market.settle(sender)
+
+    txs["sellLongSettled"] = market.sell(True, index, OPTIONS // 2, 0, sender)
+    txs["sellShortSettled"] = market.sell(False, index, OPTIONS // 2, 0, sender)
+    txs["withdraw"] = market.withdraw(LP_SHARES, 0, sender)
+
+    return {method: txs[method].gas_used for method in METHODS}
+
+
+def benchmark(deployer):
+    factory = deployer.deploy(
+        OptionFactory, deployer.deploy(OptionMarket), deployer.deploy(OptionToken)
+    )
+    results = {}
+    for is_put in [False, True]:
+        for is_eth in [False, True]:
+            label = f"{'put' if is_put else 'call'}-{'eth' if is_eth else 'erc20'}"
+            results[label] = {}
+            for num_strikes in NUM_STRIKES:
+                print(f"Running {label} with {num_strikes} strikes")
+                results[label][str(num_strikes)] = run_lifecycle(
+                    deployer, factory, num_strikes, is_put, is_eth
+                )
+    return results
+
+
+def benchmark_lmsr_cost(deployer):
+    """
+    Gas used by `calcLmsrCost` with n + 1 distinct quantities, of which a
+    fraction are far enough below the maximum that their terms are skipped
+    """
+    option_math = deployer.deploy(MockOptionMath)
+    b = SCALE
+    results = {}
+    for fraction in SKIPPED_FRACTIONS:
+        results[str(fraction)] = {}
+        for num_strikes in NUM_STRIKES:
+            n = num_strikes + 1
+            skipped = int(n * fraction)
+
+            # distinct so terms aren't reused from equal neighbours
+            near = [1000 * SCALE - i * SCALE // 10 for i in range(n - skipped)]
+            deep = list(range(skipped))
+            gas = option_math.calcLmsrCost.estimate_gas(near + deep, b)
+            results[str(fraction)][str(num_strikes)] = gas
+
+    # adjacent quantities are equal between traded strikes
+    results["sparse"] = {}
+    for num_strikes in NUM_STRIKES:
+        n = num_strikes + 1
+        quantities = [
+            1000 * SCALE - (i * TRADED_STRIKES // n) * SCALE // 10 for i in range(n)
+        ]
+        results["sparse"][str(num_strikes)] = option_math.calcLmsrCost.estimate_gas(
+            quantities, b
+        )
+    return results
+
+
+def check_sparse_bound(lmsr_cost):
+    """
+    Whether gas of a sparse state with the most strikes is within
+    `SPARSE_BOUND` of a state with all terms evaluated
+    """
+    num_strikes = str(max(NUM_STRIKES))
+    sparse = lmsr_cost["sparse"][num_strikes]
+    dense = lmsr_cost["0.0"][num_strikes]
+    ok = sparse <= SPARSE_BOUND * dense
+    print(
+        f"calcLmsrCost with {num_strikes} strikes, {TRADED_STRIKES} traded: {sparse} gas, "
+        f"{sparse / dense:.0%} of all terms evaluated (bound {SPARSE_BOUND:.0%}){'' if ok else '  <-- exceeded'}"
+    )
+    return ok
+
+
+def fit_slopes(results):
+    """
+    Fixed and per-strike gas of each method from a least squares line
+    """
+    fits = {}
+    for label, by_strikes in results.items():
+        x = np.array([int(n) for n in by_strikes], dtype=float)
+        fits[label] = {}
+        for method in METHODS:
+            y = np.array([gas[method] for gas in by_strikes.values()], dtype=float)
+            per_strike, fixed = np.polyfit(x, y, 1) if len(x) > 1 else (0.0, y[0])
+            fits[label][method] = {
+                "fixed": int(round(fixed)),
+                "perStrike": int(round(per_strike)),
+            }
+    return fits
+
+
+def compare(report, baseline):
+    """
+    Print the change in gas of each method and return the number of
+    increases larger than `THRESHOLD`
+    """
+    if baseline.get("version") != report["version"]:
+        raise ValueError(
+            f"Can't compare report version {report['version']} with {baseline.get('version')}"
+        )
+
+    regressions = 0
+    for label, by_strikes in report["results"].items():
+        for num_strikes, gas in by_strikes.items():
+            old = baseline["results"].get(label, {}).get(num_strikes)
+            if old is None:
+                continue
+            for method in METHODS:
+                change = (gas[method] - old[method]) / old[method]
+                flag = ""
+                if change > THRESHOLD:
+                    flag = "  <-- increased"
+                    regressions += 1
+                if change != 0:
+                    print(
+                        f"{label:<10} {num_strikes:>3} {method:<18} "
+                        f"{old[method]:>9} -> {gas[method]:>9} ({change:+.2%}){flag}"
+                    )
+    return regressions
+
+
+def main(baseline_path=None, report_path=REPORT_PATH):
+    print(f"Network: {network.show_active()}")
+    gas_limit = web3.eth.getBlock("latest")["gasLimit"]
+    if gas_limit < BLOCK_GAS_LIMIT:
+        raise ValueError(
+            f"Block gas limit is {gas_limit} but creating markets with {max(NUM_STRIKES)} "
+            f"strikes needs {BLOCK_GAS_LIMIT}. Run on the benchmark network instead"
+        )
+    deployer = accounts[0]
+
+    results = benchmark(deployer)
+    report = {
+        "version": REPORT_VERSION,
+        "createdAt": arrow.utcnow().isoformat(),
+        "commit": _git_commit(),
+        "numStrikes": NUM_STRIKES,
+        "results": results,
+        "fits": fit_slopes(results),
+        "lmsrCost": benchmark_lmsr_cost(deployer),
+    }
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Written report to {report_path}")
+
+    for label, fits in report["fits"].items():
+        print(label)
+        for method, fit in fits.items():
+            print(
+                f"  {method:<18} {fit['fixed']:>9} + {fit['perStrike']:>7} per strike"
+            )
+
+    print("calcLmsrCost by fraction of terms skipped")
+    for fraction, by_strikes in report["lmsrCost"].items():
+        label = "sparse" if fraction == "sparse" else f"{float(fraction):.0%}"
+        print(
+            f"  {label:>6}  "
+            + "  ".join(f"{n}: {gas}" for n, gas in by_strikes.items())
+        )
+    check_sparse_bound(report["lmsrCost"])
+
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline)
+        print(
+            f"{regressions} increases larger than {THRESHOLD:.0%} compared to {baseline['commit']}"
+        )
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
@@ -5,23 +5,35 @@ This script can be used to double check numerical values in OptionsMarketMaker
 unit tests
 
 Usage:
->> python calc_lslmsr_cost.py <q1> <q2> <liquidity_param>
+>> python -m scripts.calc_lslmsr_cost <q1> <q2> <liquidity_param> [--precise]
 
 liquidity_param describes maximum possible sum of prices - 1. It's equal to alpha * 2 log 2
 
 Answer is multipled by 10^18 and printed as an integer
 
+By default the vectorized engine in `scripts.lmsr` is used. Pass `--precise` to
+evaluate with mpmath at 300 bits of precision instead, which is much slower but
+can be used as a reference.
+
 """
 
 import mpmath
 from mpmath import exp, log, mpf
 
+from scripts import lmsr
+
 
 U = 10 ** 18
-mpmath.prec = 300
+mpmath.mp.prec = 300
+
+
+def cost(q, alpha, precise=False):
+    if precise:
+        return _precise_cost(q, alpha)
+    return lmsr.lslmsr_cost(q, alpha)
 
 
-def cost(q, alpha):
+def _precise_cost(q, alpha):
     b = alpha * sum(q)
     if b == 0:
         return 0
@@ -33,12 +45,19 @@ def cost(q, alpha):
 if __name__ == "__main__":
     import sys
 
-    _, q1, q2, liquidity_param = sys.argv
+    args = sys.argv[1:]
+    precise = "--precise" in args
+    if precise:
+        args.remove("--precise")
+    q1, q2, liquidity_param = args
 
     q1 = mpf(int(q1))
     q2 = mpf(int(q2))
     liquidity_param = mpf(float(liquidity_param))
 
     alpha = liquidity_param / 2.0 / log(2.0)
-    ans = cost([q1, q2], alpha)
+    if precise:
+        ans = cost([q1, q2], alpha, precise=True)
+    else:
+        ans = cost([float(q1), float(q2)], float(alpha))
     print(int(ans * U))
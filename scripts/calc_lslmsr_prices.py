@@ -5,48 +5,60 @@ This script can be used to double check numerical values in OptionsMarketMaker
 unit tests
 
 Usage:
->> python calc_lslmsr_cost.py <q1> <q2> <liquidity_param>
+>> python -m scripts.calc_lslmsr_prices <q1> <q2> <liquidity_param> [--precise]
 
 liquidity_param describes maximum possible sum of prices - 1. It's equal to alpha * 2 log 2
 
+Prices are calculated in closed form from the gradient of the cost function. By
+default the vectorized engine in `scripts.lmsr` is used. Pass `--precise` to
+evaluate with mpmath at 300 bits of precision instead.
+
 """
 
 import mpmath
 from mpmath import exp, log, mpf
 
+from scripts import lmsr
+from scripts.calc_lslmsr_cost import cost
 
-mpmath.prec = 300
 
+mpmath.mp.prec = 300
 
-def cost(q, alpha):
-    b = alpha * sum(q)
-    if b == 0:
-        return 0
-    mx = max(q)
-    a = sum(exp((x - mx) / b) for x in q)
-    return mx + b * log(a)
 
+def prices(q, alpha, precise=False):
+    if precise:
+        return _precise_prices(q, alpha)
+    prices, _ = lmsr.lslmsr_prices(q, alpha)
+    return list(prices)
 
-def prices(q, alpha, eps=1e-9):
-    prices = []
-    for i in range(len(q)):
-        c1 = cost(q, alpha)
-        q[i] += eps
-        c2 = cost(q, alpha)
-        q[i] -= eps
-        prices.append((c2 - c1) / eps)
-    return prices
+
+def _precise_prices(q, alpha):
+    total = sum(q)
+    b = alpha * total
+    mx = max(q)
+    e = [exp((x - mx) / b) for x in q]
+    a = sum(e)
+    s = [x / a for x in e]
+    spread = alpha * log(a) + (mx - sum(x * y for x, y in zip(q, s))) / total
+    return [x + spread for x in s]
 
 
 if __name__ == "__main__":
     import sys
 
-    _, q1, q2, liquidity_param = sys.argv
+    args = sys.argv[1:]
+    precise = "--precise" in args
+    if precise:
+        args.remove("--precise")
+    q1, q2, liquidity_param = args
 
     q1 = mpf(int(q1))
     q2 = mpf(int(q2))
     liquidity_param = mpf(float(liquidity_param))
 
     alpha = liquidity_param / 2.0 / log(2.0)
-    ans = prices([q1, q2], alpha)
+    if precise:
+        ans = prices([q1, q2], alpha, precise=True)
+    else:
+        ans = prices([float(q1), float(q2)], float(alpha))
     print(f"{float(ans[0]):.4f} {float(ans[1]):.4f}")
@@ -0,0 +1,97 @@
+"""
+Async JSON-RPC client for reading many contracts concurrently
+
+Requests are sent over a single pooled aiohttp session to the node brownie is
+connected to, with at most `concurrency` requests in flight. As in
+`scripts.multicall`, calls are encoded and decoded with brownie contract
+methods, so one contract object can be used for any address with the same
+ABI.
+
+Usage:
+>> async with AsyncRpc() as rpc:
+>>     symbols = await asyncio.gather(*[rpc.call(a, token.symbol) for a in addresses])
+"""
+
+import asyncio
+import itertools
+
+import aiohttp
+from brownie import web3
+
+from scripts.multicall import decode_output
+
+
+# max requests in flight
+CONCURRENCY = 32
+
+TIMEOUT = 60  # seconds
+
+
+class RpcError(Exception):
+    pass
+
+
+class AsyncRpc:
+    def __init__(
+        self, endpoint_uri=None, concurrency=CONCURRENCY, block_identifier="latest"
+    ):
+        self.endpoint_uri = endpoint_uri or web3.provider.endpoint_uri
+        self.concurrency = concurrency
+        self.block_identifier = block_identifier
+        self.session = None
+        self._semaphore = None
+        self._ids = itertools.count()
+
+    async def __aenter__(self):
+        # connection pool is the same size as the number of requests in flight
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        timeout = aiohttp.ClientTimeout(total=TIMEOUT)
+        self.session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+
+    async def request(self, method, params):
+        payload = {
+            "jsonrpc": "2.0",
+            "id": next(self._ids),
+            "method": method,
+            "params": params,
+        }
+        async with self._semaphore:
+            async with self.session.post(self.endpoint_uri, json=payload) as response:
+                response.raise_for_status()
+                res = await response.json(content_type=None)
+        if "error" in res:
+            raise RpcError(res["error"])
+        return res["result"]
+
+    async def eth_call(self, address, data, block_identifier=None):
+        block = self.block_identifier if block_identifier is None else block_identifier
+        if isinstance(block, int):
+            block = hex(block)
+        return await self.request(
+            "eth_call", [{"to": str(address), "data": data}, block]
+        )
+
+    async def call(self, address, method, *args):
+        """
+        Call `method` at `address` and return the decoded result. Raises
+        `RpcError` if the call reverts. Like `scripts.multicall`, strings that
+        are returned as `bytes32` are decoded too
+        """
+        output = await self.eth_call(address, method.encode_input(*args))
+        if output in ("0x", None):
+            raise RpcError(f"No data returned from {method._name} at {address}")
+        return decode_output(method, output)
+
+    async def try_call(self, address, method, *args):
+        """
+        Same as `call` but returns None if the call reverts
+        """
+        try:
+            return await self.call(address, method, *args)
+        except RpcError:
+            return None
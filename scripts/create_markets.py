@@ -1,6 +1,5 @@
 import arrow
 from math import log
-import time
 
 from brownie import (
     accounts,
@@ -9,6 +8,7 @@ from brownie import (
     OptionFactory,
     OptionMarket,
     OptionToken,
+    ZERO_ADDRESS,
 )
 
 
@@ -49,6 +49,9 @@ STRIKE_PRICES = [
     200000,
 ]
 
+# launch paused and unpause later
+IS_PAUSED = False
+
 GAS_PRICE = "auto"
 # GAS_PRICE = "310 gwei"
 
@@ -101,13 +104,90 @@ FACTORY = {
     "rinkeby": "0x2E3596e462279678044b03B1618A10564fb4f6E7",
 }
 
+# factories deployed before `createMarketWithConfig` and the `MarketCreated`
+# event were added. markets created by these are configured in separate
+# transactions. after redeploying a factory with deploy_factory.py, update
+# FACTORY with the new address
+LEGACY_FACTORIES = {
+    "0xCDFE169dF3D64E2e43D88794A21048A52C742F2B",
+    "0x2E3596e462279678044b03B1618A10564fb4f6E7",
+}
+
+
+def market_config(network_name, base_token, strike_prices, expiry_timestamp, is_put):
+    """
+    `OptionFactory.MarketConfig` struct for a market
+    """
+    cap_token = QUOTE_TOKEN if is_put else base_token
+    return (
+        TOKEN_ADDRESSES[network_name][base_token],
+        TOKEN_ADDRESSES[network_name][QUOTE_TOKEN],
+        DEPLOYED_ORACLES[network_name][base_token + "/" + QUOTE_TOKEN],
+        [int(SCALE * px + 1e-9) for px in strike_prices],
+        expiry_timestamp,
+        is_put,
+        int(TRADING_FEE * SCALE + 1e-9),
+        TVL_CAPS[cap_token],
+        LP_CAPS[cap_token],
+        DISPUTE_PERIOD,
+        IS_PAUSED,
+    )
+
+
+def is_legacy_factory(factory):
+    return factory.address in LEGACY_FACTORIES
+
+
+def create_market_method(factory, config):
+    """
+    Factory method and arguments that create a market with `config`. Legacy
+    factories only have `createMarket`, which takes the first 7 fields
+    """
+    if is_legacy_factory(factory):
+        return factory.createMarket, config[:7]
+    return factory.createMarketWithConfig, (config,)
+
+
+def configure_market_methods(factory, market, config):
+    """
+    Market methods and arguments that still need to be called after creating
+    a market with `config`. Only needed for legacy factories
+    """
+    if not is_legacy_factory(factory):
+        return []
+    balance_cap, total_supply_cap, dispute_period, is_paused = config[7:]
+    methods = [
+        (market.setBalanceCap, (balance_cap,)),
+        (market.setTotalSupplyCap, (total_supply_cap,)),
+        (market.setDisputePeriod, (dispute_period,)),
+    ]
+    if is_paused:
+        methods.append((market.pause, ()))
+    return methods
+
+
+def created_market_address(tx, factory):
+    """
+    Address of the market created in `tx`. Legacy factories don't emit
+    `MarketCreated`, so it's the contract whose ownership was first
+    transferred to the factory when it was initialized
+    """
+    if "MarketCreated" in tx.events:
+        return tx.events["MarketCreated"]["market"]
+    for event in tx.events["OwnershipTransferred"]:
+        if (
+            event["previousOwner"] == ZERO_ADDRESS
+            and event["newOwner"] == factory.address
+        ):
+            return event.address
+    raise ValueError(f"No market created in {tx.txid}")
+
 
 def create_market(deployer, is_put):
     _network = network.show_active()
     print(f"Network: {_network}")
 
     n = len(STRIKE_PRICES) + 1
-    strike_prices_wei = [int(SCALE * px + 1e-9) for px in STRIKE_PRICES]
 
     expiry = arrow.get(EXPIRY_DATE + " " + EXPIRY_TIME, "DD MMM YYYY HH:mm")
     if expiry < arrow.now():
@@ -116,34 +196,19 @@ def create_market(deployer, is_put):
     humanized = expiry.humanize(arrow.utcnow())
     print(f"Expiry: {expiry.isoformat()} ({humanized})")
 
-    oracle = DEPLOYED_ORACLES[_network][BASE_TOKEN + "/" + QUOTE_TOKEN]
-
     # brownie doesn't let us use OptionFactory.at
     factory = OptionFactory.at(FACTORY[_network])
-    tx = factory.createMarket(
-        TOKEN_ADDRESSES[_network][BASE_TOKEN],
-        TOKEN_ADDRESSES[_network][QUOTE_TOKEN],
-        oracle,
-        strike_prices_wei,
-        expiry.timestamp,
-        is_put,
-        int(TRADING_FEE * SCALE + 1e-9),
-        {"from": deployer},
+    config = market_config(
+        _network, BASE_TOKEN, STRIKE_PRICES, expiry.timestamp, is_put
     )
+    method, args = create_market_method(factory, config)
+    tx = method(*args, {"from": deployer})
 
-    # can't get transaction return value from infura
-    time.sleep(30)
-    address = factory.markets(factory.numMarkets() - 1)
-
+    # can't get transaction return value from infura, so read it from logs
+    address = created_market_address(tx, factory)
     market = OptionMarket.at(address)
-    # market.pause({"from": deployer})
-    market.setBalanceCap(
-        TVL_CAPS[QUOTE_TOKEN if is_put else BASE_TOKEN], {"from": deployer}
-    )
-    market.setTotalSupplyCap(
-        LP_CAPS[QUOTE_TOKEN if is_put else BASE_TOKEN], {"from": deployer}
-    )
-    market.setDisputePeriod(DISPUTE_PERIOD, {"from": deployer})
+    for method, args in configure_market_methods(factory, market, config):
+        method(*args, {"from": deployer})
     return market
 
 
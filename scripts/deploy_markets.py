@@ -0,0 +1,213 @@
+"""
+Deploy markets for several underlyings and expiries at once
+
+All `createMarketWithConfig` transactions are broadcast together with nonces
+assigned locally, without waiting for each to be mined. Caps and dispute
+period are set in the same transaction. Receipts of all pending transactions
+are polled together and transactions still pending after `STUCK_TIMEOUT` are
+replaced with a higher gas price.
+
+Factories in `LEGACY_FACTORIES` don't have `createMarketWithConfig`, so
+markets are created with `createMarket` and, as soon as each one is
+confirmed, its caps and dispute period are set in separate transactions.
+
+Caps, dispute period, trading fee, oracles and token addresses are the same
+as in `create_markets.py`.
+
+Usage:
+>> brownie run deploy_markets --network mainnet
+"""
+
+import time
+
+import arrow
+from brownie import accounts, network, web3, OptionFactory, OptionMarket
+from brownie.network.transaction import Status
+
+from scripts.create_markets import (
+    ACCOUNT,
+    EXPIRY_TIME,
+    FACTORY,
+    GAS_PRICE,
+    STRIKE_PRICES,
+    configure_market_methods,
+    create_market_method,
+    created_market_address,
+    market_config,
+)
+
+
+# (base token, expiry date, strike prices). calls and puts are deployed for each
+ROLLOUT = [
+    ("WBTC", "25 Jun 2021", STRIKE_PRICES),
+]
+
+POLL_INTERVAL = 5  # seconds
+STUCK_TIMEOUT = 180  # seconds
+GAS_PRICE_INCREMENT = 1.2
+
+
+class NonceManager:
+    """
+    Assigns consecutive nonces locally so transactions can be broadcast
+    without waiting for previous ones to be mined
+    """
+
+    def __init__(self, account):
+        self.account = account
+        self.sync()
+
+    def sync(self):
+        # pending count includes transactions already broadcast but not mined
+        self.nonce = web3.eth.getTransactionCount(self.account.address, "pending")
+
+    def next(self):
+        nonce = self.nonce
+        self.nonce += 1
+        return nonce
+
+
+class Job:
+    def __init__(self, label, tx, on_confirm):
+        self.label = label
+        self.on_confirm = on_confirm
+        self.sent_at = time.time()
+
+        # original transaction and any replacements. all have the same nonce
+        # so at most one can be confirmed
+        self.txs = [tx]
+
+    def status(self):
+        statuses = [tx.status for tx in self.txs]
+        if Status.Confirmed in statuses:
+            return Status.Confirmed
+        if Status.Reverted in statuses:
+            return Status.Reverted
+        if all(status == Status.Dropped for status in statuses):
+            return Status.Dropped
+        return Status.Pending
+
+    def confirmed_tx(self):
+        return next(tx for tx in self.txs if tx.status == Status.Confirmed)
+
+
+class Pipeline:
+    def __init__(self, account):
+        self.account = account
+        self.nonces = NonceManager(account)
+        self.pending = []
+        self.failed = []
+
+    def send(self, label, method, *args, on_confirm=None):
+        """
+        Broadcast a transaction without waiting for it to be mined.
+        `on_confirm` is called with the receipt once it's confirmed
+        """
+        nonce = self.nonces.next()
+        try:
+            tx = method(
+                *args, {"from": self.account, "nonce": nonce, "required_confs": 0}
+            )
+        except Exception:
+            # nonce wasn't used, so resync to avoid leaving a gap that blocks
+            # all later transactions
+            self.nonces.sync()
+            raise
+        print(f"Sent {label}: {tx.txid} (nonce {nonce})")
+        self.pending.append(Job(label, tx, on_confirm))
+
+    def run(self):
+        """
+        Wait until all transactions, including those sent from callbacks, are
+        confirmed
+        """
+        while self.pending:
+            time.sleep(POLL_INTERVAL)
+            jobs, self.pending = self.pending, []
+            for job in jobs:
+                status = job.status()
+                if status == Status.Confirmed:
+                    tx = job.confirmed_tx()
+                    print(f"Confirmed {job.label} in block {tx.block_number}")
+                    if job.on_confirm:
+                        job.on_confirm(tx)
+                elif status in (Status.Reverted, Status.Dropped):
+                    print(f"Failed {job.label}: {status.name}")
+                    self.failed.append(job)
+                else:
+                    if time.time() - job.sent_at > STUCK_TIMEOUT:
+                        self._replace(job)
+                    self.pending.append(job)
+        return self.failed
+
+    def _replace(self, job):
+        try:
+            tx = job.txs[-1].replace(increment=GAS_PRICE_INCREMENT)
+        except ValueError:
+            # already confirmed between polling and replacing
+            return
+        print(f"Replaced {job.label}: {tx.txid} at {tx.gas_price / 1e9:.1f} gwei")
+        job.txs.append(tx)
+        job.sent_at = time.time()
+
+
+def main():
+    _network = network.show_active()
+    print(f"Network: {_network}")
+
+    network.gas_price(GAS_PRICE)
+    deployer = accounts.load(ACCOUNT)
+    balance = deployer.balance()
+
+    factory = OptionFactory.at(FACTORY[_network])
+    pipeline = Pipeline(deployer)
+    markets = []
+    failures = []
+
+    def on_confirm(label, config):
+        def f(tx):
+            if tx.status != Status.Confirmed:
+                failures.append((label, tx.status.name))
+                return
+            try:
+                market = OptionMarket.at(created_market_address(tx, factory))
+            except ValueError as e:
+                failures.append((label, str(e)))
+                return
+            markets.append((label, market.address))
+
+            # these don't depend on each other so can be sent together
+            for method, args in configure_market_methods(factory, market, config):
+                pipeline.send(
+                    f"{method.abi['name']} {label} {market.address}", method, *args
+                )
+
+        return f
+
+    for base_token, expiry_date, strike_prices in ROLLOUT:
+        expiry = arrow.get(expiry_date + " " + EXPIRY_TIME, "DD MMM YYYY HH:mm")
+        if expiry < arrow.now():
+            raise ValueError(f"Already expired: {base_token} {expiry_date}")
+
+        for is_put in [False, True]:
+            label = f"{base_token} {expiry_date} {'put' if is_put else 'call'}"
+            config = market_config(
+                _network, base_token, strike_prices, expiry.timestamp, is_put
+            )
+            method, args = create_market_method(factory, config)
+            pipeline.send(
+                f"createMarket {label}",
+                method,
+                *args,
+                on_confirm=on_confirm(label, config),
+            )
+
+    # reverted and dropped transactions never reach their callback
+    for job in pipeline.run():
+        failures.append((job.label, job.status().name))
+
+    for label, market in markets:
+        print(f"Deployed {label} at: {market}")
+    for label, reason in failures:
+        print(f"Failed {label}: {reason}")
+    print(f"Gas used in deployment: {(balance - deployer.balance()) / 1e18:.4f} ETH")
@@ -1,3 +1,4 @@
+import asyncio
 import datetime
 import json
 import sys
@@ -6,72 +7,158 @@ import yaml
 from brownie import (
     accounts,
     network,
-    Contract,
     OptionMarket,
     OptionToken,
     ZERO_ADDRESS,
 )
 
+from scripts.crawler import AsyncRpc
+from scripts.metadata_cache import MetadataCache
+from scripts.multicall import Multicall
+
 
 PATH = {
     "mainnet": "markets.yaml",
     "rinkeby": "markets-rinkeby.yaml",
 }
 
+# max calls per eth_call
+BATCH_SIZE = 500
+
+# only read once per market and then stored in metadata cache
+MARKET_METHODS = [
+    "baseToken",
+    "numStrikes",
+    "symbol",
+    "isPut",
+    "tradingFee",
+]
+
+# can be changed by owner so are read on every run
+MUTABLE_METHODS = {
+    "oracleAddress": "oracle",
+    "expiryTime": "expiryTime",
+    "balanceCap": "balanceCap",
+    "totalSupplyCap": "totalSupplyCap",
+    "disputePeriod": "disputePeriod",
+}
+
 
 def main():
     with open(PATH[network.show_active()], "r") as f:
         markets = yaml.safe_load(f)
 
+    cache = MetadataCache()
+    res = asyncio.run(crawl(markets, cache))
+    cache.save()
+    print(json.dumps(res, indent=4, sort_keys=True))
+
+
+async def crawl(markets, cache):
+    """
+    Read metadata of markets not in the cache in three rounds of multicalls
+    and then the mutable variables of all markets in one round. Batches within
+    each round are sent concurrently
+    """
+    if not markets:
+        return []
+
+    # only used for encoding calls, so can be at any address with the same abi
+    market = OptionMarket.at(markets[0])
+
+    async with AsyncRpc() as rpc:
+        newMarkets = cache.missing(markets)
+        if newMarkets:
+            for metadata in await crawl_metadata(rpc, market, newMarkets):
+                cache.set(metadata["address"], metadata)
+
+        multicall = Multicall(batch_size=BATCH_SIZE)
+        for address in markets:
+            for method in MUTABLE_METHODS.values():
+                multicall.add(address, getattr(market, method))
+        results = iter(await multicall.execute_async(rpc))
+
     res = []
     for address in markets:
-        market = OptionMarket.at(address)
-        baseAddress = str(market.baseToken())
+        variables = {key: next(results) for key in MUTABLE_METHODS}
+
+        # older markets don't have totalSupplyCap
+        variables["totalSupplyCap"] = variables["totalSupplyCap"] or 0
+        res.append({**cache.get(address), **variables})
+    return res
+
+
+async def crawl_metadata(rpc, market, markets):
+    multicall = Multicall(batch_size=BATCH_SIZE)
+
+    # read market variables
+    for address in markets:
+        for method in MARKET_METHODS:
+            multicall.add(address, getattr(market, method))
+    results = iter(await multicall.execute_async(rpc))
+    states = [{method: next(results) for method in MARKET_METHODS} for _ in markets]
+
+    # read strikes and token addresses
+    for address, state in zip(markets, states):
+        n = state["numStrikes"]
+        state["longTokens"] = [
+            multicall.add(address, market.longTokens, i) for i in range(n)
+        ]
+        state["shortTokens"] = [
+            multicall.add(address, market.shortTokens, i) for i in range(n)
+        ]
+        state["strikePrices"] = [
+            multicall.add(address, market.strikePrices, i) for i in range(n)
+        ]
+    results = await multicall.execute_async(rpc)
+    for state in states:
+        for key in ["longTokens", "shortTokens", "strikePrices"]:
+            state[key] = [results[i] for i in state[key]]
+
+    # read token symbols and decimals. base tokens have the same abi for these
+    token = OptionToken.at(states[0]["longTokens"][0])
+    for state in states:
+        if str(state["baseToken"]) != ZERO_ADDRESS:
+            state["baseSymbol"] = multicall.add(state["baseToken"], token.symbol)
+        state["decimals"] = multicall.add(state["longTokens"][0], token.decimals)
+        state["longSymbols"] = [
+            multicall.add(a, token.symbol) for a in state["longTokens"]
+        ]
+        state["shortSymbols"] = [
+            multicall.add(a, token.symbol) for a in state["shortTokens"]
+        ]
+    results = await multicall.execute_async(rpc)
+
+    res = []
+    for address, state in zip(markets, states):
+        baseAddress = str(state["baseToken"])
         if baseAddress == ZERO_ADDRESS:
             baseSymbol = "ETH"
         else:
-            baseToken = Contract.from_explorer(baseAddress)
-            baseSymbol = baseToken.symbol()
-
-        n = market.numStrikes()
-        longTokens = [OptionToken.at(market.longTokens(i)) for i in range(n)]
-        shortTokens = [OptionToken.at(market.shortTokens(i)) for i in range(n)]
+            baseSymbol = results[state["baseSymbol"]]
 
-        assert market.symbol().startswith("Charm LP ") or market.symbol().startswith(
-            "LP "
-        )
-        if market.symbol().startswith("Charm LP "):
-            underlyingSymbol = market.symbol().split()[2]
+        symbol = state["symbol"]
+        assert symbol.startswith("Charm LP ") or symbol.startswith("LP ")
+        if symbol.startswith("Charm LP "):
+            underlyingSymbol = symbol.split()[2]
         else:
-            underlyingSymbol = market.symbol().split()[1]
-
-        totalSupplyCap = 0
-        try:
-            totalSupplyCap = market.totalSupplyCap()
-        except ValueError:
-            pass
+            underlyingSymbol = symbol.split()[1]
 
         res.append(
             {
                 "address": address,
                 "baseAddress": baseAddress,
                 "baseSymbol": baseSymbol,
-                "decimals": longTokens[0].decimals(),
+                "decimals": results[state["decimals"]],
                 "underlyingSymbol": underlyingSymbol,
-                "oracleAddress": market.oracle(),
-                "expiryTime": market.expiryTime(),
-                "balanceCap": market.balanceCap(),
-                "totalSupplyCap": totalSupplyCap,
-                "isPut": market.isPut(),
-                "tradingFee": market.tradingFee(),
-                "disputePeriod": market.disputePeriod(),
-                "strikePrices": [market.strikePrices(i) for i in range(n)],
-                "longAddresses": [token.address for token in longTokens],
-                "longSymbols": [token.symbol() for token in longTokens],
-                "shortAddresses": [token.address for token in shortTokens],
-                "shortSymbols": [token.symbol() for token in shortTokens],
-                "symbol": market.symbol(),
+                "isPut": state["isPut"],
+                "tradingFee": state["tradingFee"],
+                "strikePrices": state["strikePrices"],
+                "longAddresses": state["longTokens"],
+                "longSymbols": [results[i] for i in state["longSymbols"]],
+                "shortAddresses": state["shortTokens"],
+                "shortSymbols": [results[i] for i in state["shortSymbols"]],
+                "symbol": symbol,
             }
         )
-
-    print(json.dumps(res, indent=4, sort_keys=True))
+    return res
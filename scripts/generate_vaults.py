@@ -1,3 +1,4 @@
+import asyncio
 import datetime
 import json
 import sys
@@ -6,11 +7,13 @@ import yaml
 from brownie import (
     accounts,
     network,
-    Contract,
     OptionVault,
     ZERO_ADDRESS,
 )
 
+from scripts.crawler import AsyncRpc
+from scripts.metadata_cache import MetadataCache
+
 
 PATH = {
     "mainnet": "vaults.yaml",
@@ -20,35 +23,65 @@ PATH = {
 
 def main():
     with open(PATH[network.show_active()], "r") as f:
-        markets = yaml.safe_load(f)
-
-    res = []
-    for address in markets:
-        vault = OptionVault.at(address)
-        baseAddress = str(vault.baseToken())
-        if baseAddress == ZERO_ADDRESS:
-            baseSymbol = "ETH"
-        else:
-            baseToken = Contract.from_explorer(baseAddress)
-            baseSymbol = baseToken.symbol()
-
-        assert vault.symbol().startswith("Charm LP Vault")
-        underlyingSymbol = vault.symbol().split()[3]
-
-        totalSupplyCap = vault.totalSupplyCap()
-
-        markets = vault.allMarkets()
-
-        res.append(
-            {
-                "address": address,
-                "baseAddress": baseAddress,
-                "baseSymbol": baseSymbol,
-                "decimals": vault.decimals(),
-                "underlyingSymbol": underlyingSymbol,
-                "totalSupplyCap": totalSupplyCap,
-                "symbol": vault.symbol(),
-            }
-        )
+        vaults = yaml.safe_load(f)
 
+    cache = MetadataCache()
+    res = asyncio.run(crawl(vaults, cache))
+    cache.save()
     print(json.dumps(res, indent=4, sort_keys=True))
+
+
+async def crawl(vaults, cache):
+    """
+    Read all vaults concurrently. Metadata is only read for vaults not in the
+    cache
+    """
+    if not vaults:
+        return []
+
+    # only used for encoding calls, so can be at any address with the same abi
+    vault = OptionVault.at(vaults[0])
+
+    async with AsyncRpc() as rpc:
+        newVaults = cache.missing(vaults)
+        for metadata in await asyncio.gather(
+            *[crawl_metadata(rpc, vault, address) for address in newVaults]
+        ):
+            cache.set(metadata["address"], metadata)
+
+        # can be changed by owner so is read on every run
+        totalSupplyCaps = await asyncio.gather(
+            *[rpc.call(address, vault.totalSupplyCap) for address in vaults]
+        )
+
+    return [
+        {**cache.get(address), "totalSupplyCap": totalSupplyCap}
+        for address, totalSupplyCap in zip(vaults, totalSupplyCaps)
+    ]
+
+
+async def crawl_metadata(rpc, vault, address):
+    baseAddress, symbol, decimals = await asyncio.gather(
+        rpc.call(address, vault.baseToken),
+        rpc.call(address, vault.symbol),
+        rpc.call(address, vault.decimals),
+    )
+
+    baseAddress = str(baseAddress)
+    if baseAddress == ZERO_ADDRESS:
+        baseSymbol = "ETH"
+    else:
+        # vault is an erc20 so its abi can be used for reading the base token
+        baseSymbol = await rpc.call(baseAddress, vault.symbol)
+
+    assert symbol.startswith("Charm LP Vault")
+    underlyingSymbol = symbol.split()[3]
+
+    return {
+        "address": address,
+        "baseAddress": baseAddress,
+        "baseSymbol": baseSymbol,
+        "decimals": decimals,
+        "underlyingSymbol": underlyingSymbol,
+        "symbol": symbol,
+    }
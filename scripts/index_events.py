@@ -0,0 +1,349 @@
+"""
+Index events emitted by all markets created by the factory into SQLite
+
+Logs are fetched with one `eth_getLogs` call per block range for all markets
+at once and decoded in bulk with eth_abi. Each range is written in a single
+transaction together with the last indexed block of each market, so the
+indexer can be stopped at any time and resumes where it left off.
+
+After catching up it polls for new blocks and indexes them as they are
+confirmed. Markets created by the factory after the indexer started are
+picked up on the next poll and backfilled from the start block.
+
+The start block is, in order of preference, the block passed on the command
+line, the block configured in `START_BLOCKS`, or the block of the factory's
+first `MarketCreated` log. Factories deployed before `MarketCreated` was added
+don't emit it, so for these the start block has to be given, or pass "search"
+to find the factory's deployment block by binary search on `eth_getCode`.
+The search needs an archive node, unlike everything else here.
+
+uint256 values are stored as decimal strings since SQLite integers are only
+64 bits. Arrays in `BuyMany` and `SellMany` are stored as JSON lists of
+decimal strings.
+
+Usage:
+>> brownie run index_events --network mainnet
+>> brownie run index_events main 12000000 --network mainnet
+>> brownie run index_events main search --network mainnet
+"""
+
+import json
+import sqlite3
+import time
+
+from brownie import OptionFactory, chain, network, web3
+from eth_abi import decode_abi
+from eth_utils import to_checksum_address
+
+from scripts.create_markets import FACTORY
+
+
+DB_PATH = "events-{network}.db"
+
+# blocks per eth_getLogs call. halved when the node returns too many results
+# and grown again after successful calls
+CHUNK_SIZE = 10000
+MIN_CHUNK_SIZE = 10
+
+# only index blocks this far behind the tip so reorgs are unlikely
+CONFIRMATIONS = 6
+
+POLL_INTERVAL = 15  # seconds
+
+# network -> block to start indexing from, such as the factory's deployment
+# block. used when no start block is passed on the command line
+START_BLOCKS = {}
+
+
+# event name -> (signature, table, non-indexed columns, abi types)
+EVENTS = {
+    "Buy": (
+        "Buy(address,bool,uint256,uint256,uint256,uint256)",
+        "buys",
+        ["is_long_token", "strike_index", "options_out", "amount_in", "new_supply"],
+        ["bool", "uint256", "uint256", "uint256", "uint256"],
+    ),
+    "Sell": (
+        "Sell(address,bool,uint256,uint256,uint256,uint256,bool)",
+        "sells",
+        [
+            "is_long_token",
+            "strike_index",
+            "options_in",
+            "amount_out",
+            "new_supply",
+            "is_settled",
+        ],
+        ["bool", "uint256", "uint256", "uint256", "uint256", "bool"],
+    ),
+    "Deposit": (
+        "Deposit(address,uint256,uint256,uint256)",
+        "deposits",
+        ["shares_out", "amount_in", "new_supply"],
+        ["uint256", "uint256", "uint256"],
+    ),
+    "Withdraw": (
+        "Withdraw(address,uint256,uint256,uint256,bool)",
+        "withdraws",
+        ["shares_in", "amount_out", "new_supply", "is_settled"],
+        ["uint256", "uint256", "uint256", "bool"],
+    ),
+    "Settle": (
+        "Settle(uint256)",
+        "settles",
+        ["expiry_price"],
+        ["uint256"],
+    ),
+    "BuyMany": (
+        "BuyMany(address,uint256[],uint256[],uint256,uint256)",
+        "buy_many",
+        ["long_options_out", "short_options_out", "shares_out", "amount_in"],
+        ["uint256[]", "uint256[]", "uint256", "uint256"],
+    ),
+    "SellMany": (
+        "SellMany(address,uint256[],uint256[],uint256,uint256,bool)",
+        "sell_many",
+        [
+            "long_options_in",
+            "short_options_in",
+            "shares_in",
+            "amount_out",
+            "is_settled",
+        ],
+        ["uint256[]", "uint256[]", "uint256", "uint256", "bool"],
+    ),
+}
+
+MARKET_CREATED = "MarketCreated(address,address,address,address[],address[])"
+
+# all events except Settle have an indexed account
+HAS_ACCOUNT = {name: name != "Settle" for name in EVENTS}
+
+TOPICS = {
+    web3.keccak(text=signature).hex(): name
+    for name, (signature, _, _, _) in EVENTS.items()
+}
+
+
+class EventIndexer:
+    def __init__(self, factory, db_path, start_block=0):
+        self.factory = factory
+        self.start_block = start_block
+        self.chunk_size = CHUNK_SIZE
+        self.db = sqlite3.connect(db_path)
+        self._create_tables()
+
+    def _create_tables(self):
+        with self.db:
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS markets (address TEXT PRIMARY KEY, last_block INTEGER)"
+            )
+            for name, (_, table, columns, _) in EVENTS.items():
+                account = ["account TEXT"] if HAS_ACCOUNT[name] else []
+                self.db.execute(
+                    f"CREATE TABLE IF NOT EXISTS {table} ("
+                    + ", ".join(
+                        [
+                            "market TEXT",
+                            "block_number INTEGER",
+                            "log_index INTEGER",
+                            "tx_hash TEXT",
+                        ]
+                        + account
+                        + columns
+                        + ["PRIMARY KEY (block_number, log_index)"]
+                    )
+                    + ")"
+                )
+                self.db.execute(
+                    f"CREATE INDEX IF NOT EXISTS {table}_market ON {table} (market, block_number)"
+                )
+
+    def update_markets(self):
+        """
+        Add markets created since the last call
+        """
+        known = self.db.execute("SELECT COUNT(*) FROM markets").fetchone()[0]
+        total = self.factory.numMarkets()
+        with self.db:
+            for i in range(known, total):
+                address = str(self.factory.markets(i))
+                self.db.execute(
+                    "INSERT OR IGNORE INTO markets VALUES (?, ?)",
+                    (address, self.start_block - 1),
+                )
+        return total - known
+
+    def sync(self, to_block):
+        """
+        Index all markets up to and including `to_block`. Markets are grouped
+        by their last indexed block so that new markets are backfilled
+        separately and then indexed together with the others
+        """
+        while True:
+            rows = self.db.execute(
+                "SELECT address, last_block FROM markets WHERE last_block < ?",
+                (to_block,),
+            )
+            groups = {}
+            for address, last_block in rows:
+                groups.setdefault(last_block, []).append(address)
+            if not groups:
+                break
+
+            last_block = min(groups)
+            self._index_range(groups[last_block], last_block + 1, to_block)
+
+    def _index_range(self, markets, from_block, to_block):
+        while from_block <= to_block:
+            end_block = min(from_block + self.chunk_size - 1, to_block)
+            try:
+                logs = web3.eth.getLogs(
+                    {
+                        "address": markets,
+                        "topics": [list(TOPICS)],
+                        "fromBlock": from_block,
+                        "toBlock": end_block,
+                    }
+                )
+            except ValueError:
+                # most nodes limit the number of results per call
+                if self.chunk_size <= MIN_CHUNK_SIZE:
+                    raise
+                self.chunk_size = max(self.chunk_size // 2, MIN_CHUNK_SIZE)
+                continue
+
+            rows = decode_logs(logs)
+            with self.db:
+                for name, (_, table, _, _) in EVENTS.items():
+                    if rows[name]:
+                        placeholders = ", ".join("?" * len(rows[name][0]))
+                        self.db.executemany(
+                            f"INSERT OR REPLACE INTO {table} VALUES ({placeholders})",
+                            rows[name],
+                        )
+                self.db.executemany(
+                    "UPDATE markets SET last_block = ? WHERE address = ?",
+                    [(end_block, market) for market in markets],
+                )
+
+            print(f"Indexed blocks {from_block}-{end_block}: {len(logs)} events")
+            from_block = end_block + 1
+            self.chunk_size = min(self.chunk_size * 2, CHUNK_SIZE)
+
+    def follow(self):
+        """
+        Index confirmed blocks as they are mined
+        """
+        while True:
+            self.update_markets()
+            self.sync(chain.height - CONFIRMATIONS)
+            time.sleep(POLL_INTERVAL)
+
+
+def decode_logs(logs):
+    """
+    Decode logs into rows for each table, grouped by event name
+    """
+    rows = {name: [] for name in EVENTS}
+    for log in logs:
+        name = TOPICS[_hex(log["topics"][0])]
+        _, _, _, types = EVENTS[name]
+        row = [
+            to_checksum_address(log["address"]),
+            log["blockNumber"],
+            log["logIndex"],
+            _hex(log["transactionHash"]),
+        ]
+        if HAS_ACCOUNT[name]:
+            row.append(to_checksum_address(_hex(log["topics"][1])[-40:]))
+
+        data = log["data"]
+        values = decode_abi(
+            types, bytes.fromhex(data[2:]) if isinstance(data, str) else bytes(data)
+        )
+        row += [_encode(value) for value in values]
+        rows[name].append(row)
+    return rows
+
+
+def _encode(value):
+    if isinstance(value, (list, tuple)):
+        return json.dumps([str(v) for v in value])
+    if isinstance(value, int) and not isinstance(value, bool):
+        return str(value)
+    return value
+
+
+def first_market_block(factory):
+    """
+    Block of the factory's first `MarketCreated` log, or None if it has none.
+    Markets don't emit events before they're created, so no events are missed
+    by starting here
+    """
+    logs = web3.eth.getLogs(
+        {
+            "address": factory.address,
+            "topics": [web3.keccak(text=MARKET_CREATED).hex()],
+            "fromBlock": 0,
+            "toBlock": "latest",
+        }
+    )
+    return min((log["blockNumber"] for log in logs), default=None)
+
+
+def deployment_block(address):
+    """
+    First block in which `address` has code. Contracts can't be deployed
+    and then removed without selfdestruct, which the factory doesn't have,
+    so having code is monotonic in the block number
+
+    Needs an archive node, since full nodes don't serve code at old blocks
+    """
+    lo, hi = 0, web3.eth.blockNumber
+    if not web3.eth.getCode(address, hi):
+        raise ValueError(f"No contract at {address}")
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if web3.eth.getCode(address, mid):
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo
+
+
+def _hex(value):
+    return value if isinstance(value, str) else value.hex()
+
+
+def start_block(factory, network_name, from_block=None):
+    if from_block == "search":
+        block = deployment_block(factory.address)
+        print(f"Factory deployed in block {block}")
+        return block
+    if from_block is not None:
+        return int(from_block)
+    if network_name in START_BLOCKS:
+        return START_BLOCKS[network_name]
+
+    block = first_market_block(factory)
+    if block is None:
+        raise ValueError(
+            "Factory has no MarketCreated logs. Pass the block to start from, "
+            'or "search" to find its deployment block with an archive node'
+        )
+    print(f"First market created in block {block}")
+    return block
+
+
+def main(from_block=None):
+    _network = network.show_active()
+    factory = OptionFactory.at(FACTORY[_network])
+    indexer = EventIndexer(
+        factory,
+        DB_PATH.format(network=_network),
+        start_block(factory, _network, from_block),
+    )
+
+    print(f"Found {indexer.update_markets()} new markets")
+    indexer.follow()
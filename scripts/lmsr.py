@@ -0,0 +1,129 @@
+"""
+Vectorized implementation of the LMSR cost function used by OptionMarket
+
+Works on batches of market states so that whole strike ladders and grids of
+candidate states can be priced in a single call. Quantities are passed as an
+array of shape (states, outcomes) and the liquidity parameter `b` as an array
+of shape (states,). A single state can also be passed as a 1-D array together
+with a scalar `b`.
+
+As in `OptionMath.calcLmsrCost`, the cost is evaluated as
+
+  C(q_1, ..., q_n) = m + b * log(exp((q_1 - m) / b) + ... + exp((q_n - m) / b))
+
+where m = max(q_1, ..., q_n), which avoids overflow when calculating
+exponentials.
+
+Marginal prices are calculated in closed form from the gradient of the cost
+function rather than by finite differences.
+
+Results are double precision floats. Use `calc_lslmsr_cost.cost(..., precise=True)`
+for a high-precision reference.
+"""
+
+import numpy as np
+
+
+def _as_batch(quantities, b):
+    q = np.asarray(quantities, dtype=float)
+    is_single = q.ndim == 1
+    q = np.atleast_2d(q)
+    b = np.broadcast_to(np.asarray(b, dtype=float), q.shape[:1])
+    return q, b, is_single
+
+
+def cost(quantities, b):
+    """
+    Calculates LMSR cost for a batch of states
+
+    Cost converges to max(q) as b tends to 0, so this is returned for states
+    with b = 0
+    """
+    q, b, is_single = _as_batch(quantities, b)
+    mx = q.max(axis=1)
+
+    # avoid dividing by zero. these rows are overwritten below
+    has_liquidity = b > 0
+    safe_b = np.where(has_liquidity, b, 1.0)
+
+    a = np.exp((q - mx[:, None]) / safe_b[:, None]).sum(axis=1)
+    res = np.where(has_liquidity, mx + safe_b * np.log(a), mx)
+    return res[0] if is_single else res
+
+
+def prices(quantities, b):
+    """
+    Calculates marginal prices of each outcome for a batch of states
+
+    The gradient of the LMSR cost function is the softmax of q / b. Returns a
+    tuple of prices with the same shape as `quantities` and the sum of prices
+    of each state, which is always 1 for the LMSR
+
+    When b = 0 the price is split equally between the outcomes with the
+    largest quantity
+    """
+    q, b, is_single = _as_batch(quantities, b)
+    res, _ = _softmax(q, b)
+    return _unbatch(res, is_single)
+
+
+def lslmsr_cost(quantities, alpha):
+    """
+    Calculates cost function described in Othman et al., 2013 for a batch of
+    states
+
+    This is the same as the LMSR except the liquidity parameter is proportional
+    to the total quantity, b = alpha * sum(q)
+    """
+    q = np.asarray(quantities, dtype=float)
+    b = alpha * q.sum(axis=-1)
+    return cost(q, b)
+
+
+def lslmsr_prices(quantities, alpha):
+    """
+    Calculates marginal prices of each outcome for a batch of states using the
+    cost function described in Othman et al., 2013
+
+    Differentiating C = b * log(sum(exp(q_j / b))) with b = alpha * sum(q) gives
+
+      p_i = alpha * log(sum(exp((q_j - m) / b))) + s_i + (m - sum(q_j * s_j)) / sum(q)
+
+    where s = softmax(q / b) and m = max(q). Returns a tuple of prices with the
+    same shape as `quantities` and the sum of prices of each state, which is
+    between 1 and 1 + alpha * n log n
+    """
+    q = np.asarray(quantities, dtype=float)
+    q, b, is_single = _as_batch(q, alpha * q.sum(axis=-1))
+    s, a = _softmax(q, b)
+
+    total = q.sum(axis=1)
+    has_liquidity = b > 0
+    safe_total = np.where(has_liquidity, total, 1.0)
+    mx = q.max(axis=1)
+    spread = alpha * np.log(a) + (mx - (q * s).sum(axis=1)) / safe_total
+    res = s + np.where(has_liquidity, spread, 0.0)[:, None]
+    return _unbatch(res, is_single)
+
+
+def _softmax(q, b):
+    """
+    Returns softmax(q / b) along with the sum of exponentials after shifting by
+    max(q), which callers can reuse to evaluate the cost
+    """
+    mx = q.max(axis=1)
+    has_liquidity = b > 0
+    safe_b = np.where(has_liquidity, b, 1.0)
+    e = np.exp((q - mx[:, None]) / safe_b[:, None])
+
+    # as b tends to 0, only the terms equal to max(q) remain
+    e = np.where(has_liquidity[:, None], e, q == mx[:, None])
+    a = e.sum(axis=1)
+    return e / a[:, None], a
+
+
+def _unbatch(prices, is_single):
+    price_sums = prices.sum(axis=1)
+    if is_single:
+        return prices[0], price_sums[0]
+    return prices, price_sums
@@ -0,0 +1,576 @@
+"""
+In-memory model of `OptionMarket` for backtesting
+
+`OptionMarketSim` mirrors `buy`, `sell`, `deposit`, `withdraw`, `buyMany`,
+`sellMany` and `settle`, including the fee, pool value, cap and pause logic,
+and raises `Revert` with the same message whenever the contract would revert.
+State is left unchanged when a method reverts.
+
+Token balances of individual accounts aren't tracked, only total supplies, so
+callers should keep track of their own positions.
+
+By default costs are calculated with the integer-exact port in
+`scripts.option_math`, so amounts match the contract to the wei. Pass
+`exact=False` to use floating point instead, which is several times faster
+and accurate enough for comparing fee and liquidity settings. Changes in cost
+too small for floating point to resolve are still calculated exactly, so small
+trades don't revert when they wouldn't in the contract.
+"""
+
+from math import exp, log
+
+from scripts.option_math import (
+    MAX_UINT256,
+    SCALE,
+    Revert,
+    add,
+    calc_lmsr_cost,
+    calc_payoff,
+    div,
+    mul,
+    sub,
+)
+
+
+SCALE_SCALE = SCALE * SCALE
+
+# changes in floating point cost smaller than this relative to the size of the
+# quantities and b are recalculated exactly
+FLOAT_TOLERANCE = 1e-12
+
+
+class OptionMarketSim:
+    __slots__ = (
+        "strike_prices",
+        "expiry_time",
+        "is_put",
+        "trading_fee",
+        "balance_cap",
+        "total_supply_cap",
+        "dispute_period",
+        "is_paused",
+        "is_settled",
+        "expiry_price",
+        "last_cost",
+        "last_payoff",
+        "pool_value",
+        "total_supply",
+        "balance",
+        "long_supplies",
+        "short_supplies",
+        "timestamp",
+        "_quantities",
+        "_lmsr_cost",
+        "_last_cost_state",
+    )
+
+    def __init__(
+        self,
+        strike_prices,
+        expiry_time,
+        is_put,
+        trading_fee,
+        balance_cap=0,
+        total_supply_cap=0,
+        dispute_period=0,
+        timestamp=0,
+        exact=True,
+    ):
+        n = len(strike_prices)
+        if n == 0:
+            raise Revert("Strike prices must not be empty")
+        if strike_prices[0] == 0:
+            raise Revert("Strike prices must be > 0")
+        for i in range(n - 1):
+            if strike_prices[i] >= strike_prices[i + 1]:
+                raise Revert("Strike prices must be increasing")
+        if trading_fee >= SCALE:
+            raise Revert("Trading fee must be < 1")
+        if timestamp >= expiry_time:
+            raise Revert("Already expired")
+
+        self.strike_prices = tuple(strike_prices)
+        self.expiry_time = expiry_time
+        self.is_put = is_put
+        self.trading_fee = trading_fee
+        self.balance_cap = balance_cap
+        self.total_supply_cap = total_supply_cap
+        self.dispute_period = dispute_period
+
+        self.is_paused = False
+        self.is_settled = False
+        self.expiry_price = 0
+        self.last_cost = 0
+        self.last_payoff = 0
+        self.pool_value = 0
+
+        # total supply of lp shares and base token balance of market
+        self.total_supply = 0
+        self.balance = 0
+
+        self.long_supplies = [0] * n
+        self.short_supplies = [0] * n
+        self.timestamp = timestamp
+
+        # reused between trades to avoid allocating
+        self._quantities = [0] * (n + 1)
+        self._lmsr_cost = calc_lmsr_cost if exact else _float_lmsr_cost
+        self._last_cost_state = None
+        self._set_last_cost(0)
+
+    @classmethod
+    def from_market(cls, market, exact=True):
+        """
+        Load current state of a deployed `OptionMarket` from the chain
+        """
+        # only needed here so the simulator can be used without a network
+        from brownie import OptionToken, ZERO_ADDRESS, chain, web3
+
+        n = market.numStrikes()
+        sim = cls.__new__(cls)
+        sim.strike_prices = tuple(market.strikePrices(i) for i in range(n))
+        sim.expiry_time = market.expiryTime()
+        sim.is_put = market.isPut()
+        sim.trading_fee = market.tradingFee()
+        sim.balance_cap = market.balanceCap()
+        sim.total_supply_cap = market.totalSupplyCap()
+        sim.dispute_period = market.disputePeriod()
+
+        sim.is_paused = market.isPaused()
+        sim.is_settled = market.isSettled()
+        sim.expiry_price = market.expiryPrice()
+        sim.last_payoff = market.lastPayoff()
+        sim.pool_value = market.poolValue()
+
+        sim.total_supply = market.totalSupply()
+        base_token = market.baseToken()
+        if base_token == ZERO_ADDRESS:
+            sim.balance = web3.eth.getBalance(market.address)
+        else:
+            sim.balance = OptionToken.at(base_token).balanceOf(market)
+
+        sim.long_supplies = [
+            OptionToken.at(market.longTokens(i)).totalSupply() for i in range(n)
+        ]
+        sim.short_supplies = [
+            OptionToken.at(market.shortTokens(i)).totalSupply() for i in range(n)
+        ]
+        sim.timestamp = chain.time()
+
+        sim._quantities = [0] * (n + 1)
+        sim._lmsr_cost = calc_lmsr_cost if exact else _float_lmsr_cost
+        sim._last_cost_state = None
+        sim._update_quantities()
+        sim._set_last_cost(market.lastCost())
+        return sim
+
+    def copy(self):
+        sim = OptionMarketSim.__new__(OptionMarketSim)
+        for name in self.__slots__:
+            value = getattr(self, name)
+            setattr(sim, name, list(value) if isinstance(value, list) else value)
+        return sim
+
+    def buy(
+        self,
+        is_long_token,
+        strike_index,
+        options_out,
+        max_amount_in=MAX_UINT256,
+        is_owner=False,
+    ):
+        _require(self.total_supply > 0, "No liquidity")
+        _require(not self.is_expired(), "Already expired")
+        _require(is_owner or not self.is_paused, "Paused")
+        _require(strike_index < len(self.strike_prices), "Index too large")
+        _require(options_out > 0, "Options out must be > 0")
+
+        # mint options
+        supplies = self.long_supplies if is_long_token else self.short_supplies
+        supply_before = supplies[strike_index]
+        supplies[strike_index] = add(supply_before, options_out)
+
+        try:
+            fee = self._fee(strike_index, options_out)
+            pool_value = add(self.pool_value, fee)
+
+            cost_after = self.current_cost()
+            amount_in = add(sub(cost_after, self.last_cost), fee)
+            _require(amount_in > 0, "Amount in must be > 0")
+            _require(amount_in <= max_amount_in, "Max slippage exceeded")
+            balance = self._check_transfer_in(amount_in)
+        except Revert:
+            supplies[strike_index] = supply_before
+            raise
+
+        self.pool_value = pool_value
+        self._set_last_cost(cost_after)
+        self.balance = balance
+        return amount_in
+
+    def sell(
+        self, is_long_token, strike_index, options_in, min_amount_out=0, is_owner=False
+    ):
+        _require(
+            not self.is_expired() or self.is_settled,
+            "Must be called before expiry or after settlement",
+        )
+        _require(not self.is_dispute_period(), "Dispute period")
+        _require(is_owner or not self.is_paused, "Paused")
+        _require(strike_index < len(self.strike_prices), "Index too large")
+        _require(options_in > 0, "Options in must be > 0")
+
+        # burn options
+        supplies = self.long_supplies if is_long_token else self.short_supplies
+        supply_before = supplies[strike_index]
+        _require(supply_before >= options_in, "ERC20: burn amount exceeds balance")
+        supplies[strike_index] = supply_before - options_in
+
+        try:
+            if self.is_settled:
+                # if after settlement, amount is the option payoff
+                payoff_after = self.current_payoff()
+                amount_out = sub(self.last_payoff, payoff_after)
+            else:
+                # if before expiry, amount is the decrease in LMSR cost
+                cost_after = self.current_cost()
+                amount_out = sub(self.last_cost, cost_after)
+            _require(amount_out > 0, "Amount out must be > 0")
+            _require(amount_out >= min_amount_out, "Max slippage exceeded")
+            balance = sub(self.balance, amount_out)
+        except Revert:
+            supplies[strike_index] = supply_before
+            raise
+
+        if self.is_settled:
+            self.last_payoff = payoff_after
+        else:
+            self._set_last_cost(cost_after)
+        self.balance = balance
+        return amount_out
+
+    def deposit(self, shares_out, max_amount_in=MAX_UINT256, is_owner=False):
+        _require(not self.is_expired(), "Already expired")
+        _require(is_owner or not self.is_paused, "Paused")
+        _require(shares_out > 0, "Shares out must be > 0")
+
+        # contribute proportional amount of fees to pool
+        amount_in = 0
+        pool_value = self.pool_value
+        total_supply_before = self.total_supply
+        if total_supply_before > 0:
+            # add 1 to round up
+            amount_in = add(div(mul(pool_value, shares_out), total_supply_before), 1)
+            pool_value = add(pool_value, amount_in)
+
+        total_supply = add(total_supply_before, shares_out)
+        _require(
+            self.total_supply_cap == 0 or total_supply <= self.total_supply_cap,
+            "Total supply cap exceeded",
+        )
+
+        self.total_supply = total_supply
+        try:
+            # need to add increase in LMSR cost after increasing b
+            cost_after = self.current_cost()
+            amount_in = add(sub(cost_after, self.last_cost), amount_in)
+            _require(amount_in > 0, "Amount in must be > 0")
+            _require(amount_in <= max_amount_in, "Max slippage exceeded")
+            balance = self._check_transfer_in(amount_in)
+        except Revert:
+            self.total_supply = total_supply_before
+            raise
+
+        self.pool_value = pool_value
+        self._set_last_cost(cost_after)
+        self.balance = balance
+        return amount_in
+
+    def withdraw(self, shares_in, min_amount_out=0, is_owner=False):
+        _require(
+            not self.is_expired() or self.is_settled,
+            "Must be called before expiry or after settlement",
+        )
+        _require(not self.is_dispute_period(), "Dispute period")
+        _require(is_owner or not self.is_paused, "Paused")
+        _require(shares_in > 0, "Shares in must be > 0")
+
+        # calculate cut of fees
+        total_supply_before = self.total_supply
+        amount_out = div(mul(self.pool_value, shares_in), total_supply_before)
+        pool_value = sub(self.pool_value, amount_out)
+        _require(total_supply_before >= shares_in, "ERC20: burn amount exceeds balance")
+
+        self.total_supply = total_supply_before - shares_in
+        try:
+            # if before expiry, add decrease in LMSR cost after decreasing b
+            if not self.is_settled:
+                cost_after = self.current_cost()
+                amount_out = add(sub(self.last_cost, cost_after), amount_out)
+            _require(amount_out > 0, "Amount out must be > 0")
+            _require(amount_out >= min_amount_out, "Max slippage exceeded")
+            balance = sub(self.balance, amount_out)
+        except Revert:
+            self.total_supply = total_supply_before
+            raise
+
+        if not self.is_settled:
+            self._set_last_cost(cost_after)
+        self.pool_value = pool_value
+        self.balance = balance
+        return amount_out
+
+    def buy_many(
+        self,
+        long_options_out,
+        short_options_out,
+        shares_out=0,
+        max_amount_in=MAX_UINT256,
+        is_owner=False,
+    ):
+        """
+        Same as `deposit` followed by `buy` for each nonzero amount, with the
+        LMSR cost evaluated once
+        """
+        n = len(self.strike_prices)
+        _require(not self.is_expired(), "Already expired")
+        _require(is_owner or not self.is_paused, "Paused")
+        _require(len(long_options_out) == n, "Lengths do not match")
+        _require(len(short_options_out) == n, "Lengths do not match")
+
+        saved = (list(self.long_supplies), list(self.short_supplies), self.total_supply)
+        try:
+            amount_in = 0
+            pool_value = self.pool_value
+            if shares_out > 0:
+                if self.total_supply > 0:
+                    # add 1 to round up
+                    amount_in = add(
+                        div(mul(pool_value, shares_out), self.total_supply), 1
+                    )
+                    pool_value = add(pool_value, amount_in)
+                self.total_supply = add(self.total_supply, shares_out)
+                _require(
+                    self.total_supply_cap == 0
+                    or self.total_supply <= self.total_supply_cap,
+                    "Total supply cap exceeded",
+                )
+            _require(self.total_supply > 0, "No liquidity")
+
+            # mint options
+            fee = 0
+            legs = [
+                (self.long_supplies, long_options_out),
+                (self.short_supplies, short_options_out),
+            ]
+            for i in range(n):
+                for supplies, options_out in legs:
+                    if options_out[i] > 0:
+                        supplies[i] = add(supplies[i], options_out[i])
+                        fee = add(fee, self._fee(i, options_out[i]))
+            pool_value = add(pool_value, fee)
+
+            cost_after = self.current_cost()
+            amount_in = add(add(sub(cost_after, self.last_cost), fee), amount_in)
+            _require(amount_in > 0, "Amount in must be > 0")
+            _require(amount_in <= max_amount_in, "Max slippage exceeded")
+            balance = self._check_transfer_in(amount_in)
+        except Revert:
+            self.long_supplies, self.short_supplies, self.total_supply = saved
+            raise
+
+        self.pool_value = pool_value
+        self._set_last_cost(cost_after)
+        self.balance = balance
+        return amount_in
+
+    def sell_many(
+        self,
+        long_options_in,
+        short_options_in,
+        shares_in=0,
+        min_amount_out=0,
+        is_owner=False,
+    ):
+        """
+        Same as `sell` for each nonzero amount followed by `withdraw`, with the
+        LMSR cost or payoff evaluated once
+        """
+        n = len(self.strike_prices)
+        _require(
+            not self.is_expired() or self.is_settled,
+            "Must be called before expiry or after settlement",
+        )
+        _require(not self.is_dispute_period(), "Dispute period")
+        _require(is_owner or not self.is_paused, "Paused")
+        _require(len(long_options_in) == n, "Lengths do not match")
+        _require(len(short_options_in) == n, "Lengths do not match")
+
+        saved = (list(self.long_supplies), list(self.short_supplies), self.total_supply)
+        try:
+            # burn options
+            legs = [
+                (self.long_supplies, long_options_in),
+                (self.short_supplies, short_options_in),
+            ]
+            for i in range(n):
+                for supplies, options_in in legs:
+                    if options_in[i] > 0:
+                        _require(
+                            supplies[i] >= options_in[i],
+                            "ERC20: burn amount exceeds balance",
+                        )
+                        supplies[i] -= options_in[i]
+
+            amount_out = 0
+            pool_value = self.pool_value
+            if shares_in > 0:
+                amount_out = div(mul(pool_value, shares_in), self.total_supply)
+                pool_value = sub(pool_value, amount_out)
+                _require(
+                    self.total_supply >= shares_in, "ERC20: burn amount exceeds balance"
+                )
+                self.total_supply -= shares_in
+
+            if self.is_settled:
+                payoff_after = self.current_payoff()
+                amount_out = add(sub(self.last_payoff, payoff_after), amount_out)
+            else:
+                cost_after = self.current_cost()
+                amount_out = add(sub(self.last_cost, cost_after), amount_out)
+            _require(amount_out > 0, "Amount out must be > 0")
+            _require(amount_out >= min_amount_out, "Max slippage exceeded")
+            balance = sub(self.balance, amount_out)
+        except Revert:
+            self.long_supplies, self.short_supplies, self.total_supply = saved
+            raise
+
+        if self.is_settled:
+            self.last_payoff = payoff_after
+        else:
+            self._set_last_cost(cost_after)
+        self.pool_value = pool_value
+        self.balance = balance
+        return amount_out
+
+    def settle(self, expiry_price):
+        """
+        Store the expiry price, which is fetched from the oracle in the contract
+        """
+        _require(self.is_expired(), "Cannot be called before expiry")
+        _require(not self.is_settled, "Already settled")
+        _require(expiry_price > 0, "Price from oracle must be > 0")
+
+        # update cached payoff and pool value
+        payoff = calc_payoff(
+            self.strike_prices,
+            expiry_price,
+            self.is_put,
+            self.long_supplies,
+            self.short_supplies,
+        )
+        pool_value = sub(self.balance, payoff)
+
+        self.is_settled = True
+        self.expiry_price = expiry_price
+        self.last_payoff = payoff
+        self.pool_value = pool_value
+
+    def current_cost(self):
+        """
+        Same as `getCurrentCost()`
+        """
+        q = self._update_quantities()
+        b = self.total_supply
+        cost = self._lmsr_cost(q, b)
+        if self._last_cost_state is not None:
+            # rounding error in floating point can be larger than the change
+            # in cost of a small trade, giving it the wrong sign. in that case
+            # add the exact change since the last cost instead
+            if abs(cost - self.last_cost) <= FLOAT_TOLERANCE * (max(map(abs, q)) + b):
+                last_q, last_b = self._last_cost_state
+                cost = (
+                    self.last_cost
+                    + calc_lmsr_cost(q, b)
+                    - calc_lmsr_cost(last_q, last_b)
+                )
+        return cost
+
+    def _update_quantities(self):
+        """
+        Quantities are calculated in place as in `OptionMath.calcQuantities`
+        """
+        q = self._quantities
+        longs = self.long_supplies
+        shorts = self.short_supplies
+        strikes = self.strike_prices
+        if self.is_put:
+            # swap long and short supplies and multiply by strike price
+            q[0] = 0
+            for i in range(len(strikes)):
+                q[0] += longs[i] * strikes[i] // SCALE
+            for i in range(len(strikes)):
+                q[i + 1] = (
+                    q[i]
+                    + shorts[i] * strikes[i] // SCALE
+                    - longs[i] * strikes[i] // SCALE
+                )
+        else:
+            q[0] = sum(shorts)
+            for i in range(len(strikes)):
+                q[i + 1] = q[i] + longs[i] - shorts[i]
+        return q
+
+    def current_payoff(self):
+        return calc_payoff(
+            self.strike_prices,
+            self.expiry_price,
+            self.is_put,
+            self.long_supplies,
+            self.short_supplies,
+        )
+
+    def is_expired(self):
+        return self.timestamp >= self.expiry_time
+
+    def is_dispute_period(self):
+        return (
+            self.expiry_time <= self.timestamp < self.expiry_time + self.dispute_period
+        )
+
+    def _set_last_cost(self, cost):
+        # in floating point mode, also keep the quantities and b the cost is
+        # for, which are the ones from the last call to `current_cost`
+        self.last_cost = cost
+        if self._lmsr_cost is _float_lmsr_cost:
+            self._last_cost_state = (tuple(self._quantities), self.total_supply)
+
+    def _fee(self, strike_index, options_out):
+        # like LMSR cost, fees have to be multiplied by strike price
+        fee = mul(options_out, self.trading_fee)
+        if self.is_put:
+            return div(mul(fee, self.strike_prices[strike_index]), SCALE_SCALE)
+        return div(fee, SCALE)
+
+    def _check_transfer_in(self, amount_in):
+        balance = add(self.balance, amount_in)
+        _require(
+            self.balance_cap == 0 or balance <= self.balance_cap, "Balance cap exceeded"
+        )
+        return balance
+
+
+def _require(condition, message):
+    if not condition:
+        raise Revert(message)
+
+
+def _float_lmsr_cost(quantities, b):
+    mx = max(quantities)
+    if b == 0:
+        return mx
+
+    a = 0.0
+    for x in quantities:
+        a += exp((x - mx) / b)
+    return mx + int(b * log(a))
@@ -0,0 +1,42 @@
+"""
+On-disk cache of metadata that doesn't change after a contract is initialized
+
+Stores a JSON object per contract address, such as strike prices, token
+addresses and symbols, so `generate_options.py` and `generate_vaults.py` only
+need to fetch them the first time they see an address. There is one file per
+network.
+"""
+
+import json
+import os
+
+from brownie import network
+
+
+PATH = "metadata-{network}.json"
+
+
+class MetadataCache:
+    def __init__(self, path=None):
+        self.path = path or PATH.format(network=network.show_active())
+        self.entries = {}
+        if os.path.exists(self.path):
+            with open(self.path, "r") as f:
+                self.entries = json.load(f)
+
+    def get(self, address):
+        return self.entries.get(str(address).lower())
+
+    def set(self, address, metadata):
+        self.entries[str(address).lower()] = metadata
+
+    def missing(self, addresses):
+        return [address for address in addresses if self.get(address) is None]
+
+    def save(self):
+        # write to a temporary file first so the cache isn't corrupted if
+        # interrupted
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.entries, f, indent=4, sort_keys=True)
+        os.replace(tmp_path, self.path)
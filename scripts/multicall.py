@@ -0,0 +1,158 @@
+"""
+Batch contract reads into a small number of `eth_call`s using Multicall2
+
+Calls are queued with `add` and sent with `execute` in batches of
+`batch_size`. Each call is encoded and decoded with a brownie contract method
+with the right ABI, which doesn't need to be at the address being called, so
+a single contract object can be used for many tokens or markets without
+fetching their code.
+
+Calls that revert return None instead of failing the whole batch, which is
+needed for methods like `totalSupplyCap()` that don't exist on older markets.
+Some ERC20 tokens like MKR return `bytes32` instead of `string` from `symbol()`
+and `name()`, so string results that fail to decode are decoded as `bytes32`.
+
+Usage:
+>> multicall = Multicall()
+>> i = multicall.add(market.address, market.numStrikes)
+>> results = multicall.execute()
+>> numStrikes = results[i]
+"""
+
+import asyncio
+
+from brownie import Contract, chain
+from eth_abi.exceptions import DecodingError
+from hexbytes import HexBytes
+
+
+# deployed at the same address on mainnet, rinkeby, ropsten, kovan and goerli
+MULTICALL2_ADDRESS = "0x5BA1e12693Dc8F9c48aAD8770482f4739bEeD696"
+
+# max calls per eth_call
+BATCH_SIZE = 500
+
+MULTICALL2_ABI = [
+    {
+        "inputs": [
+            {"internalType": "bool", "name": "requireSuccess", "type": "bool"},
+            {
+                "components": [
+                    {"internalType": "address", "name": "target", "type": "address"},
+                    {"internalType": "bytes", "name": "callData", "type": "bytes"},
+                ],
+                "internalType": "struct Multicall2.Call[]",
+                "name": "calls",
+                "type": "tuple[]",
+            },
+        ],
+        "name": "tryAggregate",
+        "outputs": [
+            {
+                "components": [
+                    {"internalType": "bool", "name": "success", "type": "bool"},
+                    {"internalType": "bytes", "name": "returnData", "type": "bytes"},
+                ],
+                "internalType": "struct Multicall2.Result[]",
+                "name": "returnData",
+                "type": "tuple[]",
+            }
+        ],
+        "stateMutability": "nonpayable",
+        "type": "function",
+    }
+]
+
+
+class Multicall:
+    def __init__(
+        self, address=MULTICALL2_ADDRESS, batch_size=BATCH_SIZE, block_identifier=None
+    ):
+        self.contract = Contract.from_abi("Multicall2", address, MULTICALL2_ABI)
+        self.batch_size = batch_size
+
+        # all batches read from the same block so results are consistent
+        self.block_identifier = (
+            chain.height if block_identifier is None else block_identifier
+        )
+        self.calls = []
+
+    def add(self, address, method, *args):
+        """
+        Queue a call to `method` at `address` and return the index of its
+        result in the list returned by `execute`
+        """
+        self.calls.append((str(address), method, args))
+        return len(self.calls) - 1
+
+    def execute(self):
+        """
+        Send all queued calls and return their decoded results in the same
+        order, with None for calls that reverted
+        """
+        calls, self.calls = self.calls, []
+
+        results = []
+        for batch in self._batches(calls):
+            data = [
+                (address, method.encode_input(*args)) for address, method, args in batch
+            ]
+            returned = self.contract.tryAggregate.call(
+                False, data, block_identifier=self.block_identifier
+            )
+            results += _decode(batch, returned)
+        return results
+
+    async def execute_async(self, rpc):
+        """
+        Same as `execute` but sends all batches concurrently through an
+        `AsyncRpc` from `scripts.crawler`
+        """
+        calls, self.calls = self.calls, []
+
+        async def send(batch):
+            data = [
+                (address, method.encode_input(*args)) for address, method, args in batch
+            ]
+            output = await rpc.eth_call(
+                self.contract.address,
+                self.contract.tryAggregate.encode_input(False, data),
+                block_identifier=self.block_identifier,
+            )
+            return _decode(batch, self.contract.tryAggregate.decode_output(output))
+
+        results = await asyncio.gather(*[send(batch) for batch in self._batches(calls)])
+        return [result for batch in results for result in batch]
+
+    def _batches(self, calls):
+        return [
+            calls[start : start + self.batch_size]
+            for start in range(0, len(calls), self.batch_size)
+        ]
+
+
+def _decode(batch, returned):
+    results = []
+    for (_, method, _), (success, output) in zip(batch, returned):
+        # calls to addresses without code succeed with no output
+        if success and len(output) > 0:
+            results.append(decode_output(method, output))
+        else:
+            results.append(None)
+    return results
+
+
+def decode_output(method, output):
+    """
+    Same as `method.decode_output` but falls back to decoding `bytes32` with
+    trailing zeros removed for methods that return a string
+    """
+    try:
+        return method.decode_output(output)
+    except DecodingError:
+        if [o["type"] for o in method.abi["outputs"]] != ["string"]:
+            raise
+        output = HexBytes(output)
+        if len(output) != 32:
+            raise
+        return output.rstrip(b"\0").decode("utf-8", errors="replace")
@@ -0,0 +1,484 @@
+"""
+Integer-exact port of `OptionMath` and the `ABDKMath64x64` routines it uses
+
+Results match `OptionMarket.getCurrentCost()` and `getCurrentPayoff()` to the
+wei, so exact quotes can be calculated locally instead of with an `eth_call`
+to `OptionViews`. Whenever the contracts would revert, `Revert` is raised
+with the same message.
+
+64.64 fixed point numbers are represented as python ints holding the
+numerator, like the int128 values in the contracts.
+
+`calc_lmsr_cost_batch` evaluates the cost of many states at once. The loop in
+`exp_2`, which dominates the cost, runs once per batch on numpy arrays rather
+than once per quantity.
+"""
+
+import numpy as np
+
+
+SCALE = 10 ** 18
+
+MAX_UINT256 = (1 << 256) - 1
+MIN_64x64 = -(1 << 127)
+MAX_64x64 = (1 << 127) - 1
+
+# calc_lmsr_cost skips terms where (max(q) - q_i) // b is at least this, since
+# 45 * log2(e) > 64 so exp underflows to exactly 0
+EXP_UNDERFLOW = 45
+DIVU_OVERFLOW = 1 << 63
+
+# log2(e) and ln(2) as 128.128 fixed point numbers
+LOG2_E = 0x171547652B82FE1777D0FFDA0D23A7D12
+LN_2 = 0xB17217F7D1CF79ABC9E3B39803F2F6AF
+
+# exp_2 multiplies by 2^(2^-i) if the ith fractional bit is set
+EXP_2_FACTORS = [
+    0x16A09E667F3BCC908B2FB1366EA957D3E,
+    0x1306FE0A31B7152DE8D5A46305C85EDEC,
+    0x1172B83C7D517ADCDF7C8C50EB14A791F,
+    0x10B5586CF9890F6298B92B71842A98363,
+    0x1059B0D31585743AE7C548EB68CA417FD,
+    0x102C9A3E778060EE6F7CACA4F7A29BDE8,
+    0x10163DA9FB33356D84A66AE336DCDFA3F,
+    0x100B1AFA5ABCBED6129AB13EC11DC9543,
+    0x10058C86DA1C09EA1FF19D294CF2F679B,
+    0x1002C605E2E8CEC506D21BFC89A23A00F,
+    0x100162F3904051FA128BCA9C55C31E5DF,
+    0x1000B175EFFDC76BA38E31671CA939725,
+    0x100058BA01FB9F96D6CACD4B180917C3D,
+    0x10002C5CC37DA9491D0985C348C68E7B3,
+    0x1000162E525EE054754457D5995292026,
+    0x10000B17255775C040618BF4A4ADE83FC,
+    0x1000058B91B5BC9AE2EED81E9B7D4CFAB,
+    0x100002C5C89D5EC6CA4D7C8ACC017B7C9,
+    0x10000162E43F4F831060E02D839A9D16D,
+    0x100000B1721BCFC99D9F890EA06911763,
+    0x10000058B90CF1E6D97F9CA14DBCC1628,
+    0x1000002C5C863B73F016468F6BAC5CA2B,
+    0x100000162E430E5A18F6119E3C02282A5,
+    0x1000000B1721835514B86E6D96EFD1BFE,
+    0x100000058B90C0B48C6BE5DF846C5B2EF,
+    0x10000002C5C8601CC6B9E94213C72737A,
+    0x1000000162E42FFF037DF38AA2B219F06,
+    0x10000000B17217FBA9C739AA5819F44F9,
+    0x1000000058B90BFCDEE5ACD3C1CEDC823,
+    0x100000002C5C85FE31F35A6A30DA1BE50,
+    0x10000000162E42FF0999CE3541B9FFFCF,
+    0x100000000B17217F80F4EF5AADDA45554,
+    0x10000000058B90BFBF8479BD5A81B51AD,
+    0x1000000002C5C85FDF84BD62AE30A74CC,
+    0x100000000162E42FEFB2FED257559BDAA,
+    0x1000000000B17217F7D5A7716BBA4A9AE,
+    0x100000000058B90BFBE9DDBAC5E109CCE,
+    0x10000000002C5C85FDF4B15DE6F17EB0D,
+    0x1000000000162E42FEFA494F1478FDE05,
+    0x10000000000B17217F7D20CF927C8E94C,
+    0x1000000000058B90BFBE8F71CB4E4B33D,
+    0x100000000002C5C85FDF477B662B26945,
+    0x10000000000162E42FEFA3AE53369388C,
+    0x100000000000B17217F7D1D351A389D40,
+    0x10000000000058B90BFBE8E8B2D3D4EDE,
+    0x1000000000002C5C85FDF4741BEA6E77E,
+    0x100000000000162E42FEFA39FE95583C2,
+    0x1000000000000B17217F7D1CFB72B45E1,
+    0x100000000000058B90BFBE8E7CC35C3F0,
+    0x10000000000002C5C85FDF473E242EA38,
+    0x1000000000000162E42FEFA39F02B772C,
+    0x10000000000000B17217F7D1CF7D83C1A,
+    0x1000000000000058B90BFBE8E7BDCBE2E,
+    0x100000000000002C5C85FDF473DEA871F,
+    0x10000000000000162E42FEFA39EF44D91,
+    0x100000000000000B17217F7D1CF79E949,
+    0x10000000000000058B90BFBE8E7BCE544,
+    0x1000000000000002C5C85FDF473DE6ECA,
+    0x100000000000000162E42FEFA39EF366F,
+    0x1000000000000000B17217F7D1CF79AFA,
+    0x100000000000000058B90BFBE8E7BCD6D,
+    0x10000000000000002C5C85FDF473DE6B2,
+    0x1000000000000000162E42FEFA39EF358,
+    0x10000000000000000B17217F7D1CF79AB,
+]
+
+
+_EXP_2_BITS = [(1 << 63 - i, factor) for i, factor in enumerate(EXP_2_FACTORS)]
+
+
+class Revert(Exception):
+    """
+    Raised where the equivalent contract call would revert
+    """
+
+
+def _require(condition, message=""):
+    if not condition:
+        raise Revert(message)
+
+
+# SafeMath
+
+
+def add(a, b):
+    c = a + b
+    _require(c <= MAX_UINT256, "SafeMath: addition overflow")
+    return c
+
+
+def sub(a, b):
+    _require(b <= a, "SafeMath: subtraction overflow")
+    return a - b
+
+
+def mul(a, b):
+    c = a * b
+    _require(c <= MAX_UINT256, "SafeMath: multiplication overflow")
+    return c
+
+
+def div(a, b):
+    _require(b > 0, "SafeMath: division by zero")
+    return a // b
+
+
+# ABDKMath64x64
+
+
+def _to_int128(x):
+    x &= (1 << 128) - 1
+    return x - (1 << 128) if x >> 127 else x
+
+
+def add_64x64(x, y):
+    result = x + y
+    _require(MIN_64x64 <= result <= MAX_64x64)
+    return result
+
+
+def neg_64x64(x):
+    _require(x != MIN_64x64)
+    return -x
+
+
+def mulu(x, y):
+    """
+    Calculate x * y rounding down, where x is a 64.64 fixed point number and y
+    is an unsigned 256-bit integer
+    """
+    if y == 0:
+        return 0
+
+    _require(x >= 0)
+
+    lo = (x * (y & 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF)) >> 64
+    hi = x * (y >> 128)
+
+    _require(hi <= 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF)
+    hi <<= 64
+
+    _require(hi <= MAX_UINT256 - lo)
+    return hi + lo
+
+
+def divu(x, y):
+    """
+    Calculate x / y rounding towards zero, where x and y are unsigned 256-bit
+    integers
+    """
+    _require(y != 0)
+    result = _divuu(x, y)
+    _require(result <= MAX_64x64)
+    return result
+
+
+def _divuu(x, y):
+    _require(y != 0)
+
+    if x <= 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF:
+        result = (x << 64) // y
+    else:
+        # same truncated arithmetic as the contract so rounding matches exactly
+        msb = (x >> 192).bit_length() - 1 + 192
+
+        result = ((x << 255 - msb) & MAX_UINT256) // (((y - 1) >> msb - 191) + 1)
+        _require(result <= 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF)
+
+        hi = (result * (y >> 128)) & MAX_UINT256
+        lo = (result * (y & 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF)) & MAX_UINT256
+
+        xh = x >> 192
+        xl = (x << 64) & MAX_UINT256
+
+        if xl < lo:
+            xh -= 1
+        xl = (xl - lo) & MAX_UINT256
+        lo = (hi << 128) & MAX_UINT256
+        if xl < lo:
+            xh -= 1
+        xl = (xl - lo) & MAX_UINT256
+
+        _require(xh == hi >> 128)
+
+        result += xl // y
+
+    _require(result <= 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF)
+    return result
+
+
+def log_2(x):
+    _require(x > 0)
+
+    msb = x.bit_length() - 1
+    result = (msb - 64) << 64
+    ux = x << 127 - msb
+    bit = 0x8000000000000000
+    while bit > 0:
+        ux *= ux
+        b = ux >> 255
+        ux >>= 127 + b
+        result += bit * b
+        bit >>= 1
+
+    return _to_int128(result)
+
+
+def ln(x):
+    _require(x > 0)
+
+    # log_2 is negative when x < 1, so mimic the uint256 cast and overflow
+    product = ((log_2(x) & MAX_UINT256) * LN_2) & MAX_UINT256
+    return _to_int128(product >> 128)
+
+
+def exp_2(x):
+    _require(x < 0x400000000000000000)  # Overflow
+
+    if x < -0x400000000000000000:
+        return 0  # Underflow
+
+    result = 0x80000000000000000000000000000000
+    for bit, factor in _EXP_2_BITS:
+        if x & bit:
+            result = result * factor >> 128
+
+    result >>= 63 - (x >> 64)
+    _require(result <= MAX_64x64)
+    return result
+
+
+def exp(x):
+    _require(x < 0x400000000000000000)  # Overflow
+
+    if x < -0x400000000000000000:
+        return 0  # Underflow
+
+    return exp_2(_to_int128(x * LOG2_E >> 128))
+
+
+# OptionMath
+
+
+def calc_quantities(strike_prices, is_put, long_supplies, short_supplies):
+    """
+    Converts total supplies of options into the tokenized payoff quantities
+    used by the LMSR. Unlike the contract, the arguments are not mutated
+    """
+    n = len(strike_prices)
+    _require(len(long_supplies) == n, "Lengths do not match")
+    _require(len(short_supplies) == n, "Lengths do not match")
+
+    if is_put:
+        long_supplies = [
+            div(mul(x, k), SCALE) for x, k in zip(long_supplies, strike_prices)
+        ]
+        short_supplies = [
+            div(mul(x, k), SCALE) for x, k in zip(short_supplies, strike_prices)
+        ]
+
+    # swap short_supplies and long_supplies for puts
+    left_supplies = short_supplies if is_put else long_supplies
+    right_supplies = long_supplies if is_put else short_supplies
+
+    quantities = [0] * (n + 1)
+    for x in right_supplies:
+        quantities[0] = add(quantities[0], x)
+    for i in range(n):
+        quantities[i + 1] = sub(add(quantities[i], left_supplies[i]), right_supplies[i])
+    return quantities
+
+
+def calc_lmsr_cost(quantities, b):
+    max_quantity = max(quantities)
+
+    # cost converges to max(q) as b tends to 0
+    if b == 0:
+        return max_quantity
+
+    sum_exp = 0
+    for i, q in enumerate(quantities):
+        # reuse the previous term for equal adjacent quantities
+        if i == 0 or q != quantities[i - 1]:
+            diff = sub(max_quantity, q)
+            if diff // b >= EXP_UNDERFLOW:
+                # term is exactly 0, but divu would still revert
+                _require(diff // b < DIVU_OVERFLOW)
+                e = 0
+            else:
+                e = exp(neg_64x64(divu(diff, b)))
+        sum_exp = add_64x64(sum_exp, e)
+
+    return add(mulu(ln(sum_exp), b), max_quantity)
+
+
+def calc_payoff(strike_prices, expiry_price, is_put, long_supplies, short_supplies):
+    _require(len(long_supplies) == len(strike_prices), "Lengths do not match")
+    _require(len(short_supplies) == len(strike_prices), "Lengths do not match")
+
+    if expiry_price == 0:
+        return 0
+
+    payoff = 0
+    for strike_price, long_supply, short_supply in zip(
+        strike_prices, long_supplies, short_supplies
+    ):
+        if is_put and expiry_price < strike_price:
+            # put payoff = max(K - S, 0)
+            payoff = add(payoff, mul(long_supply, sub(strike_price, expiry_price)))
+        elif not is_put and expiry_price > strike_price:
+            # call payoff = max(S - K, 0)
+            payoff = add(payoff, mul(long_supply, sub(expiry_price, strike_price)))
+
+        # short payoff = min(S, K)
+        payoff = add(payoff, mul(short_supply, min(expiry_price, strike_price)))
+    return div(payoff, SCALE if is_put else expiry_price)
+
+
+def calc_lmsr_cost_batch(quantities, b):
+    """
+    Same as `calc_lmsr_cost` for a batch of states
+
+    `quantities` has shape (states, outcomes) and `b` has shape (states,).
+    Returns a list of costs, with None for states where the contract would
+    revert
+    """
+    q = np.array(quantities, dtype=object)
+    b = list(b)
+    max_quantity = q.max(axis=1)
+    diff = max_quantity[:, None] - q
+
+    result = [None] * len(b)
+    x = np.zeros(q.shape, dtype=object)
+    is_valid = np.zeros(len(b), dtype=bool)
+    for i, bi in enumerate(b):
+        # cost converges to max(q) as b tends to 0
+        if bi == 0:
+            result[i] = max_quantity[i]
+            continue
+        try:
+            x[i] = [divu(d, bi) for d in diff[i]]
+            is_valid[i] = True
+        except Revert:
+            pass
+
+    # exp(-x) = exp_2(-x * log2(e)), which underflows to 0 below -64
+    y = np.frompyfunc(_to_int128, 1, 1)(-x * LOG2_E >> 128)
+    underflow = (x > 0x400000000000000000) | (y < -0x400000000000000000)
+    y = np.where(underflow, 0, y)
+
+    # quotes against the same state share most of their terms
+    unique_y, inverse = np.unique(y.ravel(), return_inverse=True)
+    e = _exp_2_batch(unique_y)[inverse].reshape(y.shape)
+    e = np.where(underflow, 0, e)
+
+    sum_exp = e.sum(axis=1)
+    for i in np.nonzero(is_valid)[0]:
+        result[i] = _try(
+            lambda: add(mulu(ln(add_64x64(0, sum_exp[i])), b[i]), max_quantity[i])
+        )
+    return result
+
+
+def _try(f, *args):
+    try:
+        return f(*args)
+    except Revert:
+        return None
+
+
+_MASK_32 = np.uint64(0xFFFFFFFF)
+_SHIFT_32 = np.uint64(32)
+
+
+def _exp_2_batch(x):
+    """
+    Vectorized `exp_2` for arguments in [-64, 0]
+
+    Intermediate results are 128-bit, so they are stored as four 32-bit limbs
+    in uint64 arrays. Multiplying by a factor f = 2^128 + g and shifting right
+    by 128 is the same as adding the top 128 bits of the product with g.
+    """
+    shape = x.shape
+    x = x.ravel()
+    frac = (x & 0xFFFFFFFFFFFFFFFF).astype(np.uint64)
+
+    # result = 0x80000000000000000000000000000000
+    limbs = [np.zeros(len(x), dtype=np.uint64) for _ in range(4)]
+    limbs[3][:] = 0x80000000
+
+    for bit, g_limbs in _EXP_2_LIMBS:
+        is_set = (frac & bit) != 0
+        if not is_set.any():
+            continue
+        product = _mul_hi(limbs, g_limbs)
+
+        carry = np.zeros(len(x), dtype=np.uint64)
+        for j in range(4):
+            total = limbs[j] + product[j] + carry
+            carry = total >> _SHIFT_32
+            np.copyto(limbs[j], total & _MASK_32, where=is_set)
+
+    # result >>= 63 - (x >> 64). result < 2^128 and the shift is at least 63
+    hi = limbs[3] << _SHIFT_32 | limbs[2]
+    lo = limbs[1] << _SHIFT_32 | limbs[0]
+    shift = 63 - (x >> 64).astype(np.int64)
+    at_least_64 = shift >= 64
+    out = np.where(
+        at_least_64, hi >> np.where(at_least_64, shift - 64, 0).astype(np.uint64), 0
+    )
+    out = out.astype(object)
+
+    # only x = 0 has shift = 63, in which case the result is exactly 1
+    out = np.where(
+        at_least_64, out, ((hi.astype(object) << 64 | lo.astype(object)) >> 63)
+    )
+    return out.reshape(shape)
+
+
+def _mul_hi(a, b):
+    """
+    Top four 32-bit limbs of the product of two 128-bit numbers. `b` can have
+    fewer than four limbs if its top limbs are 0
+    """
+    n = len(a[0])
+    m = len(b)
+    product = [np.zeros(n, dtype=np.uint64) for _ in range(8)]
+    for i in range(4):
+        carry = np.zeros(n, dtype=np.uint64)
+        for j in range(m):
+            total = product[i + j] + a[i] * b[j] + carry
+            product[i + j] = total & _MASK_32
+            carry = total >> _SHIFT_32
+        product[i + m] = carry
+    return product[4:]
+
+
+def _to_limbs(x):
+    limbs = [np.uint64(x >> 32 * j & 0xFFFFFFFF) for j in range(4)]
+    while not limbs[-1]:
+        limbs.pop()
+    return limbs
+
+
+# factors in `EXP_2_FACTORS` are 2^128 + g with g < 2^128
+_EXP_2_LIMBS = [
+    (np.uint64(bit), _to_limbs(factor - (1 << 128))) for bit, factor in _EXP_2_BITS
+]
@@ -0,0 +1,283 @@
+"""
+Off-chain quotes for `OptionMarket`
+
+Quotes are calculated against the state of an `OptionMarketSim`, which can be
+loaded from the chain with `OptionMarketSim.from_market`, so no RPC calls are
+needed once the state has been fetched. Amounts match `OptionViews` and the
+market itself to the wei.
+
+`solve_buy_amounts` inverts `buy`: given a budget, it finds the largest
+`optionsOut` whose cost including fees is at most the budget. Newton's method
+on the floating point LMSR gives an estimate in a few steps, which is then
+refined with the exact cost.
+"""
+
+import numpy as np
+
+from scripts import lmsr
+from scripts.market_sim import SCALE_SCALE
+from scripts.option_math import (
+    SCALE,
+    add,
+    calc_lmsr_cost,
+    calc_lmsr_cost_batch,
+    calc_quantities,
+    sub,
+)
+
+
+NEWTON_STEPS = 8
+
+
+def buy_cost(market, is_long_token, strike_index, options_out):
+    """
+    Amount paid for buying options, including the trading fee. Same as
+    `OptionViews.getBuyOptionCost`
+    """
+    cost_after = calc_lmsr_cost(
+        _quantities_after(market, is_long_token, strike_index, options_out),
+        market.total_supply,
+    )
+    fee = _fee(market, strike_index, options_out)
+    return add(sub(cost_after, market.last_cost), fee)
+
+
+def quote_ladder(market, amount):
+    """
+    Cost of buying and selling `amount` of every long and short token. Same as
+    `OptionViews.getQuoteLadder`
+
+    Returns lists (long buy costs, short buy costs, long sell costs, short
+    sell costs). Sells of more than the total supply are quoted as 0
+    """
+    n = len(market.strike_prices)
+    quantities = calc_quantities(
+        market.strike_prices, market.is_put, market.long_supplies, market.short_supplies
+    )
+
+    legs = [
+        (is_buy, is_long, i)
+        for is_buy in (True, False)
+        for is_long in (True, False)
+        for i in range(n)
+    ]
+    states = []
+    for is_buy, is_long, i in legs:
+        delta = _ladder_delta(market, is_long, i, amount, is_buy)
+        if delta is None:
+            states.append(None)
+            continue
+        state = list(quantities)
+        is_left = is_long != market.is_put
+        for j in range(i + 1, n + 1) if is_left else range(i + 1):
+            state[j] = add(state[j], delta) if is_buy else sub(state[j], delta)
+        states.append(state)
+
+    # base cost is evaluated in the same batch as the legs
+    batch = [quantities] + [state for state in states if state is not None]
+    costs = calc_lmsr_cost_batch(batch, [market.total_supply] * len(batch))
+    for state, cost in zip(batch, costs):
+        if cost is None:
+            # raises the same error as the contract
+            calc_lmsr_cost(state, market.total_supply)
+    cost_before, costs = costs[0], iter(costs[1:])
+
+    quotes = []
+    for (is_buy, _, i), state in zip(legs, states):
+        if state is None:
+            quotes.append(0)
+        elif is_buy:
+            quotes.append(sub(add(next(costs), _fee(market, i, amount)), cost_before))
+        else:
+            quotes.append(sub(cost_before, next(costs)))
+    return quotes[:n], quotes[n : 2 * n], quotes[2 * n : 3 * n], quotes[3 * n :]
+
+
+def solve_buy_amount(market, is_long_token, strike_index, budget):
+    """
+    Largest amount of options that can be bought for at most `budget`
+    """
+    return solve_buy_amounts(market, [(strike_index, is_long_token, budget)])[0]
+
+
+def solve_buy_amounts(market, requests):
+    """
+    Same as `solve_buy_amount` for a batch of (strike index, is long, budget)
+    requests against the same market state
+
+    Returns 0 for requests that can't afford a single unit, or whose
+    largest affordable amount costs nothing, since the market rejects buys
+    that cost 0
+    """
+    if not requests:
+        return []
+
+    indexes = [index for index, _, _ in requests]
+    is_longs = [is_long for _, is_long, _ in requests]
+    budgets = [budget for _, _, budget in requests]
+
+    estimates = _newton(market, indexes, is_longs, budgets)
+    return _refine(market, indexes, is_longs, budgets, estimates)
+
+
+def _newton(market, indexes, is_longs, budgets):
+    """
+    Solve cost(x) = budget with the floating point LMSR, where the gradient
+    of the cost with respect to x is the sum of marginal prices of the
+    quantities that x increases plus the fee rate
+    """
+    q = np.array(
+        calc_quantities(
+            market.strike_prices,
+            market.is_put,
+            market.long_supplies,
+            market.short_supplies,
+        )
+    )
+    q = q.astype(float)
+    b = float(market.total_supply)
+    cost_before = lmsr.cost(q, b)
+
+    # increase in quantities per option bought
+    directions = np.array(
+        [_direction(market, i, is_long) for i, is_long in zip(indexes, is_longs)]
+    )
+    fee_rates = np.array([_fee_rate(market, i) for i in indexes])
+    budgets = np.array(budgets, dtype=float)
+
+    # start from the amount that could be bought at the current price
+    prices, _ = lmsr.prices(q, b)
+    x = budgets / (directions @ prices + fee_rates)
+
+    for _ in range(NEWTON_STEPS):
+        states = q + x[:, None] * directions
+        cost = lmsr.cost(states, b) - cost_before + x * fee_rates
+        prices, _ = lmsr.prices(states, b)
+        gradient = (directions * prices).sum(axis=1) + fee_rates
+        step = (cost - budgets) / gradient
+        x = np.maximum(x - step, 0.0)
+        if np.all(np.abs(step) < 1.0):
+            break
+    return [int(v) for v in x]
+
+
+def _refine(market, indexes, is_longs, budgets, estimates):
+    """
+    Find the largest affordable amount near each estimate using the exact
+    cost. First bracket the answer by doubling the distance from the estimate,
+    then bisect. All requests are evaluated together in each round
+    """
+    n = len(estimates)
+    lo = [None] * n  # largest amount known to be affordable
+    lo_cost = [0] * n
+    hi = [None] * n  # smallest amount known to be unaffordable
+    step = [max(1, x >> 40) for x in estimates]
+    trial = [max(x, 1) for x in estimates]
+
+    while True:
+        active = [
+            i for i in range(n) if lo[i] is None or hi[i] is None or hi[i] - lo[i] > 1
+        ]
+        if not active:
+            break
+
+        costs = _buy_costs(
+            market, [(indexes[i], is_longs[i], trial[i]) for i in active]
+        )
+        for i, cost in zip(active, costs):
+            if cost is not None and cost <= budgets[i]:
+                lo[i] = trial[i]
+                lo_cost[i] = cost
+            else:
+                hi[i] = trial[i]
+
+            if lo[i] is None and hi[i] == 1:
+                # can't afford a single unit
+                lo[i] = 0
+            elif lo[i] is None:
+                trial[i] = max(hi[i] - step[i], 1)
+                step[i] *= 2
+            elif hi[i] is None:
+                trial[i] = lo[i] + step[i]
+                step[i] *= 2
+            else:
+                trial[i] = (lo[i] + hi[i]) // 2
+
+    # cost doesn't decrease with amount, so if the largest affordable amount
+    # is free, all smaller ones are too
+    return [x if cost > 0 else 0 for x, cost in zip(lo, lo_cost)]
+
+
+def _buy_costs(market, requests):
+    """
+    Exact cost of a batch of (strike index, is long, options out) buys.
+    Returns None for buys that would revert
+    """
+    states = [
+        _quantities_after(market, is_long, index, x) for index, is_long, x in requests
+    ]
+    costs = calc_lmsr_cost_batch(states, [market.total_supply] * len(states))
+    return [
+        None
+        if cost is None or cost < market.last_cost
+        else cost - market.last_cost + _fee(market, index, x)
+        for cost, (index, _, x) in zip(costs, requests)
+    ]
+
+
+def _ladder_delta(market, is_long_token, strike_index, amount, is_buy):
+    """
+    Change in the quantities that include a token's supply, rounded the same
+    way as `calc_quantities`. Returns None for sells larger than the supply
+    """
+    supply = (market.long_supplies if is_long_token else market.short_supplies)[
+        strike_index
+    ]
+    if not is_buy and supply < amount:
+        return None
+    if not market.is_put:
+        return amount
+
+    strike = market.strike_prices[strike_index]
+    supply_after = supply + amount if is_buy else supply - amount
+    return abs(supply_after * strike // SCALE - supply * strike // SCALE)
+
+
+def _quantities_after(market, is_long_token, strike_index, options_out):
+    long_supplies = list(market.long_supplies)
+    short_supplies = list(market.short_supplies)
+    supplies = long_supplies if is_long_token else short_supplies
+    supplies[strike_index] = add(supplies[strike_index], options_out)
+    return calc_quantities(
+        market.strike_prices, market.is_put, long_supplies, short_supplies
+    )
+
+
+def _fee(market, strike_index, options_out):
+    fee = options_out * market.trading_fee
+    if market.is_put:
+        return fee * market.strike_prices[strike_index] // SCALE_SCALE
+    return fee // SCALE
+
+
+def _fee_rate(market, strike_index):
+    if market.is_put:
+        return market.trading_fee * market.strike_prices[strike_index] / SCALE_SCALE
+    return market.trading_fee / SCALE
+
+
+def _direction(market, strike_index, is_long_token):
+    """
+    Increase in each LMSR quantity per unit of option bought. For puts, long
+    and short are swapped and quantities are multiplied by the strike price
+    """
+    n = len(market.strike_prices)
+    direction = np.zeros(n + 1)
+    is_left = is_long_token != market.is_put
+    if is_left:
+        direction[strike_index + 1 :] = 1.0
+    else:
+        direction[: strike_index + 1] = 1.0
+    if market.is_put:
+        direction *= market.strike_prices[strike_index] / SCALE
+    return direction
@@ -0,0 +1,221 @@
+"""
+Rebalance options held by an `OptionLpVault` towards target exposures
+
+For each market in the vault, the target is the vault's payoff in each of the
+n + 1 buckets between strikes, in terms of the base token. Long and short
+options have payoffs given by the same matrix the LMSR uses in
+`OptionMath.calcQuantities`. LP shares pay out what's left after option
+holders are paid, which is taken from the current market state. The long,
+short and LP holdings closest to the target are found by non-negative least
+squares on these payoffs. A small cost term weighted by LMSR prices breaks
+ties between equivalent portfolios, for example buying both the long and
+short of the same strike.
+
+All holdings have non-negative payoffs, so targets with negative entries
+can't be reached and are rejected.
+
+Market state and vault balances are read once. The search and the
+calculation of expected amounts run against a local `OptionMarketSim`, so no
+RPC calls are made until the trades are sent. Trades are simulated with
+`sellMany` and `buyMany`, which are what `OptionLpVault.sell` and
+`OptionLpVault.buy` call, and slippage bounds are set `SLIPPAGE` away from
+the simulated amounts.
+
+Usage:
+>> brownie run rebalance_vault --network mainnet
+"""
+
+import numpy as np
+
+from scripts import lmsr
+from scripts.market_sim import OptionMarketSim
+from scripts.option_math import SCALE, calc_quantities
+
+
+VAULT = "0x55E4a8C56Adcd038B6115580C86c126cA63e60b6"
+
+# market address -> payoff in each bucket in terms of base token
+TARGETS = {
+    "0xF3917c023958EcD8C82a19b1B5C757913780eFb3": [
+        5,
+        5,
+        5,
+        5,
+        5,
+        6,
+        7,
+        8,
+        9,
+        10,
+        10,
+        10,
+        10,
+        10,
+    ],
+}
+
+SLIPPAGE = 0.01
+
+# weight of option cost relative to squared distance from target
+COST_WEIGHT = 1e-3
+
+SOLVER_SWEEPS = 500
+SOLVER_TOLERANCE = 1e-12
+
+# only send transactions if True, otherwise just print them
+SEND = False
+
+
+def payoff_matrix(strike_prices, is_put):
+    """
+    Payoff in each bucket of one long or short option. Columns are long
+    options followed by short options. Same as `calc_quantities` with a
+    supply of 1 for a single option
+    """
+    n = len(strike_prices)
+    A = np.zeros((n + 1, 2 * n))
+    for i in range(n):
+        left = np.arange(n + 1) > i
+        multiplier = strike_prices[i] / SCALE if is_put else 1.0
+
+        # for puts, shorts are on the left and longs on the right
+        A[:, i] = multiplier * (~left if is_put else left)
+        A[:, n + i] = multiplier * (left if is_put else ~left)
+    return A
+
+
+def lp_payoffs(sim):
+    """
+    Payoff in each bucket of one LP share, which is the cost and fees held by
+    the market minus what's paid to option holders. Trades by the vault
+    itself change this, so it's only exact for small trades
+    """
+    if sim.total_supply == 0:
+        return np.zeros(len(sim.strike_prices) + 1)
+    quantities = calc_quantities(
+        sim.strike_prices, sim.is_put, sim.long_supplies, sim.short_supplies
+    )
+    funds = sim.last_cost + sim.pool_value
+    return np.array([(funds - q) / sim.total_supply for q in quantities])
+
+
+def solve_holdings(A, target, prices, cost_weight=COST_WEIGHT, initial=None):
+    """
+    Minimize |A y - target|^2 / 2 + cost_weight * prices . y subject to y >= 0
+    by coordinate descent
+    """
+    Q = A.T @ A
+    c = A.T @ target - cost_weight * prices
+    y = np.zeros(A.shape[1]) if initial is None else np.maximum(initial, 0.0)
+
+    for _ in range(SOLVER_SWEEPS):
+        change = 0.0
+        for k in range(len(y)):
+            if Q[k, k] == 0:
+                continue
+            new = max(0.0, y[k] + (c[k] - Q[k] @ y) / Q[k, k])
+            change = max(change, abs(new - y[k]))
+            y[k] = new
+        if change < SOLVER_TOLERANCE * max(1.0, np.abs(y).max()):
+            break
+    return y
+
+
+def plan_market(sim, longs_held, shorts_held, lp_held, target, decimals):
+    """
+    Return arguments for `vault.sell` and `vault.buy` that move the vault's
+    holdings in a market to the target, or None if there's nothing to do.
+    `sim` is updated with the trades
+    """
+    n = len(sim.strike_prices)
+    if len(target) != n + 1:
+        raise ValueError(f"Target has {len(target)} buckets but market has {n + 1}")
+    if min(target) < 0:
+        raise ValueError(
+            f"Target has negative payoffs, which can't be reached: {target}"
+        )
+
+    scale = 10 ** decimals
+    A = np.column_stack([payoff_matrix(sim.strike_prices, sim.is_put), lp_payoffs(sim)])
+
+    # value of each holding is its expected payoff under LMSR prices
+    quantities = calc_quantities(
+        sim.strike_prices, sim.is_put, sim.long_supplies, sim.short_supplies
+    )
+    p, _ = lmsr.prices([float(q) for q in quantities], float(sim.total_supply))
+    prices = A.T @ p
+
+    current = longs_held + shorts_held + [lp_held]
+    held = np.array(current, dtype=float) / scale
+    y = solve_holdings(A, np.asarray(target, dtype=float), prices, initial=held)
+    new_holdings = [int(v * scale) for v in y]
+    delta = [new - old for new, old in zip(new_holdings, current)]
+
+    lp_delta = delta.pop()
+    sells = (
+        [max(-d, 0) for d in delta[:n]],
+        [max(-d, 0) for d in delta[n:]],
+        max(-lp_delta, 0),
+    )
+    buys = (
+        [max(d, 0) for d in delta[:n]],
+        [max(d, 0) for d in delta[n:]],
+        max(lp_delta, 0),
+    )
+
+    sell_args = buy_args = None
+    if any(sells[0]) or any(sells[1]) or sells[2]:
+        amount_out = sim.sell_many(*sells)
+        sell_args = (*sells, int(amount_out * (1 - SLIPPAGE)))
+
+    if any(buys[0]) or any(buys[1]) or buys[2]:
+        amount_in = sim.buy_many(*buys)
+        buy_args = (*buys, int(amount_in * (1 + SLIPPAGE)))
+
+    return sell_args, buy_args
+
+
+def main():
+    from brownie import accounts, network, OptionLpVault, OptionMarket, OptionToken
+
+    print(f"Network: {network.show_active()}")
+    vault = OptionLpVault.at(VAULT)
+    decimals = vault.decimals()
+
+    plans = []
+    for i in range(vault.numMarkets()):
+        market = OptionMarket.at(vault.markets(i))
+        target = next(
+            (v for k, v in TARGETS.items() if k.lower() == market.address.lower()), None
+        )
+        if target is None:
+            continue
+
+        n = market.numStrikes()
+        longs_held = [
+            OptionToken.at(market.longTokens(j)).balanceOf(vault) for j in range(n)
+        ]
+        shorts_held = [
+            OptionToken.at(market.shortTokens(j)).balanceOf(vault) for j in range(n)
+        ]
+        lp_held = market.balanceOf(vault)
+        sim = OptionMarketSim.from_market(market)
+
+        sell_args, buy_args = plan_market(
+            sim, longs_held, shorts_held, lp_held, target, decimals
+        )
+        plans.append((market, sell_args, buy_args))
+
+        print(f"Market: {market.address}")
+        print(f"Sell:   {sell_args}")
+        print(f"Buy:    {buy_args}")
+
+    if not SEND:
+        return
+
+    manager = accounts.load("deployer")
+    for market, sell_args, buy_args in plans:
+        if sell_args:
+            vault.sell(market, *sell_args, {"from": manager})
+        if buy_args:
+            vault.buy(market, *buy_args, {"from": manager})
@@ -0,0 +1,215 @@
+"""
+Reconstruct historical state of a market from events indexed by
+`index_events.py`
+
+Events are replayed through an `OptionMarketSim`, which recalculates
+`lastCost`, `poolValue` and `lastPayoff` exactly as the contract does, so no
+archive node is needed. Every `SNAPSHOT_INTERVAL` events a copy of the state
+is kept. Looking up the state at a block finds the nearest snapshot before it
+with a binary search and replays at most `SNAPSHOT_INTERVAL` events from
+there.
+
+Each replayed trade is checked against the amounts and new supplies in its
+event, so missing events are detected instead of silently giving wrong
+state.
+
+The market's balance is tracked from event amounts, so tokens sent directly
+to the market aren't included. After settlement this means `poolValue` can
+be lower than on-chain by the amount sent.
+
+Usage:
+>> replay = MarketReplay.from_market(db, market)
+>> state = replay.state_at(12000000)
+>> state.long_supplies, state.total_supply, state.pool_value, state.last_cost
+"""
+
+import json
+from bisect import bisect_right
+
+from scripts.index_events import EVENTS
+from scripts.market_sim import OptionMarketSim
+from scripts.option_math import MAX_UINT256, calc_quantities, sub
+
+
+SNAPSHOT_INTERVAL = 256
+
+
+class ReplayError(Exception):
+    pass
+
+
+class MarketReplay:
+    def __init__(
+        self,
+        db,
+        address,
+        strike_prices,
+        is_put,
+        trading_fee,
+        snapshot_interval=SNAPSHOT_INTERVAL,
+    ):
+        self.db = db
+        self.address = str(address)
+        self.snapshot_interval = snapshot_interval
+
+        # order of events already guarantees trades happen before expiry, so
+        # the simulator's clock is only moved forward at settlement
+        self.initial_state = OptionMarketSim(
+            strike_prices, MAX_UINT256, is_put, trading_fee
+        )
+
+        # (block number, log index) of each replayed event and of the last
+        # event before each snapshot
+        self.keys = []
+        self.events = []
+        self.snapshot_keys = []
+        self.snapshots = []
+        self.state = self.initial_state.copy()
+
+    @classmethod
+    def from_market(cls, db, market, snapshot_interval=SNAPSHOT_INTERVAL):
+        n = market.numStrikes()
+        return cls(
+            db,
+            market.address,
+            [market.strikePrices(i) for i in range(n)],
+            market.isPut(),
+            market.tradingFee(),
+            snapshot_interval,
+        )
+
+    def update(self):
+        """
+        Replay events indexed since the last call
+        """
+        after = self.keys[-1] if self.keys else (-1, -1)
+        for key, event in load_events(self.db, self.address, after):
+            apply_event(self.state, event)
+            self.keys.append(key)
+            self.events.append(event)
+            if len(self.events) % self.snapshot_interval == 0:
+                self.snapshot_keys.append(key)
+                self.snapshots.append(self.state.copy())
+
+    def state_at(self, block_number):
+        """
+        State after all events up to and including `block_number`
+        """
+        self.update()
+        end = bisect_right(self.keys, (block_number, MAX_UINT256))
+
+        i = bisect_right(self.snapshot_keys, (block_number, MAX_UINT256))
+        if i == 0:
+            state, start = self.initial_state.copy(), 0
+        else:
+            state, start = self.snapshots[i - 1].copy(), i * self.snapshot_interval
+
+        for event in self.events[start:end]:
+            apply_event(state, event)
+        return state
+
+
+def lp_value(state):
+    """
+    Amount all LP shares could be withdrawn for. Before settlement this is the
+    pool value plus the decrease in LMSR cost when b goes to 0
+    """
+    if state.is_settled:
+        return state.pool_value
+    quantities = calc_quantities(
+        state.strike_prices, state.is_put, state.long_supplies, state.short_supplies
+    )
+    return state.pool_value + sub(state.last_cost, max(quantities))
+
+
+def apply_event(state, event):
+    name, values = event
+    if name == "Buy":
+        is_long, index, options_out, amount_in, new_supply = values
+        _check(state.buy(is_long, index, options_out, is_owner=True), amount_in, name)
+        _check(_supply(state, is_long, index), new_supply, name)
+
+    elif name == "Sell":
+        is_long, index, options_in, amount_out, new_supply, _ = values
+        _check(state.sell(is_long, index, options_in, is_owner=True), amount_out, name)
+        _check(_supply(state, is_long, index), new_supply, name)
+
+    elif name == "Deposit":
+        shares_out, amount_in, new_supply = values
+        _check(state.deposit(shares_out, is_owner=True), amount_in, name)
+        _check(state.total_supply, new_supply, name)
+
+    elif name == "Withdraw":
+        shares_in, amount_out, new_supply, _ = values
+        _check(state.withdraw(shares_in, is_owner=True), amount_out, name)
+        _check(state.total_supply, new_supply, name)
+
+    elif name == "BuyMany":
+        long_options_out, short_options_out, shares_out, amount_in = values
+        _check(
+            state.buy_many(
+                long_options_out, short_options_out, shares_out, is_owner=True
+            ),
+            amount_in,
+            name,
+        )
+
+    elif name == "SellMany":
+        long_options_in, short_options_in, shares_in, amount_out, _ = values
+        _check(
+            state.sell_many(
+                long_options_in, short_options_in, shares_in, is_owner=True
+            ),
+            amount_out,
+            name,
+        )
+
+    elif name == "Settle":
+        (expiry_price,) = values
+        if not state.is_settled:
+            state.timestamp = state.expiry_time
+            state.settle(expiry_price)
+        else:
+            # emitted again by disputeExpiryPrice
+            state.expiry_price = expiry_price
+            state.last_payoff = state.current_payoff()
+            state.pool_value = sub(state.balance, state.last_payoff)
+
+
+def load_events(db, address, after=(-1, -1)):
+    """
+    Events of a market after (block number, log index) `after`, in the order
+    they were emitted
+    """
+    events = []
+    for name, (_, table, columns, types) in EVENTS.items():
+        rows = db.execute(
+            f"SELECT block_number, log_index, {', '.join(columns)} FROM {table} "
+            "WHERE market = ? AND (block_number > ? OR (block_number = ? AND log_index > ?))",
+            (address, after[0], after[0], after[1]),
+        )
+        for block_number, log_index, *values in rows:
+            values = [_decode(v, t) for v, t in zip(values, types)]
+            events.append(((block_number, log_index), (name, values)))
+    return sorted(events, key=lambda event: event[0])
+
+
+def _decode(value, abi_type):
+    if abi_type == "bool":
+        return bool(value)
+    if abi_type.endswith("[]"):
+        return [int(v) for v in json.loads(value)]
+    return int(value)
+
+
+def _supply(state, is_long_token, strike_index):
+    return (state.long_supplies if is_long_token else state.short_supplies)[
+        strike_index
+    ]
+
+
+def _check(value, expected, name):
+    if value != expected:
+        raise ReplayError(
+            f"{name} event doesn't match replayed state: {value} != {expected}"
+        )
@@ -1,7 +1,11 @@
-from brownie import chain
+from brownie import chain, ZERO_ADDRESS
 import pytest
 
 
+SCALE = 10 ** 18
+PERCENT = SCALE // 100
+
+
 @pytest.fixture
 def fast_forward():
     def f(future_time):
@@ -12,3 +16,67 @@ def fast_forward():
     chain.snapshot()
     yield f
     chain.revert()
+
+
+@pytest.fixture(scope="module")
+def deployed_markets():
+    return {}
+
+
+@pytest.fixture
+def deploy_market(
+    a, deployed_markets, OptionMarket, MockToken, MockOracle, OptionToken
+):
+    """
+    Returns a function that deploys and initializes a market with strikes
+    300, 400, 500 and 600, expiry 18 May 2033 and a 1% trading fee. Returns
+    (market, base token, oracle, long tokens, short tokens)
+
+    Each configuration is deployed once per module and the chain is reverted
+    to just after deployment at the end of each test, so it has to be called
+    before any other transactions in the test
+    """
+    height = [chain.height]
+
+    def f(isEth, isPut, baseDecimals=18):
+        key = (isEth, isPut, None if isEth else baseDecimals)
+        if key not in deployed_markets:
+            assert (
+                chain.height == height[0]
+            ), "deploy_market must be called before other transactions"
+            deployer = a[0]
+            if isEth:
+                baseToken = ZERO_ADDRESS
+            else:
+                baseToken = deployer.deploy(MockToken)
+                baseToken.setDecimals(baseDecimals)
+
+            oracle = deployer.deploy(MockOracle)
+            longTokens = [deployer.deploy(OptionToken) for _ in range(4)]
+            shortTokens = [deployer.deploy(OptionToken) for _ in range(4)]
+
+            market = deployer.deploy(OptionMarket)
+            market.initialize(
+                baseToken,
+                oracle,
+                longTokens,
+                shortTokens,
+                [300 * SCALE, 400 * SCALE, 500 * SCALE, 600 * SCALE],
+                2000000000,  # expiry = 18 May 2033
+                isPut,
+                1 * PERCENT,  # trading fee = 1%
+                "symbol",
+            )
+            for token in longTokens + shortTokens:
+                token.initialize(market, "name", "symbol", 18)
+
+            deployed_markets[key] = (market, baseToken, oracle, longTokens, shortTokens)
+
+            # later tests revert to here so the deployment is kept
+            chain.snapshot()
+            height[0] = chain.height
+        return deployed_markets[key]
+
+    chain.snapshot()
+    yield f
+    chain.revert()
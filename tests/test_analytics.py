@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from scripts import analytics
+from scripts.market_sim import OptionMarketSim
+from scripts.option_math import calc_quantities
+
+
+SCALE = 10 ** 18
+
+
+@pytest.mark.parametrize("isPut", [False, True])
+def test_load_markets(a, deploy_market, isPut):
+
+    # setup args
+    deployer, alice = a[:2]
+    market, baseToken, oracle, longTokens, shortTokens = deploy_market(False, isPut)
+
+    baseToken.mint(alice, 1000000 * SCALE, {"from": deployer})
+    baseToken.approve(market, 1000000 * SCALE, {"from": alice})
+
+    # puts cost about strike price times as much so trade fewer
+    unit = SCALE // 100 if isPut else SCALE
+    market.deposit(10 * SCALE, 1000000 * SCALE, {"from": alice})
+    market.buy(True, 1, 2 * unit, 1000000 * SCALE, {"from": alice})
+    market.buy(False, 3, 3 * unit, 1000000 * SCALE, {"from": alice})
+    market.buy(True, 0, unit // 3, 1000000 * SCALE, {"from": alice})
+
+    batch = analytics.load_markets([OptionMarketSim.from_market(market)])
+    strikes = [market.strikePrices(i) for i in range(4)]
+    longs = [token.totalSupply() for token in longTokens]
+    shorts = [token.totalSupply() for token in shortTokens]
+
+    # quantities are the same as the contract's up to floating point error
+    expected = np.array(calc_quantities(strikes, isPut, longs, shorts), dtype=float)
+    assert np.allclose(batch.quantities[0], expected, rtol=1e-12)
+    assert batch.b[0] == market.totalSupply()
+
+    # prices sum to 1 and buying a small amount costs the implied value of
+    # the payoff in tokenized quantities, excluding the fee
+    probabilities = analytics.bucket_probabilities(batch)[0]
+    assert probabilities.sum() == pytest.approx(1.0)
+
+    amount = unit // 10000
+    for i in range(4):
+        for isLong in [True, False]:
+            cost = market.lastCost()
+            market.buy(isLong, i, amount, 1000000 * SCALE, {"from": alice})
+            cost = market.lastCost() - cost
+
+            # longs pay out above the strike for calls and below for puts
+            isAbove = isLong != isPut
+            price = (
+                probabilities[i + 1 :].sum()
+                if isAbove
+                else probabilities[: i + 1].sum()
+            )
+            if isPut:
+                price *= strikes[i] / SCALE
+            assert cost == pytest.approx(price * amount, rel=1e-3)
+
+            market.sell(isLong, i, amount, 0, {"from": alice})
@@ -0,0 +1,132 @@
+import random
+
+from brownie import reverts
+import pytest
+
+from scripts.market_sim import OptionMarketSim
+from scripts.option_math import Revert
+
+
+SCALE = 10 ** 18
+
+
+@pytest.mark.parametrize("isEth", [False, True])
+@pytest.mark.parametrize("isPut", [False, True])
+def test_market_sim(a, deploy_market, fast_forward, isEth, isPut):
+
+    # setup args
+    deployer, alice = a[:2]
+    market, baseToken, oracle, longTokens, shortTokens = deploy_market(isEth, isPut)
+    oracle.setPrice(444 * SCALE)
+
+    def getBalance(wallet):
+        return wallet.balance() if isEth else baseToken.balanceOf(wallet)
+
+    if not isEth:
+        baseToken.mint(alice, 100000 * SCALE, {"from": deployer})
+        baseToken.approve(market, 100000 * SCALE, {"from": alice})
+    valueDict = {"value": 50 * SCALE} if isEth else {}
+
+    sim = OptionMarketSim.from_market(market)
+
+    def check(method, simArgs, args, isPayable):
+        expected = getattr(sim, method)(*simArgs)
+        txArgs = {"from": alice, **valueDict} if isPayable else {"from": alice}
+        tx = getattr(market, method)(*args, txArgs)
+        assert tx.return_value == expected
+        assert market.lastCost() == sim.last_cost
+        assert market.lastPayoff() == sim.last_payoff
+        assert market.poolValue() == sim.pool_value
+        assert market.totalSupply() == sim.total_supply
+        assert getBalance(market) == sim.balance
+        for i in range(4):
+            assert market.longSupplies(i) == sim.long_supplies[i]
+            assert market.shortSupplies(i) == sim.short_supplies[i]
+
+    # puts cost about strike price times as much so trade fewer
+    unit = SCALE // 100 if isPut else SCALE
+    maxAmount = 50 * SCALE
+
+    check("deposit", (10 * SCALE,), (10 * SCALE, maxAmount), True)
+    check("buy", (True, 1, 2 * unit), (True, 1, 2 * unit, maxAmount), True)
+    check("buy", (False, 3, 3 * unit), (False, 3, 3 * unit, maxAmount), True)
+    check("buy", (True, 0, unit // 3), (True, 0, unit // 3, maxAmount), True)
+    check("sell", (True, 1, unit), (True, 1, unit, 0), False)
+    check("deposit", (5 * SCALE,), (5 * SCALE, maxAmount), True)
+    check("withdraw", (3 * SCALE,), (3 * SCALE, 0), False)
+
+    # reverts with the same message
+    expected = sim.copy().buy(False, 2, unit)
+    with pytest.raises(Revert, match="Max slippage exceeded"):
+        sim.buy(False, 2, unit, expected - 1)
+    with reverts("Max slippage exceeded"):
+        market.buy(False, 2, unit, expected - 1, {"from": alice, **valueDict})
+
+    # after settlement
+    fast_forward(2000000000)
+    market.settle({"from": alice})
+    sim.timestamp = 2000000000
+    sim.settle(444 * SCALE)
+    assert market.lastPayoff() == sim.last_payoff
+    assert market.poolValue() == sim.pool_value
+
+    # longs held by alice expire out of the money for puts
+    if not isPut:
+        check("sell", (True, 1, unit), (True, 1, unit, 0), False)
+    check("sell", (False, 3, 3 * unit), (False, 3, 3 * unit, 0), False)
+    check("withdraw", (12 * SCALE,), (12 * SCALE, 0), False)
+
+
+@pytest.mark.parametrize("isPut", [False, True])
+def test_float_small_trades(isPut):
+    strikes = [300 * SCALE, 400 * SCALE, 500 * SCALE, 600 * SCALE]
+    exact = OptionMarketSim(strikes, 2000000000, isPut, SCALE // 100, timestamp=1)
+    approx = OptionMarketSim(
+        strikes, 2000000000, isPut, SCALE // 100, timestamp=1, exact=False
+    )
+
+    unit = SCALE // 100 if isPut else SCALE
+    for sim in [exact, approx]:
+        sim.deposit(10 * SCALE)
+        sim.buy(True, 1, 2 * unit)
+        sim.buy(False, 3, 3 * unit)
+
+    # changes in cost of small trades are below floating point resolution, so
+    # both modes should revert for the same trades and otherwise agree
+    rng = random.Random(0)
+    for _ in range(500):
+        method = rng.choice(["buy", "sell"])
+        args = (
+            rng.random() < 0.5,
+            rng.randrange(4),
+            rng.choice([1, 10, 1000, 10 ** 6]),
+        )
+        results = []
+        for sim in [exact, approx]:
+            try:
+                results.append(getattr(sim, method)(*args))
+            except Revert as e:
+                results.append(str(e))
+        if isinstance(results[0], str):
+            assert results[1] == results[0]
+        else:
+            assert results[1] == pytest.approx(
+                results[0], rel=1e-6, abs=SCALE // 10 ** 12
+            )
+
+
+def test_settle_revert():
+    strikes = [300 * SCALE, 400 * SCALE, 500 * SCALE, 600 * SCALE]
+    sim = OptionMarketSim(strikes, 2000000000, False, SCALE // 100, timestamp=1)
+    sim.deposit(10 * SCALE)
+    sim.buy(True, 1, 2 * SCALE)
+
+    # payoff is more than the balance, so settling reverts and leaves the
+    # simulator unsettled
+    sim.balance = 0
+    sim.timestamp = 2000000000
+    with pytest.raises(Revert, match="SafeMath: subtraction overflow"):
+        sim.settle(1000 * SCALE)
+    assert not sim.is_settled
+    assert sim.expiry_price == 0
+    assert sim.last_payoff == 0
@@ -46,6 +46,13 @@ def test_option_factory(
     )
 
     market = OptionMarket.at(tx.return_value)
+    assert tx.events["MarketCreated"] == {
+        "market": market,
+        "creator": deployer,
+        "baseToken": quoteToken if isPut else baseToken,
+        "longTokens": [market.longTokens(i) for i in range(3)],
+        "shortTokens": [market.shortTokens(i) for i in range(3)],
+    }
     assert market.baseToken() == quoteToken if isPut else baseToken
     assert market.oracle() == oracle
     assert market.isPut() == isPut
@@ -98,3 +105,113 @@ def test_option_factory(
     assert optionRegistry.getOptionDetails(market.longTokens(1)) == (True, 1, 400e18)
     assert optionRegistry.getOptionDetails(market.shortTokens(1)) == (False, 1, 400e18)
     assert optionRegistry.lastIndex() == 1
+
+
+@pytest.mark.parametrize("isPaused", [False, True])
+def test_create_market_with_config(
+    a,
+    OptionFactory,
+    OptionMarket,
+    OptionToken,
+    MockToken,
+    MockOracle,
+    isPaused,
+):
+    deployer, alice = a[:2]
+    optionMarketLibrary = deployer.deploy(OptionMarket)
+    optionTokenLibrary = deployer.deploy(OptionToken)
+    factory = deployer.deploy(OptionFactory, optionMarketLibrary, optionTokenLibrary)
+
+    baseToken = deployer.deploy(MockToken)
+    quoteToken = deployer.deploy(MockToken)
+    oracle = deployer.deploy(MockOracle)
+
+    tx = factory.createMarketWithConfig(
+        (
+            baseToken,
+            quoteToken,
+            oracle,
+            [300 * SCALE, 400 * SCALE, 500 * SCALE],  # strikes
+            2000000000,  # expiry
+            False,  # call
+            SCALE // 100,  # trading fee
+            10 * SCALE,  # balance cap
+            5 * SCALE,  # total supply cap
+            3600,  # dispute period
+            isPaused,
+        ),
+        {"from": alice},
+    )
+
+    market = OptionMarket.at(tx.return_value)
+    assert tx.events["MarketCreated"]["market"] == market
+    assert market.baseToken() == baseToken
+    assert market.tradingFee() == SCALE // 100
+    assert market.balanceCap() == 10 * SCALE
+    assert market.totalSupplyCap() == 5 * SCALE
+    assert market.disputePeriod() == 3600
+    assert market.isPaused() == isPaused
+    assert market.owner() == alice
+    assert factory.markets(0) == market
+
+    # factory can't change settings after creation
+    with reverts("Ownable: caller is not the owner"):
+        market.setBalanceCap(0, {"from": deployer})
+
+
+@pytest.mark.parametrize("isPut", [False, True])
+def test_immutable_config(
+    a, OptionFactory, OptionMarket, OptionToken, MockToken, MockOracle, web3, isPut
+):
+    deployer, alice = a[:2]
+    optionMarketLibrary = deployer.deploy(OptionMarket)
+    optionTokenLibrary = deployer.deploy(OptionToken)
+    factory = deployer.deploy(OptionFactory, optionMarketLibrary, optionTokenLibrary)
+
+    baseToken = deployer.deploy(MockToken)
+    oracle = deployer.deploy(MockOracle)
+    strikePrices = [300 * SCALE, 400 * SCALE, 500 * SCALE]
+    args = (strikePrices, 2000000000, isPut, SCALE // 100)
+
+    tx = factory.createMarket(baseToken, baseToken, oracle, *args)
+    clone = OptionMarket.at(tx.return_value)
+    longTokens = [clone.longTokens(i) for i in range(3)]
+    shortTokens = [clone.shortTokens(i) for i in range(3)]
+
+    # number of strikes, strike prices and option tokens are appended after
+    # the minimal proxy
+    words = [3] + strikePrices + [int(addr, 16) for addr in longTokens + shortTokens]
+    code = web3.eth.getCode(clone.address)
+    assert len(code) == 45 + 32 * len(words)
+    assert code[45:] == b"".join(w.to_bytes(32, "big") for w in words)
+    assert clone.hasImmutableConfig()
+    assert clone.numStrikes() == 3
+
+    # same market deployed directly reads its configuration from storage
+    market = deployer.deploy(OptionMarket)
+    tokens = [deployer.deploy(OptionToken) for _ in range(6)]
+    for token in tokens:
+        token.initialize(market, "name", "symbol", 18)
+    market.initialize(baseToken, oracle, tokens[:3], tokens[3:], *args, "symbol")
+    assert not market.hasImmutableConfig()
+
+    # trades cost the same in both
+    for m in [clone, market]:
+        baseToken.mint(alice, 10000 * SCALE)
+        baseToken.approve(m, 10000 * SCALE, {"from": alice})
+    for method, *params in [
+        ("deposit", 10 * SCALE),
+        ("buy", True, 1, SCALE),
+        ("buy", False, 2, SCALE),
+        ("sell", True, 1, SCALE // 2),
+    ]:
+        bound = 10000 * SCALE if method in ("deposit", "buy") else 0
+        amounts = [
+            getattr(m, method)(*params, bound, {"from": alice}).return_value
+            for m in [clone, market]
+        ]
+        assert amounts[0] == amounts[1] > 0
+
+    assert clone.getCurrentCost() == market.getCurrentCost()
+    assert OptionToken.at(longTokens[1]).balanceOf(alice) == SCALE // 2
+    assert OptionToken.at(shortTokens[2]).balanceOf(alice) == SCALE
@@ -381,3 +381,97 @@ def test_governance_methods(
     vault.transfer(bob, 1 * scale, {"from": alice})
     vault.withdraw(1 * scale, bob, {"from": bob})
     vault.withdraw(1 * scale, alice, {"from": alice})
+
+
+def test_buy_and_sell_with_and_without_buy_many(
+    a,
+    OptionFactory,
+    OptionLpVault,
+    OptionMarket,
+    OptionToken,
+    OptionViews,
+    MockLegacyOptionMarket,
+    MockOracle,
+    MockToken,
+):
+    deployer, alice = a[:2]
+    baseToken = deployer.deploy(MockToken)
+    oracle = deployer.deploy(MockOracle)
+    strikePrices = [300 * SCALE, 400 * SCALE, 500 * SCALE]
+
+    # factory markets have buyMany and sellMany
+    factory = deployer.deploy(
+        OptionFactory, deployer.deploy(OptionMarket), deployer.deploy(OptionToken)
+    )
+    tx = factory.createMarket(
+        baseToken, baseToken, oracle, strikePrices, 2000000000, False, SCALE // 100
+    )
+    factoryMarket = OptionMarket.at(tx.return_value)
+    assert factoryMarket.hasImmutableConfig()
+
+    def deployMarket(contract):
+        market = deployer.deploy(contract)
+        tokens = [deployer.deploy(OptionToken) for _ in range(6)]
+        market.initialize(
+            baseToken,
+            oracle,
+            tokens[:3],
+            tokens[3:],
+            strikePrices,
+            2000000000,
+            False,
+            SCALE // 100,
+            "symbol",
+        )
+        for token in tokens:
+            token.initialize(market, "name", "symbol", 18)
+        assert not market.hasImmutableConfig()
+        return market
+
+    # so do markets deployed directly without config in their code. vault
+    # trades leg by leg in markets like those deployed before buyMany and
+    # sellMany were added
+    directMarket = deployMarket(OptionMarket)
+    legacyMarket = deployMarket(MockLegacyOptionMarket)
+
+    vault = deployer.deploy(
+        OptionLpVault, baseToken, deployer.deploy(OptionViews), "name", "symbol"
+    )
+    baseToken.mint(alice, 100 * SCALE)
+    baseToken.approve(vault, 100 * SCALE, {"from": alice})
+    vault.deposit(100 * SCALE, alice, {"from": alice})
+
+    amounts = []
+    for market, isBatch in [
+        (factoryMarket, True),
+        (directMarket, True),
+        (legacyMarket, False),
+    ]:
+        vault.addMarket(market)
+
+        # nothing to trade
+        balance = baseToken.balanceOf(vault)
+        assert vault.buy(market, [0, 0, 0], [0, 0, 0], 0, 0).return_value == 0
+        assert vault.sell(market, [0, 0, 0], [0, 0, 0], 0, 0).return_value == 0
+        assert baseToken.balanceOf(vault) == balance
+
+        tx = vault.buy(
+            market, [SCALE, 0, 2 * SCALE], [0, SCALE, 0], 10 * SCALE, 100 * SCALE
+        )
+        assert ("BuyMany" in tx.events) == isBatch
+        amountIn = tx.return_value
+        assert market.balanceOf(vault) == 10 * SCALE
+        assert OptionToken.at(market.longTokens(2)).balanceOf(vault) == 2 * SCALE
+        assert OptionToken.at(market.shortTokens(1)).balanceOf(vault) == SCALE
+
+        tx = vault.sell(market, [SCALE, 0, SCALE], [0, SCALE, 0], 5 * SCALE, 0)
+        assert ("SellMany" in tx.events) == isBatch
+        amountOut = tx.return_value
+        assert market.balanceOf(vault) == 5 * SCALE
+        assert OptionToken.at(market.longTokens(2)).balanceOf(vault) == SCALE
+        assert OptionToken.at(market.shortTokens(1)).balanceOf(vault) == 0
+        amounts.append((amountIn, amountOut))
+
+    # all paths cost the same
+    assert amounts[0] == amounts[1] == amounts[2]
+    assert amounts[0][0] > 0 and amounts[0][1] > 0
@@ -1,7 +1,9 @@
-from brownie import reverts, ZERO_ADDRESS
+from brownie import chain, reverts, ZERO_ADDRESS
 import pytest
 from pytest import approx
 
+from scripts.market_sim import OptionMarketSim
+
 
 SCALE = 10 ** 18
 PERCENT = SCALE // 100
@@ -97,6 +99,13 @@ def test_initialize(
     with reverts():
         market.strikePrices(4)
 
+    # check supplies start at 0
+    for i in range(4):
+        assert market.longSupplies(i) == 0
+        assert market.shortSupplies(i) == 0
+    with reverts():
+        market.longSupplies(4)
+
     # can't initialize again
     with reverts("Contract instance has already been initialized"):
         market.initialize(
@@ -230,10 +239,7 @@ def test_initialize_errors(
 @pytest.mark.parametrize("baseDecimals", [6, 18])
 def test_calls(
     a,
-    OptionMarket,
-    MockToken,
-    MockOracle,
-    OptionToken,
+    deploy_market,
     fast_forward,
     isEth,
     balanceCap,
@@ -243,43 +249,21 @@ def test_calls(
 
     # setup args
     deployer, alice, bob = a[:3]
-    oracle = deployer.deploy(MockOracle)
+    market, baseToken, oracle, longTokens, shortTokens = deploy_market(
+        isEth, False, baseDecimals
+    )
     oracle.setPrice(555 * SCALE)
-    longTokens = [deployer.deploy(OptionToken) for _ in range(4)]
-    shortTokens = [deployer.deploy(OptionToken) for _ in range(4)]
 
-    if isEth:
-        scale = 1e18
-        baseToken = ZERO_ADDRESS
-    else:
-        scale = 10 ** baseDecimals
-        baseToken = deployer.deploy(MockToken)
-        baseToken.setDecimals(baseDecimals)
+    scale = 1e18 if isEth else 10 ** baseDecimals
     percent = scale // 100
 
     def getBalance(wallet):
         return wallet.balance() if isEth else baseToken.balanceOf(wallet)
 
-    # deploy and initialize
-    market = deployer.deploy(OptionMarket)
-    market.initialize(
-        baseToken,
-        oracle,
-        longTokens,
-        shortTokens,
-        [300 * SCALE, 400 * SCALE, 500 * SCALE, 600 * SCALE],
-        2000000000,  # expiry = 18 May 2033
-        False,  # call
-        1 * PERCENT,  # trading fee = 1%
-        "symbol",
-    )
     market.setBalanceCap(balanceCap * scale, {"from": deployer})
     market.setTotalSupplyCap(totalSupplyCap * scale, {"from": deployer})
     market.setDisputePeriod(3600, {"from": deployer})  # 1 hour
 
-    for token in longTokens + shortTokens:
-        token.initialize(market, "name", "symbol", 18)
-
     # give users base tokens
     if not isEth:
         for user in [deployer, alice, bob]:
@@ -426,6 +410,11 @@ def test_calls(
         "newSupply": 6 * scale,
     }
 
+    # supplies stored in market match tokens
+    for i in range(4):
+        assert market.longSupplies(i) == longTokens[i].totalSupply()
+        assert market.shortSupplies(i) == shortTokens[i].totalSupply()
+
     # can't sell more than you have
     with reverts("ERC20: burn amount exceeds balance"):
         market.sell(CALL, 0, 3 * scale, 0, {"from": alice})
@@ -632,10 +621,7 @@ def test_calls(
 @pytest.mark.parametrize("baseDecimals", [6, 18])
 def test_puts(
     a,
-    OptionMarket,
-    MockToken,
-    MockOracle,
-    OptionToken,
+    deploy_market,
     fast_forward,
     balanceCap,
     totalSupplyCap,
@@ -644,39 +630,21 @@ def test_puts(
 
     # setup args
     deployer, alice, bob = a[:3]
-    oracle = deployer.deploy(MockOracle)
+    market, baseToken, oracle, longTokens, shortTokens = deploy_market(
+        False, True, baseDecimals
+    )
     oracle.setPrice(444 * SCALE)
-    longTokens = [deployer.deploy(OptionToken) for _ in range(4)]
-    shortTokens = [deployer.deploy(OptionToken) for _ in range(4)]
 
     scale = 10 ** baseDecimals
-    baseToken = deployer.deploy(MockToken)
-    baseToken.setDecimals(baseDecimals)
     percent = scale // 100
 
     def getBalance(wallet):
         return baseToken.balanceOf(wallet)
 
-    # deploy and initialize
-    market = deployer.deploy(OptionMarket)
-    market.initialize(
-        baseToken,
-        oracle,
-        longTokens,
-        shortTokens,
-        [300 * SCALE, 400 * SCALE, 500 * SCALE, 600 * SCALE],
-        2000000000,  # expiry = 18 May 2033
-        True,  # put
-        1 * PERCENT,  # trading fee = 1%
-        "symbol",
-    )
     market.setBalanceCap(balanceCap * scale, {"from": deployer})
     market.setTotalSupplyCap(totalSupplyCap * scale, {"from": deployer})
     market.setDisputePeriod(3600, {"from": deployer})  # 1 hour
 
-    for token in longTokens + shortTokens:
-        token.initialize(market, "name", "symbol", 18)
-
     # give users base tokens
     for user in [deployer, alice, bob]:
         baseToken.mint(user, 100000 * scale, {"from": deployer})
@@ -1046,10 +1014,8 @@ def test_puts(
 @pytest.mark.parametrize("totalSupplyCap", [0, 10])
 def test_emergency_methods(
     a,
-    OptionMarket,
-    MockToken,
+    deploy_market,
     MockOracle,
-    OptionToken,
     fast_forward,
     isEth,
     isPut,
@@ -1059,33 +1025,14 @@ def test_emergency_methods(
 
     # setup args
     deployer, alice = a[:2]
-    baseToken = ZERO_ADDRESS if isEth else deployer.deploy(MockToken)
-    oracle = deployer.deploy(MockOracle)
+    market, baseToken, oracle, longTokens, shortTokens = deploy_market(isEth, isPut)
     oracle2 = deployer.deploy(MockOracle)
-    longTokens = [deployer.deploy(OptionToken) for _ in range(4)]
-    shortTokens = [deployer.deploy(OptionToken) for _ in range(4)]
     oracle.setPrice(444 * SCALE)
     oracle2.setPrice(555 * SCALE)
 
     def getBalance(wallet):
         return wallet.balance() if isEth else baseToken.balanceOf(wallet)
 
-    # deploy and initialize
-    market = deployer.deploy(OptionMarket)
-    market.initialize(
-        baseToken,
-        oracle,
-        longTokens,
-        shortTokens,
-        [300 * SCALE, 400 * SCALE, 500 * SCALE, 600 * SCALE],
-        2000000000,  # expiry = 18 May 2033
-        isPut,
-        1 * PERCENT,  # trading fee = 1%
-        "symbol",
-    )
-    for token in longTokens + shortTokens:
-        token.initialize(market, "name", "symbol", 18)
-
     # give users base tokens
     if not isEth:
         baseToken.mint(deployer, 100 * SCALE, {"from": deployer})
@@ -1196,10 +1143,7 @@ def test_emergency_methods(
 @pytest.mark.parametrize("balanceCap", [0, 20])
 def test_balance_cap(
     a,
-    OptionMarket,
-    MockToken,
-    MockOracle,
-    OptionToken,
+    deploy_market,
     fast_forward,
     isEth,
     balanceCap,
@@ -1207,26 +1151,7 @@ def test_balance_cap(
 
     # setup args
     deployer, alice = a[:2]
-    baseToken = ZERO_ADDRESS if isEth else deployer.deploy(MockToken)
-    oracle = deployer.deploy(MockOracle)
-    longTokens = [deployer.deploy(OptionToken) for _ in range(4)]
-    shortTokens = [deployer.deploy(OptionToken) for _ in range(4)]
-
-    # deploy and initialize
-    market = deployer.deploy(OptionMarket)
-    market.initialize(
-        baseToken,
-        oracle,
-        longTokens,
-        shortTokens,
-        [300 * SCALE, 400 * SCALE, 500 * SCALE, 600 * SCALE],
-        2000000000,  # expiry = 18 May 2033
-        False,
-        1 * PERCENT,  # trading fee = 1%
-        "symbol",
-    )
-    for token in longTokens + shortTokens:
-        token.initialize(market, "name", "symbol", 18)
+    market, baseToken, oracle, longTokens, shortTokens = deploy_market(isEth, False)
 
     # give users base tokens
     if not isEth:
@@ -1276,10 +1201,7 @@ def test_balance_cap(
 @pytest.mark.parametrize("totalSupplyCap", [0, 20])
 def test_total_supply_cap(
     a,
-    OptionMarket,
-    MockToken,
-    MockOracle,
-    OptionToken,
+    deploy_market,
     fast_forward,
     isEth,
     totalSupplyCap,
@@ -1287,26 +1209,7 @@ def test_total_supply_cap(
 
     # setup args
     deployer, alice = a[:2]
-    baseToken = ZERO_ADDRESS if isEth else deployer.deploy(MockToken)
-    oracle = deployer.deploy(MockOracle)
-    longTokens = [deployer.deploy(OptionToken) for _ in range(4)]
-    shortTokens = [deployer.deploy(OptionToken) for _ in range(4)]
-
-    # deploy and initialize
-    market = deployer.deploy(OptionMarket)
-    market.initialize(
-        baseToken,
-        oracle,
-        longTokens,
-        shortTokens,
-        [300 * SCALE, 400 * SCALE, 500 * SCALE, 600 * SCALE],
-        2000000000,  # expiry = 18 May 2033
-        False,
-        1 * PERCENT,  # trading fee = 1%
-        "symbol",
-    )
-    for token in longTokens + shortTokens:
-        token.initialize(market, "name", "symbol", 18)
+    market, baseToken, oracle, longTokens, shortTokens = deploy_market(isEth, False)
 
     # give users base tokens
     if not isEth:
@@ -1357,10 +1260,7 @@ def test_total_supply_cap(
 @pytest.mark.parametrize("depositFirst", [False, True])
 def test_liquidity_manipulation_attack(
     a,
-    OptionMarket,
-    MockToken,
-    MockOracle,
-    OptionToken,
+    deploy_market,
     fast_forward,
     isEth,
     baseDecimals,
@@ -1369,38 +1269,16 @@ def test_liquidity_manipulation_attack(
 
     # setup args
     deployer, alice = a[:2]
-    oracle = deployer.deploy(MockOracle)
-    longTokens = [deployer.deploy(OptionToken) for _ in range(4)]
-    shortTokens = [deployer.deploy(OptionToken) for _ in range(4)]
+    market, baseToken, oracle, longTokens, shortTokens = deploy_market(
+        isEth, False, baseDecimals
+    )
 
-    if isEth:
-        scale = 1e18
-        baseToken = ZERO_ADDRESS
-    else:
-        scale = 10 ** baseDecimals
-        baseToken = deployer.deploy(MockToken)
-        baseToken.setDecimals(baseDecimals)
+    scale = 1e18 if isEth else 10 ** baseDecimals
     percent = scale // 100
 
     def getBalance(wallet):
         return wallet.balance() if isEth else baseToken.balanceOf(wallet)
 
-    # deploy and initialize
-    market = deployer.deploy(OptionMarket)
-    market.initialize(
-        baseToken,
-        oracle,
-        longTokens,
-        shortTokens,
-        [300 * SCALE, 400 * SCALE, 500 * SCALE, 600 * SCALE],
-        2000000000,  # expiry = 18 May 2033
-        False,  # call
-        1 * PERCENT,  # trading fee = 1%
-        "symbol",
-    )
-    for token in longTokens + shortTokens:
-        token.initialize(market, "name", "symbol", 18)
-
     # give users base tokens
     if not isEth:
         for user in [deployer, alice]:
@@ -1467,10 +1345,7 @@ def test_liquidity_manipulation_attack(
 @pytest.mark.parametrize("baseDecimals", [6, 18])
 def test_withdraw_all_liquidity_before_expiry(
     a,
-    OptionMarket,
-    MockToken,
-    MockOracle,
-    OptionToken,
+    deploy_market,
     fast_forward,
     isEth,
     baseDecimals,
@@ -1478,40 +1353,17 @@ def test_withdraw_all_liquidity_before_expiry(
 
     # setup args
     deployer, alice, bob = a[:3]
-    oracle = deployer.deploy(MockOracle)
+    market, baseToken, oracle, longTokens, shortTokens = deploy_market(
+        isEth, False, baseDecimals
+    )
     oracle.setPrice(555 * SCALE)
-    longTokens = [deployer.deploy(OptionToken) for _ in range(4)]
-    shortTokens = [deployer.deploy(OptionToken) for _ in range(4)]
 
-    if isEth:
-        scale = 1e18
-        baseToken = ZERO_ADDRESS
-    else:
-        scale = 10 ** baseDecimals
-        baseToken = deployer.deploy(MockToken)
-        baseToken.setDecimals(baseDecimals)
+    scale = 1e18 if isEth else 10 ** baseDecimals
     percent = scale // 100
 
     def getBalance(wallet):
         return wallet.balance() if isEth else baseToken.balanceOf(wallet)
 
-    # deploy and initialize
-    market = deployer.deploy(OptionMarket)
-    market.initialize(
-        baseToken,
-        oracle,
-        longTokens,
-        shortTokens,
-        [300 * SCALE, 400 * SCALE, 500 * SCALE, 600 * SCALE],
-        2000000000,  # expiry = 18 May 2033
-        False,  # call
-        1 * PERCENT,  # trading fee = 1%
-        "symbol",
-    )
-
-    for token in longTokens + shortTokens:
-        token.initialize(market, "name", "symbol", 18)
-
     # give users base tokens
     if not isEth:
         for user in [deployer, alice, bob]:
@@ -1575,10 +1427,7 @@ def test_withdraw_all_liquidity_before_expiry(
 @pytest.mark.parametrize("baseDecimals", [6, 18])
 def test_withdraw_all_liquidity_after_expiry(
     a,
-    OptionMarket,
-    MockToken,
-    MockOracle,
-    OptionToken,
+    deploy_market,
     fast_forward,
     isEth,
     baseDecimals,
@@ -1586,40 +1435,17 @@ def test_withdraw_all_liquidity_after_expiry(
 
     # setup args
     deployer, alice, bob = a[:3]
-    oracle = deployer.deploy(MockOracle)
+    market, baseToken, oracle, longTokens, shortTokens = deploy_market(
+        isEth, False, baseDecimals
+    )
     oracle.setPrice(555 * SCALE)
-    longTokens = [deployer.deploy(OptionToken) for _ in range(4)]
-    shortTokens = [deployer.deploy(OptionToken) for _ in range(4)]
 
-    if isEth:
-        scale = 1e18
-        baseToken = ZERO_ADDRESS
-    else:
-        scale = 10 ** baseDecimals
-        baseToken = deployer.deploy(MockToken)
-        baseToken.setDecimals(baseDecimals)
+    scale = 1e18 if isEth else 10 ** baseDecimals
     percent = scale // 100
 
     def getBalance(wallet):
         return wallet.balance() if isEth else baseToken.balanceOf(wallet)
 
-    # deploy and initialize
-    market = deployer.deploy(OptionMarket)
-    market.initialize(
-        baseToken,
-        oracle,
-        longTokens,
-        shortTokens,
-        [300 * SCALE, 400 * SCALE, 500 * SCALE, 600 * SCALE],
-        2000000000,  # expiry = 18 May 2033
-        False,  # call
-        1 * PERCENT,  # trading fee = 1%
-        "symbol",
-    )
-
-    for token in longTokens + shortTokens:
-        token.initialize(market, "name", "symbol", 18)
-
     # give users base tokens
     if not isEth:
         for user in [deployer, alice, bob]:
@@ -1675,3 +1501,152 @@ def test_withdraw_all_liquidity_after_expiry(
 
     # no tvl left
     assert getBalance(market) == 0
+
+
+@pytest.mark.parametrize("isEth", [False, True])
+@pytest.mark.parametrize("isPut", [False, True])
+def test_buy_many_sell_many(a, deploy_market, fast_forward, isEth, isPut):
+    # setup args
+    deployer, alice = a[:2]
+    market, baseToken, oracle, longTokens, shortTokens = deploy_market(isEth, isPut)
+    oracle.setPrice(444 * SCALE)
+    scale = SCALE
+
+    def getBalance(wallet):
+        return wallet.balance() if isEth else baseToken.balanceOf(wallet)
+
+    # same as calling deposit, buy and sell one at a time
+    sim = OptionMarketSim(
+        [300 * SCALE, 400 * SCALE, 500 * SCALE, 600 * SCALE],
+        2000000000,
+        isPut,
+        1 * PERCENT,
+        timestamp=chain.time(),
+    )
+
+    # give users base tokens
+    if not isEth:
+        for user in [deployer, alice]:
+            baseToken.mint(user, 100000 * scale, {"from": deployer})
+            baseToken.approve(market, 100000 * scale, {"from": user})
+    valueDict = {"value": 50 * scale} if isEth else {}
+
+    # can't buy before depositing
+    with reverts("No liquidity"):
+        market.buyMany(
+            [scale, 0, 0, 0], [0, 0, 0, 0], 0, 100 * scale, {"from": alice, **valueDict}
+        )
+
+    with reverts("Lengths do not match"):
+        market.buyMany(
+            [scale, 0, 0],
+            [0, 0, 0, 0],
+            scale,
+            100 * scale,
+            {"from": alice, **valueDict},
+        )
+    with reverts("Lengths do not match"):
+        market.buyMany(
+            [scale, 0, 0, 0],
+            [0, 0, 0],
+            scale,
+            100 * scale,
+            {"from": alice, **valueDict},
+        )
+
+    # deposit and buy several options at once. puts cost about strike price
+    # times as much so buy fewer
+    unit = scale // 100 if isPut else scale
+    longs = [unit // 10, 0, unit // 5, 0]
+    shorts = [0, unit // 2, 0, unit // 10]
+    expected = sim.deposit(10 * scale)
+    for i in range(4):
+        if longs[i] > 0:
+            expected += sim.buy(True, i, longs[i])
+        if shorts[i] > 0:
+            expected += sim.buy(False, i, shorts[i])
+
+    with reverts("Max slippage exceeded"):
+        market.buyMany(
+            longs, shorts, 10 * scale, expected - 1, {"from": alice, **valueDict}
+        )
+
+    balance = getBalance(alice)
+    tx = market.buyMany(
+        longs, shorts, 10 * scale, expected, {"from": alice, **valueDict}
+    )
+    assert tx.return_value == expected
+    assert balance - getBalance(alice) == expected
+    assert getBalance(market) == expected
+    assert market.balanceOf(alice) == 10 * scale
+    assert market.lastCost() == sim.last_cost
+    assert market.poolValue() == sim.pool_value
+    for i in range(4):
+        assert longTokens[i].balanceOf(alice) == market.longSupplies(i) == longs[i]
+        assert shortTokens[i].balanceOf(alice) == market.shortSupplies(i) == shorts[i]
+    assert tx.events["BuyMany"] == {
+        "account": alice,
+        "longOptionsOut": longs,
+        "shortOptionsOut": shorts,
+        "sharesOut": 10 * scale,
+        "amountIn": expected,
+    }
+
+    # nothing to buy or sell
+    with reverts("Amount in must be > 0"):
+        market.buyMany(
+            [0, 0, 0, 0], [0, 0, 0, 0], 0, 100 * scale, {"from": alice, **valueDict}
+        )
+    with reverts("Amount out must be > 0"):
+        market.sellMany([0, 0, 0, 0], [0, 0, 0, 0], 0, 0, {"from": alice})
+
+    with reverts("Lengths do not match"):
+        market.sellMany([0, 0, 0], [0, 0, 0, 0], scale, 0, {"from": alice})
+    with reverts("Lengths do not match"):
+        market.sellMany([0, 0, 0, 0], [0, 0, 0, 0, 0], scale, 0, {"from": alice})
+
+    # sell some options and withdraw at once
+    longsIn = [longs[0] // 2, 0, 0, 0]
+    sharesIn = 2 * scale
+    expected = sim.sell(True, 0, longsIn[0]) + sim.withdraw(sharesIn)
+
+    with reverts("Max slippage exceeded"):
+        market.sellMany(longsIn, [0, 0, 0, 0], sharesIn, expected + 1, {"from": alice})
+
+    balance = getBalance(alice)
+    tx = market.sellMany(longsIn, [0, 0, 0, 0], sharesIn, expected, {"from": alice})
+    assert tx.return_value == expected
+    assert getBalance(alice) - balance == expected
+    assert market.balanceOf(alice) == 8 * scale
+    assert market.longSupplies(0) == longs[0] - longsIn[0]
+    assert market.lastCost() == sim.last_cost
+    assert tx.events["SellMany"] == {
+        "account": alice,
+        "longOptionsIn": longsIn,
+        "shortOptionsIn": [0, 0, 0, 0],
+        "sharesIn": sharesIn,
+        "amountOut": expected,
+        "isSettled": False,
+    }
+
+    # can't sell more than balance
+    with reverts("ERC20: burn amount exceeds balance"):
+        market.sellMany([0, scale, 0, 0], [0, 0, 0, 0], 0, 0, {"from": alice})
+
+    # redeem everything after settlement
+    fast_forward(2000000000)
+    market.settle({"from": alice})
+    sim.timestamp = 2000000000
+    sim.settle(444 * SCALE)
+
+    # all remaining options are redeemed, so alice gets the whole payoff
+    # even though some of them expired out of the money
+    longsIn = [longs[0] - longsIn[0], 0, longs[2], 0]
+    expected = sim.withdraw(8 * scale) + sim.last_payoff
+
+    balance = getBalance(alice)
+    tx = market.sellMany(longsIn, shorts, 8 * scale, 0, {"from": alice})
+    assert tx.return_value == expected
+    assert getBalance(alice) - balance == expected
+    assert market.lastPayoff() == 0
+    assert tx.events["SellMany"]["isSettled"]
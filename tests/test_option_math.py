@@ -0,0 +1,163 @@
+from math import exp, log
+
+from hypothesis import given, settings, strategies as st
+import pytest
+
+from scripts.option_math import (
+    DIVU_OVERFLOW,
+    EXP_UNDERFLOW,
+    Revert,
+    calc_lmsr_cost,
+    calc_lmsr_cost_batch,
+    calc_payoff,
+    calc_quantities,
+)
+
+
+SCALE = 10 ** 18
+
+# cases per eth_call and calls per test
+BATCH_SIZE = 100
+MAX_EXAMPLES = 50
+
+# mostly realistic values with some near the limits where the contract reverts
+values = st.one_of(
+    st.integers(0, 1000 * SCALE),
+    st.integers(0, 2 ** 128),
+    st.integers(0, 2 ** 256 - 1),
+)
+
+
+@st.composite
+def markets(draw):
+    n = draw(st.integers(1, 8))
+    strikePrices = sorted(
+        draw(st.sets(st.integers(1, 10 ** 6 * SCALE), min_size=n, max_size=n))
+    )
+    isPut = draw(st.booleans())
+    longSupplies = draw(st.lists(values, min_size=n, max_size=n))
+    shortSupplies = draw(st.lists(values, min_size=n, max_size=n))
+    return strikePrices, isPut, longSupplies, shortSupplies
+
+
+@st.composite
+def states(draw):
+    # runs of equal quantities, like strikes without any options
+    runs = draw(st.lists(st.tuples(values, st.integers(1, 4)), min_size=2, max_size=9))
+    quantities = [q for q, length in runs for _ in range(length)]
+    b = draw(st.one_of(st.just(0), st.integers(1, 1000 * SCALE), values))
+    return quantities, b
+
+
+@st.composite
+def pruned_states(draw):
+    # quantities around where terms are skipped or divu reverts
+    b = draw(st.integers(1, 10 ** 6 * SCALE))
+    ratios = st.one_of(
+        st.integers(0, 2 * EXP_UNDERFLOW),
+        st.integers(DIVU_OVERFLOW - 2, DIVU_OVERFLOW + 1),
+    )
+    diffs = st.tuples(ratios, st.integers(-2, 2)).map(lambda x: max(x[0] * b + x[1], 0))
+    diffs = draw(st.lists(diffs, min_size=2, max_size=9))
+    maxQuantity = max(diffs) + draw(st.integers(0, SCALE))
+    return [maxQuantity - d for d in diffs], b
+
+
+@pytest.fixture(scope="module")
+def optionMath(a, MockOptionMath):
+    return a[0].deploy(MockOptionMath)
+
+
+@pytest.fixture(scope="module")
+def report():
+    stats = {"cases": 0, "reverts": 0, "maxRelError": 0.0, "minRevertRatio": None}
+    yield stats
+    print(
+        f"\nOptionMath: {stats['cases']} cases, {stats['reverts']} reverts, "
+        f"max relative error of LMSR cost {stats['maxRelError']:.3g}, "
+        f"smallest (max(q) - min(q)) / b that reverted {stats['minRevertRatio']}"
+    )
+
+
+def lmsr(q, b):
+    mx = max(q)
+    if b == 0:
+        return mx
+
+    a = sum(exp((x - mx) / b) for x in q)
+    return mx + b * log(a)
+
+
+def expected(f, *args):
+    try:
+        return True, f(*args)
+    except Revert:
+        return False, None
+
+
+@settings(max_examples=MAX_EXAMPLES, deadline=None)
+@given(cases=st.lists(markets(), min_size=BATCH_SIZE, max_size=BATCH_SIZE))
+def test_calc_quantities(optionMath, report, cases):
+    success, quantities = optionMath.calcQuantitiesBatch(*zip(*cases))
+
+    for case, ok, q in zip(cases, success, quantities):
+        assert (ok, list(q) if ok else None) == expected(calc_quantities, *case)
+    report["cases"] += len(cases)
+    report["reverts"] += success.count(False)
+
+
+@settings(max_examples=MAX_EXAMPLES, deadline=None)
+@given(
+    cases=st.lists(
+        st.one_of(states(), pruned_states()), min_size=BATCH_SIZE, max_size=BATCH_SIZE
+    )
+)
+def test_calc_lmsr_cost(optionMath, report, cases):
+    success, costs = optionMath.calcLmsrCostBatch(*zip(*cases))
+
+    for (q, b), ok, cost in zip(cases, success, costs):
+        assert (ok, cost if ok else None) == expected(calc_lmsr_cost, q, b)
+
+        # the batch port evaluates every term, so this checks skipping terms
+        # that underflow and reusing terms of equal quantities are exact
+        assert (cost if ok else None) == calc_lmsr_cost_batch([q], [b])[0]
+
+        if not ok:
+            # divu reverts when (max(q) - q_i) / b doesn't fit in 64.64
+            ratio = (max(q) - min(q)) / b if b > 0 else float("inf")
+            if report["minRevertRatio"] is None or ratio < report["minRevertRatio"]:
+                report["minRevertRatio"] = ratio
+            continue
+
+        # 64.64 fixed point is accurate to about 1e-18 relative to b and the
+        # result is rounded down to an integer
+        reference = lmsr(q, b)
+        assert abs(cost - reference) <= 1e-9 * reference + 1
+        if reference > SCALE:
+            report["maxRelError"] = max(
+                report["maxRelError"], abs(cost - reference) / reference
+            )
+
+    report["cases"] += len(cases)
+    report["reverts"] += success.count(False)
+
+
+@settings(max_examples=MAX_EXAMPLES, deadline=None)
+@given(
+    cases=st.lists(
+        st.tuples(markets(), st.one_of(st.just(0), st.integers(1, 10 ** 7 * SCALE))),
+        min_size=BATCH_SIZE,
+        max_size=BATCH_SIZE,
+    )
+)
+def test_calc_payoff(optionMath, report, cases):
+    args = [
+        (strikes, expiryPrice, isPut, longs, shorts)
+        for (strikes, isPut, longs, shorts), expiryPrice in cases
+    ]
+    success, payoffs = optionMath.calcPayoffBatch(*zip(*args))
+
+    for case, ok, payoff in zip(args, success, payoffs):
+        assert (ok, payoff if ok else None) == expected(calc_payoff, *case)
+    report["cases"] += len(cases)
+    report["reverts"] += success.count(False)
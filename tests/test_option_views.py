@@ -0,0 +1,65 @@
+from brownie import chain, reverts
+import pytest
+
+from scripts.market_sim import OptionMarketSim
+from scripts.quotes import quote_ladder
+
+
+SCALE = 10 ** 18
+PERCENT = SCALE // 100
+
+
+@pytest.mark.parametrize("isPut", [False, True])
+def test_quote_ladder(a, deploy_market, fast_forward, OptionViews, isPut):
+
+    # setup args
+    deployer, alice = a[:2]
+    market, baseToken, oracle, longTokens, shortTokens = deploy_market(False, isPut)
+    optionViews = deployer.deploy(OptionViews)
+
+    baseToken.mint(alice, 1000000 * SCALE, {"from": deployer})
+    baseToken.approve(market, 1000000 * SCALE, {"from": alice})
+
+    market.deposit(10 * SCALE, 1000000 * SCALE, {"from": alice})
+    market.buy(True, 1, 2 * SCALE, 1000000 * SCALE, {"from": alice})
+    market.buy(False, 3, 3 * SCALE, 1000000 * SCALE, {"from": alice})
+
+    amount = 2 * SCALE
+    longBuy, shortBuy, longSell, shortSell = optionViews.getQuoteLadder(market, amount)
+    cost = market.lastCost()
+
+    # python ladder is the same as the contract's
+    sim = OptionMarketSim.from_market(market)
+    ladder = [longBuy, shortBuy, longSell, shortSell]
+    assert [list(quotes) for quotes in quote_ladder(sim, amount)] == [
+        list(quotes) for quotes in ladder
+    ]
+
+    # quotes match amounts paid and received when trading. each trade is
+    # undone with the opposite trade, which leaves supplies and cost the same
+    for i in range(4):
+        for isLong, buyCosts, sellCosts in [
+            (True, longBuy, longSell),
+            (False, shortBuy, shortSell),
+        ]:
+            tx = market.buy(isLong, i, amount, 1000000 * SCALE, {"from": alice})
+            assert buyCosts[i] == tx.return_value
+            assert buyCosts[i] == sim.copy().buy(isLong, i, amount)
+            market.sell(isLong, i, amount, 0, {"from": alice})
+            assert market.lastCost() == cost
+
+            supply = (longTokens if isLong else shortTokens)[i].totalSupply()
+            if supply < amount:
+                assert sellCosts[i] == 0
+                continue
+
+            tx = market.sell(isLong, i, amount, 0, {"from": alice})
+            assert sellCosts[i] == tx.return_value
+            market.buy(isLong, i, amount, 1000000 * SCALE, {"from": alice})
+            assert market.lastCost() == cost
+
+    # can't quote after expiry
+    fast_forward(2000000000)
+    chain.mine()
+    with reverts("Already expired"):
+        optionViews.getQuoteLadder(market, amount)
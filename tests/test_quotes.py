@@ -0,0 +1,61 @@
+import pytest
+
+from scripts.market_sim import OptionMarketSim
+from scripts.quotes import buy_cost, solve_buy_amount, solve_buy_amounts
+
+
+SCALE = 10 ** 18
+
+
+@pytest.mark.parametrize("isPut", [False, True])
+def test_solve_buy_amount(a, deploy_market, isPut):
+
+    # setup args
+    deployer, alice = a[:2]
+    market, baseToken, oracle, longTokens, shortTokens = deploy_market(False, isPut)
+
+    baseToken.mint(alice, 1000000 * SCALE, {"from": deployer})
+    baseToken.approve(market, 1000000 * SCALE, {"from": alice})
+
+    market.deposit(10 * SCALE, 1000000 * SCALE, {"from": alice})
+    market.buy(True, 1, 2 * SCALE // 100, 1000000 * SCALE, {"from": alice})
+    market.buy(False, 3, 3 * SCALE // 100, 1000000 * SCALE, {"from": alice})
+
+    sim = OptionMarketSim.from_market(market)
+    budget = SCALE // 10 if isPut else SCALE // 1000
+    requests = [(i, isLong, budget) for i in range(4) for isLong in (True, False)]
+    amounts = solve_buy_amounts(sim, requests)
+
+    # largest amount that fits in the budget according to a simulated buy
+    for (i, isLong, _), amount in zip(requests, amounts):
+        assert amount == solve_buy_amount(sim, isLong, i, budget)
+        assert amount > 0
+        assert sim.copy().buy(isLong, i, amount) <= budget
+        assert sim.copy().buy(isLong, i, amount + 1) > budget
+        assert buy_cost(sim, isLong, i, amount) == sim.copy().buy(isLong, i, amount)
+
+    # and the market charges the same as the simulator
+    for (i, isLong, _), amount in zip(requests, amounts):
+        expected = sim.buy(isLong, i, amount)
+        tx = market.buy(isLong, i, amount, 1000000 * SCALE, {"from": alice})
+        assert tx.return_value == expected
+        assert market.lastCost() == sim.last_cost
+
+
+def test_solve_buy_amount_below_one_unit():
+    strikes = [300 * SCALE, 400 * SCALE, 500 * SCALE, 600 * SCALE]
+    sim = OptionMarketSim(strikes, 2000000000, False, SCALE // 100, timestamp=1)
+    sim.deposit(10 * SCALE)
+    sim.buy(True, 1, 2 * SCALE)
+    sim.buy(False, 3, 3 * SCALE)
+
+    # a few wei of options can cost nothing due to rounding, but the market
+    # reverts for buys that cost 0, so they aren't returned
+    requests = [(i, isLong, 0) for i in range(4) for isLong in (True, False)]
+    assert solve_buy_amounts(sim, requests) == [0] * len(requests)
+
+    # with a budget of 1, every returned amount costs exactly 1
+    requests = [(i, isLong, 1) for i in range(4) for isLong in (True, False)]
+    for (i, isLong, _), amount in zip(requests, solve_buy_amounts(sim, requests)):
+        assert amount > 0
+        assert sim.copy().buy(isLong, i, amount) == 1
@@ -0,0 +1,79 @@
+from brownie import chain
+import pytest
+
+from scripts.index_events import EventIndexer
+from scripts.replay import MarketReplay
+
+
+SCALE = 10 ** 18
+
+
+@pytest.mark.parametrize("isPut", [False, True])
+def test_state_at(
+    a, OptionFactory, OptionMarket, OptionToken, MockToken, MockOracle, isPut
+):
+
+    # setup args
+    deployer, alice = a[:2]
+    optionMarketLibrary = deployer.deploy(OptionMarket)
+    optionTokenLibrary = deployer.deploy(OptionToken)
+    factory = deployer.deploy(OptionFactory, optionMarketLibrary, optionTokenLibrary)
+    startBlock = factory.tx.block_number
+
+    baseToken = deployer.deploy(MockToken)
+    quoteToken = deployer.deploy(MockToken)
+    oracle = deployer.deploy(MockOracle)
+    tx = factory.createMarket(
+        baseToken,
+        quoteToken,
+        oracle,
+        [300 * SCALE, 400 * SCALE, 500 * SCALE, 600 * SCALE],  # strikes
+        2000000000,  # expiry
+        isPut,
+        SCALE // 100,  # trading fee
+    )
+    market = OptionMarket.at(tx.return_value)
+    token = quoteToken if isPut else baseToken
+    token.mint(alice, 1000000 * SCALE, {"from": deployer})
+    token.approve(market, 1000000 * SCALE, {"from": alice})
+
+    def getState():
+        return (
+            market.lastCost(),
+            market.poolValue(),
+            market.totalSupply(),
+            [market.longSupplies(i) for i in range(4)],
+            [market.shortSupplies(i) for i in range(4)],
+        )
+
+    # record state after each trade. with a snapshot every 2 events, later
+    # lookups start from a snapshot and replay the events after it
+    states = [(chain.height, getState())]
+    unit = SCALE // 100 if isPut else SCALE
+    for method, args in [
+        ("deposit", (10 * SCALE, 1000000 * SCALE)),
+        ("buy", (True, 1, 2 * unit, 1000000 * SCALE)),
+        ("buy", (False, 3, 3 * unit, 1000000 * SCALE)),
+        ("sell", (True, 1, unit, 0)),
+        ("deposit", (5 * SCALE, 1000000 * SCALE)),
+        ("buy", (True, 0, unit // 3, 1000000 * SCALE)),
+        ("withdraw", (3 * SCALE, 0)),
+    ]:
+        tx = getattr(market, method)(*args, {"from": alice})
+        states.append((tx.block_number, getState()))
+
+    indexer = EventIndexer(factory, ":memory:", startBlock)
+    assert indexer.update_markets() == 1
+    indexer.sync(chain.height)
+
+    replay = MarketReplay.from_market(indexer.db, market, snapshot_interval=2)
+    for blockNumber, expected in states:
+        state = replay.state_at(blockNumber)
+        assert (
+            state.last_cost,
+            state.pool_value,
+            state.total_supply,
+            state.long_supplies,
+            state.short_supplies,
+        ) == expected
+    assert len(replay.snapshots) == 3